@@ -0,0 +1,250 @@
+"""
+Benchmark runner.
+
+benchmarks.run
+
+Runs upload, download and listing benchmarks against a local :class:`benchmarks.server.MockServer`,
+across chunk sizes and concurrency levels. Each case runs in a fresh process, so its peak RSS is
+measured on its own::
+
+    python -m benchmarks.run --size 64M --chunk-sizes 1M,8M --concurrency 1,4,8 --latency 0.02
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+import multiprocessing.connection
+
+from benchmarks.server import MockServer
+
+from u2s_sdk.client import ApiClient
+from u2s_sdk.file import FileHandler
+from u2s_sdk.handler import ResumableUploadHandler
+from u2s_sdk.metrics import MetricsCollector
+from u2s_sdk.retry import RetryPolicy
+
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(value: str):
+    """
+    Parse a size with an optional K, M or G suffix.
+
+    :param value: The size (e.g. "64M")
+    :return: The size (in bytes)
+    """
+    value = value.strip().upper()
+    if value and value[-1] in UNITS:
+        return int(float(value[:-1]) * UNITS[value[-1]])
+    return int(value)
+
+
+def get_peak_rss():
+    """
+    Get the peak resident memory of the current process.
+
+    :return: The peak RSS (in bytes)
+    """
+    # ru_maxrss survives exec on Linux, the VmHWM of the process image does not
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_upload(base_url: str, file_path: str, chunk_size: int, concurrency: int):
+    """
+    Upload a file.
+
+    :return: The number of bytes sent and whether the upload succeeded
+    """
+    metrics = MetricsCollector()
+    with ApiClient(base_url, pool_maxsize=max(concurrency, 10), hooks=[metrics],
+                   retry_policy=RetryPolicy(max_retries=10, backoff_factor=0.01)) as client:
+        handler = ResumableUploadHandler(client)
+        with open(file_path, 'rb') as file:
+            if concurrency > 1:
+                ok = handler.parallel_chunk_upload(file, chunk_size, filename='bench.bin', max_workers=concurrency)
+            else:
+                ok = handler.simulate_chunk_upload(file, chunk_size, filename='bench.bin')
+    return os.path.getsize(file_path), bool(ok), metrics
+
+
+def run_download(base_url: str, file_id: int, chunk_size: int, concurrency: int):
+    """
+    Download a file.
+
+    :return: The number of bytes received and whether the download succeeded
+    """
+    metrics = MetricsCollector()
+    with ApiClient(base_url, pool_maxsize=max(concurrency, 10), hooks=[metrics],
+                   retry_policy=RetryPolicy(max_retries=10, backoff_factor=0.01)) as client:
+        with tempfile.TemporaryDirectory() as directory:
+            dest = os.path.join(directory, 'download.bin')
+            ok = FileHandler(client).download(file_id, dest, part_size=chunk_size, max_workers=concurrency)
+            size = os.path.getsize(dest) if ok else 0
+    return size, ok, metrics
+
+
+def run_list(base_url: str, chunk_size: int, concurrency: int):
+    """
+    Walk the whole file listing.
+
+    :return: The number of records and whether the listing succeeded
+    """
+    metrics = MetricsCollector()
+    with ApiClient(base_url, hooks=[metrics], retry_policy=RetryPolicy(max_retries=10, backoff_factor=0.01)) as client:
+        records = sum(1 for _ in FileHandler(client).iter_list(limit=100, prefetch=concurrency > 1))
+    return records, True, metrics
+
+
+CASES = {
+    'upload': run_upload,
+    'download': run_download,
+    'list': run_list,
+}
+
+
+def _run_case(kind: str, args: tuple, connection):
+    """
+    Run a benchmark case and report its measures, in a child process.
+
+    :meta private:
+    """
+    started_at = time.perf_counter()
+    amount, ok, metrics = CASES[kind](*args)
+    elapsed = time.perf_counter() - started_at
+    snapshot = metrics.snapshot()
+
+    connection.send({
+        'ok': ok,
+        'seconds': elapsed,
+        'amount': amount,
+        'throughput': amount / elapsed if elapsed and kind != 'list' else None,
+        'requests': snapshot['requests'],
+        'requests_per_second': snapshot['requests'] / elapsed if elapsed else None,
+        'retries': snapshot['retries'],
+        'request_p50': snapshot['request_duration']['p50'],
+        'request_p99': snapshot['request_duration']['p99'],
+        'peak_rss': get_peak_rss(),
+    })
+    connection.close()
+
+
+def run_case(kind: str, *args):
+    """
+    Run a benchmark case in a fresh process.
+
+    :param kind: The case (upload|download|list)
+    :param args: The case arguments
+    :return: The measures, with ok False and the exit code if the process died without reporting them
+    """
+    context = multiprocessing.get_context('spawn')
+    reader, writer = context.Pipe(duplex=False)
+    process = context.Process(target=_run_case, args=(kind, args, writer))
+    started_at = time.perf_counter()
+    process.start()
+    # Only the child holds the write end now, so its exit is seen as the end of the pipe
+    writer.close()
+
+    result = None
+    try:
+        multiprocessing.connection.wait([reader, process.sentinel])
+        if reader.poll():
+            result = reader.recv()
+    except EOFError:
+        pass
+    finally:
+        reader.close()
+    process.join()
+
+    if result is None:
+        print(f'{kind} case failed, exit code {process.exitcode}', file=sys.stderr)
+        result = {
+            'ok': False,
+            'exitcode': process.exitcode,
+            'seconds': time.perf_counter() - started_at,
+            'amount': 0,
+            'throughput': None,
+            'requests': 0,
+            'requests_per_second': None,
+            'retries': 0,
+            'request_p50': None,
+            'request_p99': None,
+            'peak_rss': 0,
+        }
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the SDK against a local mock server.')
+    parser.add_argument('--size', default='32M', help='The size of the uploaded and downloaded file (default: 32M)')
+    parser.add_argument('--chunk-sizes', default='1M,4M,16M', help='The chunk and range sizes (default: 1M,4M,16M)')
+    parser.add_argument('--concurrency', default='1,4,8', help='The concurrency levels (default: 1,4,8)')
+    parser.add_argument('--latency', type=float, default=0.0, help='The latency added per request (in seconds)')
+    parser.add_argument('--bandwidth', default=None, help='The server bandwidth (e.g. 100M, per second)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='The rate of injected 503 responses')
+    parser.add_argument('--files', type=int, default=1000, help='The number of listed files (default: 1000)')
+    parser.add_argument('--cases', default='upload,download,list', help='The cases to run')
+    parser.add_argument('--seed', type=int, default=0, help='The seed of the error injection')
+    parser.add_argument('--json', dest='json_path', help='Write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    size = parse_size(args.size)
+    chunk_sizes = [parse_size(value) for value in args.chunk_sizes.split(',')]
+    levels = [int(value) for value in args.concurrency.split(',')]
+    cases = args.cases.split(',')
+    bandwidth = parse_size(args.bandwidth) if args.bandwidth else None
+
+    results = []
+    server = MockServer(latency=args.latency, bandwidth=bandwidth, error_rate=args.error_rate, files=args.files,
+                        file_size=size, store=False, seed=args.seed)
+    with server, tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, 'upload.bin')
+        with open(file_path, 'wb') as file:
+            for offset in range(0, size, 1024 ** 2):
+                file.write(os.urandom(min(1024 ** 2, size - offset)))
+
+        print(f'{"case":<10}{"chunk":>10}{"workers":>9}{"seconds":>10}{"MB/s":>10}{"req/s":>10}{"retries":>9}'
+              f'{"p99 ms":>10}{"peak RSS MB":>13}  ok')
+        for kind in cases:
+            for chunk_size in (chunk_sizes if kind != 'list' else [0]):
+                for concurrency in levels:
+                    if kind == 'upload':
+                        case_args = (server.url, file_path, chunk_size, concurrency)
+                    elif kind == 'download':
+                        case_args = (server.url, 1, chunk_size, concurrency)
+                    else:
+                        case_args = (server.url, chunk_size, concurrency)
+
+                    result = run_case(kind, *case_args)
+                    result.update({'case': kind, 'chunk_size': chunk_size, 'concurrency': concurrency})
+                    results.append(result)
+
+                    throughput = result['throughput'] / 1024 ** 2 if result['throughput'] else 0
+                    p99 = (result['request_p99'] or 0) * 1000
+                    chunk = f'{chunk_size // 1024}K' if chunk_size else '-'
+                    print(f'{kind:<10}{chunk:>10}{concurrency:>9}{result["seconds"]:>10.2f}'
+                          f'{throughput:>10.1f}{result["requests_per_second"] or 0:>10.1f}{result["retries"]:>9}'
+                          f'{p99:>10.1f}{result["peak_rss"] / 1024 ** 2:>13.1f}  {result["ok"]}')
+
+    if args.json_path:
+        with open(args.json_path, 'w') as file:
+            json.dump({'parameters': vars(args), 'results': results}, file, indent=2)
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
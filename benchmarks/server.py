@@ -0,0 +1,367 @@
+"""
+Mock Up2Share server.
+
+benchmarks.server
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from u2s_sdk.ratelimit import TokenBucket
+
+BLOCK_SIZE = 65536
+
+
+def get_content(file_id: int, start: int, end: int):
+    """
+    Get a byte range of the deterministic content of a generated file.
+
+    :param file_id: The file ID
+    :param start: The start position of the range (0-based)
+    :param end: The end position of the range (0-based, inclusive)
+    :return: The content of the range
+    """
+    pattern = hashlib.sha256(str(file_id).encode()).digest() * 8
+    offset = start % len(pattern)
+    length = end - start + 1
+    return (pattern * ((offset + length) // len(pattern) + 1))[offset:offset + length]
+
+
+class _Upload:
+    """
+    The state of a resumable upload.
+
+    :meta private:
+    """
+    def __init__(self, filename: str, size, store: bool):
+        self.filename = filename
+        self.size = size
+        self.content = bytearray(size) if store and size is not None else (bytearray() if store else None)
+        self.ranges = []
+        self.file_id = None
+
+    def add_range(self, start: int, end: int):
+        self.ranges.append((start, end))
+        self.ranges.sort()
+        merged = []
+        for range_start, range_end in self.ranges:
+            if merged and range_start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+            else:
+                merged.append((range_start, range_end))
+        self.ranges = merged
+
+    @property
+    def committed(self):
+        """
+        The number of contiguous bytes received from the start of the upload.
+        """
+        if self.ranges and self.ranges[0][0] == 0:
+            return self.ranges[0][1] + 1
+        return 0
+
+
+class MockServer:
+    """
+    Local stand-in for the Up2Share API, for benchmarks and integration tests.
+
+    Implements the resumable upload protocol (201 Location, 308 Range, 201 finalize), download
+    tokens, ranged raw downloads, file updates and the paginated file listing. Latency, bandwidth and error rate
+    can be injected.
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, bandwidth=None, error_rate=0.0, files=0,
+                 file_size=1048576, store=True, seed=None, error_methods=('GET', 'PUT')):
+        """
+        Constructor.
+
+        :param host: The listening host (default: 127.0.0.1)
+        :param port: The listening port (default: 0, any free port)
+        :param latency: The delay added before each response (in seconds)
+        :param bandwidth: The bandwidth shared by every request and response body (in bytes per second,
+            default: unlimited)
+        :param error_rate: The probability of answering a request with a 503 (default: 0)
+        :param files: The number of generated files available for listing and download (default: 0)
+        :param file_size: The size of the generated files (in bytes, default: 1 MB)
+        :param store: Keep the uploaded content, so it can be downloaded and checked (default: True)
+        :param seed: The seed of the error injection
+        :param error_methods: The methods whose requests may fail (default: GET and PUT, which the client can retry)
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_methods = error_methods
+        self.store = store
+        self.bandwidth = TokenBucket(bandwidth, capacity=BLOCK_SIZE) if bandwidth else None
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.uploads = {}
+        self.files = {}
+        self.requests = 0
+        self.errors = 0
+        for _ in range(files):
+            self._add_file(f'file{len(self.files) + 1}.bin', file_size, None)
+
+        self.httpd = ThreadingHTTPServer((host, port), self._get_handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        The base URL of the server.
+        """
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """
+        Serve in a background thread.
+
+        :return: The server
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving.
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_file_content(self, file_id: int, start=0, end=None):
+        """
+        Get the content of a file.
+
+        :param file_id: The file ID
+        :param start: The start position of the range (default: 0)
+        :param end: The end position of the range (0-based, inclusive, default: the end of the file)
+        :return: The content
+        """
+        file = self.files[file_id]
+        if end is None:
+            end = file['size'] - 1
+        if file['content'] is not None:
+            return bytes(file['content'][start:end + 1])
+        return get_content(file_id, start, end)
+
+    def _add_file(self, filename: str, size: int, content):
+        """
+        Add a file, the lock must be held (or the server not started).
+
+        :meta private:
+        """
+        file_id = len(self.files) + 1
+        self.files[file_id] = {'id': file_id, 'filename': filename, 'size': size, 'content': content}
+        return file_id
+
+    def _get_handler_class(self):
+        """
+        Get the request handler class bound to this server.
+
+        :meta private:
+        """
+        server = self
+
+        class Handler(_RequestHandler):
+            mock = server
+
+        return Handler
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the mock server.
+
+    :meta private:
+    """
+    protocol_version = 'HTTP/1.1'
+    mock: MockServer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method: str):
+        mock = self.mock
+        body = self._read_body()
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        with mock.lock:
+            mock.requests += 1
+            fail = method in mock.error_methods and mock.error_rate and mock.random.random() < mock.error_rate
+            if fail:
+                mock.errors += 1
+
+        if mock.latency:
+            time.sleep(mock.latency)
+
+        if fail:
+            return self._send(503, {'message': 'Injected error'}, {'Retry-After': '0'})
+
+        path = url.path.rstrip('/')
+        if method == 'POST' and path == '/files':
+            return self._start_upload(body)
+        if method == 'PUT' and path == '/files' and 'key' in query:
+            return self._upload_chunk(query['key'], body)
+        if method == 'GET' and path == '/files':
+            return self._list(query)
+
+        match = re.fullmatch(r'/files/(\d+)(/downloadtoken|/raw)?', path)
+        if match and int(match.group(1)) in mock.files:
+            file_id, action = int(match.group(1)), match.group(2)
+            if method == 'GET' and action == '/downloadtoken':
+                return self._send(200, {'token': 't', 'dl-token': 'd', 'dl-expiry': int(time.time()) + 3600})
+            if method == 'GET' and action == '/raw':
+                return self._raw(file_id)
+            if method == 'PUT' and action is None:
+                return self._update(file_id, body)
+            if method == 'DELETE' and action is None:
+                with mock.lock:
+                    del mock.files[file_id]
+                return self._send(204)
+
+        return self._send(404, {'message': 'Not found'})
+
+    def _start_upload(self, body: bytes):
+        mock = self.mock
+        filename = json.loads(body or b'{}').get('filename', 'upload.bin')
+        size = self.headers.get('X-Upload-Content-Length')
+        size = int(size) if size and size.isdigit() else None
+
+        with mock.lock:
+            key = f'u{len(mock.uploads) + 1}'
+            mock.uploads[key] = _Upload(filename, size, mock.store)
+
+        return self._send(201, {}, {'Location': f'{mock.url}/files?key={key}'})
+
+    def _upload_chunk(self, key: str, body: bytes):
+        mock = self.mock
+        match = re.fullmatch(r'bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)', self.headers.get('Content-Range', ''))
+        with mock.lock:
+            upload = mock.uploads.get(key)
+        if upload is None or match is None:
+            return self._send(400, {'message': 'Invalid upload'})
+
+        total = match.group(3)
+        with mock.lock:
+            if total != '*':
+                upload.size = int(total)
+            if match.group(1) is not None:
+                start, end = int(match.group(1)), int(match.group(2))
+                if end - start + 1 != len(body):
+                    return self._send(400, {'message': 'Content-Range does not match the body'})
+                if upload.content is not None:
+                    if len(upload.content) < end + 1:
+                        upload.content.extend(bytes(end + 1 - len(upload.content)))
+                    upload.content[start:end + 1] = body
+                upload.add_range(start, end)
+
+            committed = upload.committed
+            if upload.size is not None and committed >= upload.size:
+                if upload.file_id is None:
+                    content = upload.content[:upload.size] if upload.content is not None else None
+                    upload.file_id = mock._add_file(upload.filename, upload.size, content)
+                headers = {'Location': f'{mock.url}/files/{upload.file_id}'}
+                if upload.content is not None:
+                    headers['ETag'] = f'"{hashlib.md5(upload.content[:upload.size]).hexdigest()}"'
+                return self._send(201, {'id': upload.file_id}, headers)
+
+        headers = {'Range': f'bytes=0-{committed - 1}'} if committed else {}
+        return self._send(308, None, headers)
+
+    def _update(self, file_id: int, body: bytes):
+        data = json.loads(body or b'{}')
+        with self.mock.lock:
+            file = self.mock.files[file_id]
+            file.update({key: value for key, value in data.items()
+                         if key in ('filename', 'description', 'visibility', 'metadata')})
+            return self._send(200, {key: value for key, value in file.items() if key != 'content'})
+
+    def _list(self, query: dict):
+        mock = self.mock
+        limit = int(query.get('limit', 100))
+        page = int(query.get('page', 1))
+        with mock.lock:
+            files = [{'id': file['id'], 'filename': file['filename'], 'size': file['size']}
+                     for file in mock.files.values()]
+
+        last_page = max((len(files) + limit - 1) // limit, 1)
+        data = {
+            'data': files[(page - 1) * limit:page * limit],
+            'meta': {'pagination': {'total': len(files), 'current_page': page, 'per_page': limit,
+                                    'total_pages': last_page}},
+        }
+        return self._send(200, data)
+
+    def _raw(self, file_id: int):
+        size = self.mock.files[file_id]['size']
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match is None:
+            return self._send_bytes(200, self.mock.get_file_content(file_id), {})
+
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+        if start > end:
+            return self._send(416, {'message': 'Range not satisfiable'}, {'Content-Range': f'bytes */{size}'})
+        content = self.mock.get_file_content(file_id, start, end)
+        return self._send_bytes(206, content, {'Content-Range': f'bytes {start}-{end}/{size}'})
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        blocks = []
+        while length > 0:
+            block = self.rfile.read(min(length, BLOCK_SIZE))
+            if not block:
+                break
+            self._throttle(len(block))
+            blocks.append(block)
+            length -= len(block)
+        return b''.join(blocks)
+
+    def _throttle(self, nbytes: int):
+        if self.mock.bandwidth is not None:
+            self.mock.bandwidth.acquire(nbytes)
+
+    def _send(self, status_code: int, data=None, headers=None):
+        body = json.dumps(data).encode() if data is not None else b''
+        self._send_bytes(status_code, body, {'Content-Type': 'application/json', **(headers or {})})
+
+    def _send_bytes(self, status_code: int, body: bytes, headers: dict):
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        view = memoryview(body)
+        for offset in range(0, len(body), BLOCK_SIZE):
+            block = view[offset:offset + BLOCK_SIZE]
+            self._throttle(len(block))
+            self.wfile.write(block)
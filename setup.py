@@ -11,4 +11,9 @@ setup(
     author_email='contact+python@up2sha.re',
     packages=find_packages(),
     install_requires=requirements,
+    extras_require={
+        'async': ['httpx'],
+        'crc32c': ['crc32c'],
+        'zstd': ['zstandard'],
+    },
 )
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from u2s_sdk.async_client import AsyncApiClient
+from u2s_sdk.retry import RetryPolicy
+
+@pytest.fixture
+def client():
+    return AsyncApiClient(base_url='https://test-api.com')
+
+def test_get_headers_api_key():
+    client = AsyncApiClient(base_url='https://test-api.com', api_key='test_key')
+    headers = client.get_headers()
+    assert headers['X-Api-Key'] == 'test_key'
+    assert 'Authorization' not in headers
+
+def test_session_pool_limits():
+    client = AsyncApiClient(base_url='https://test-api.com', max_connections=50, keepalive_expiry=30)
+    session = client.get_session()
+    assert isinstance(session, httpx.AsyncClient)
+    assert client.get_session() is session
+    asyncio.run(client.aclose())
+
+def test_get_request_successful(client, mocker):
+    request = httpx.Request('GET', 'https://test-api.com/test')
+    mock_request = mocker.patch('httpx.AsyncClient.request', return_value=httpx.Response(200, request=request))
+
+    response = asyncio.run(client.get('/test', params={'search': None, 'limit': 10}))
+
+    assert response.status_code == 200
+    assert mock_request.call_args.kwargs['params'] == {'limit': 10}
+
+def test_resumable_progress_is_not_an_error(client, mocker):
+    request = httpx.Request('PUT', 'https://test-api.com/upload')
+    mocker.patch('httpx.AsyncClient.request', return_value=httpx.Response(308, request=request))
+
+    response = asyncio.run(client.put('/upload', data=b'data'))
+
+    assert response.status_code == 308
+
+def test_get_request_exception(client, mocker):
+    mocker.patch('httpx.AsyncClient.request', side_effect=httpx.ConnectError('Test error'))
+
+    assert asyncio.run(client.get('/test')) is None
+
+def test_context_manager_closes_session():
+    async def use_client():
+        async with AsyncApiClient(base_url='https://test-api.com') as client:
+            session = client.get_session()
+        return client, session
+
+    client, session = asyncio.run(use_client())
+
+    assert session.is_closed
+    assert client._session is None
+
+def test_transient_errors_are_retried(mocker):
+    mocker.patch('asyncio.sleep')
+    client = AsyncApiClient(base_url='https://test-api.com', retry_policy=RetryPolicy(max_retries=3))
+    request = httpx.Request('PUT', 'https://test-api.com/upload')
+    mock_request = mocker.patch('httpx.AsyncClient.request', side_effect=[
+        httpx.ReadTimeout('Timeout'),
+        httpx.Response(503, request=request),
+        httpx.Response(308, request=request),
+    ])
+
+    response = asyncio.run(client.put('/upload', data=b'data'))
+
+    assert response.status_code == 308
+    assert mock_request.call_count == 3
@@ -0,0 +1,145 @@
+import io
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from u2s_sdk.async_client import AsyncApiClient
+from u2s_sdk.async_handler import AsyncResumableUploadHandler
+from u2s_sdk.async_file import AsyncFileHandler
+from u2s_sdk.cache import DownloadTokenCache
+
+@pytest.fixture
+def client():
+    return AsyncApiClient(base_url='https://test-api.com')
+
+def test_start_upload_successful(client, mocker):
+    mocker.patch.object(client, 'post', return_value=mocker.Mock(status_code=201, headers={'Location': '/upload?key=123'}))
+
+    handler = AsyncResumableUploadHandler(client)
+    location_uri, upload_key = asyncio.run(handler.start_upload('test.txt', 1024))
+
+    assert location_uri == '/upload?key=123'
+    assert upload_key == '123'
+
+def test_upload_chunk_failed(client, mocker):
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=400))
+
+    handler = AsyncResumableUploadHandler(client)
+
+    with pytest.raises(Exception, match=r'Failed to upload chunk\. Status code: 400'):
+        asyncio.run(handler.upload_chunk('/upload?key=123', 1024, b'data', 0, 3))
+
+def test_simulate_chunk_upload(client, mocker):
+    handler = AsyncResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mock_upload_chunk = mocker.patch.object(handler, 'upload_chunk', side_effect=[False, {'Location': '/files/1'}])
+
+    result = asyncio.run(handler.simulate_chunk_upload(io.BytesIO(b'0123456'), chunk_size=4))
+
+    assert result == {'Location': '/files/1'}
+    assert [call.args[2:] for call in mock_upload_chunk.call_args_list] == [(b'0123', 0, 3), (b'456', 4, 6)]
+
+def test_parallel_chunk_upload(client, mocker):
+    handler = AsyncResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    received = {}
+
+    async def upload_chunk(upload_uri, total_size, chunk_data, chunk_start, chunk_end):
+        await asyncio.sleep(0)
+        received[chunk_start] = chunk_data
+        return {'Location': '/files/1'} if chunk_end == total_size - 1 else False
+
+    mocker.patch.object(handler, 'upload_chunk', side_effect=upload_chunk)
+
+    data = bytes(range(100))
+    result = asyncio.run(handler.parallel_chunk_upload(io.BytesIO(data), chunk_size=8, max_workers=4))
+
+    assert result == {'Location': '/files/1'}
+    assert b''.join(received[offset] for offset in sorted(received)) == data
+
+def test_parallel_chunk_upload_empty_file(client, mocker):
+    handler = AsyncResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=201, headers={'Location': '/files/1'}))
+
+    result = asyncio.run(handler.parallel_chunk_upload(io.BytesIO(b''), chunk_size=1024))
+
+    assert result == {'Location': '/files/1'}
+    assert client.put.call_args.kwargs['headers']['Content-Range'] == 'bytes */0'
+
+def test_stream_upload(client, mocker):
+    handler = AsyncResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mock_upload_chunk = mocker.patch.object(handler, 'upload_chunk', side_effect=[False, {'Location': '/files/1'}])
+
+    async def blocks():
+        yield b'01'
+        yield b'23456'
+
+    result = asyncio.run(handler.stream_upload(blocks(), chunk_size=4))
+
+    assert result == {'Location': '/files/1'}
+    assert [call.args[1:] for call in mock_upload_chunk.call_args_list] == [(None, b'0123', 0, 3), (7, b'456', 4, 6)]
+
+def test_file_list(client, mocker):
+    mock_get = mocker.patch.object(client, 'get', return_value=mocker.Mock(status_code=200, json=lambda: {'data': []}))
+
+    handler = AsyncFileHandler(client)
+
+    assert asyncio.run(handler.list(limit=10)) == {'data': []}
+    assert mock_get.call_args.kwargs['params']['limit'] == 10
+
+def test_file_delete(client, mocker):
+    mocker.patch.object(client, 'delete', return_value=mocker.Mock(status_code=204))
+
+    handler = AsyncFileHandler(client)
+
+    assert asyncio.run(handler.delete(1)) is True
+
+def test_file_iter_list_with_prefetch(client, mocker):
+    pages = {
+        1: {'data': [{'id': 1}, {'id': 2}], 'current_page': 1, 'last_page': 2},
+        2: {'data': [{'id': 3}], 'current_page': 2, 'last_page': 2},
+    }
+    mock_get = mocker.patch.object(client, 'get', side_effect=lambda endpoint, headers=None, params=None: mocker.Mock(
+        status_code=200, json=lambda: pages[params['page']]))
+
+    handler = AsyncFileHandler(client)
+
+    async def collect():
+        return [record['id'] async for record in handler.iter_list(limit=2, prefetch=True)]
+
+    assert asyncio.run(collect()) == [1, 2, 3]
+    assert mock_get.call_count == 2
+
+def test_file_bulk_delete(client, mocker):
+    handler = AsyncFileHandler(client)
+    mocker.patch.object(handler, 'delete', side_effect=lambda file_id: file_id % 2 == 0)
+
+    async def collect():
+        return {result.item: result.ok async for result in handler.bulk_delete(range(6), max_workers=2)}
+
+    assert asyncio.run(collect()) == {0: True, 1: False, 2: True, 3: False, 4: True, 5: False}
+
+def test_file_concurrent_download_tokens_share_one_request(client, mocker):
+    handler = AsyncFileHandler(client, token_cache=DownloadTokenCache())
+    calls = []
+
+    async def create_download_token(file_id):
+        calls.append(file_id)
+        await asyncio.sleep(0.01)
+        return {'token': 't', 'dl-token': 'd', 'dl-expiry': time.time() + 3600}
+
+    mocker.patch.object(handler, 'create_download_token', side_effect=create_download_token)
+
+    async def get_tokens():
+        return await asyncio.gather(*(handler.get_download_token(file_id) for file_id in (1, 1, 1, 2, 2)))
+
+    tokens = asyncio.run(get_tokens())
+
+    assert all(token_data is not None for token_data in tokens)
+    assert sorted(calls) == [1, 2]
+    assert handler._token_locks == {}
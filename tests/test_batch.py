@@ -0,0 +1,154 @@
+import hashlib
+import threading
+
+import pytest
+from u2s_sdk.batch import BatchUploadManager
+from u2s_sdk.client import ApiClient
+from u2s_sdk.dedup import DedupIndex
+from u2s_sdk.handler import ResumableUploadHandler
+
+@pytest.fixture
+def handler(mocker):
+    handler = ResumableUploadHandler(ApiClient(base_url='https://test-api.com'))
+    mocker.patch.object(handler, 'start_upload',
+                        side_effect=lambda filename, total_size: (f'/upload?key={filename}', filename))
+    return handler
+
+class FakeServer:
+    """
+    Records the uploaded chunks and the in-flight bytes, finalizing uploads once every byte is received.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received = {}
+        self.in_flight_bytes = 0
+        self.max_in_flight_bytes = 0
+
+    def upload_chunk(self, upload_uri, total_size, chunk_data, chunk_start, chunk_end, extra_headers=None):
+        with self.lock:
+            self.in_flight_bytes += len(chunk_data)
+            self.max_in_flight_bytes = max(self.max_in_flight_bytes, self.in_flight_bytes)
+        data = chunk_data.read()
+        with self.lock:
+            self.in_flight_bytes -= len(chunk_data)
+            chunks = self.received.setdefault(upload_uri, {})
+            chunks[chunk_start] = data
+            if sum(len(chunk) for chunk in chunks.values()) == total_size:
+                return {'Location': upload_uri}
+        return False
+
+    def finish_upload(self, upload_uri, total_size):
+        with self.lock:
+            self.received[upload_uri] = {}
+        return {'Location': upload_uri}
+
+    def content(self, upload_uri):
+        chunks = self.received[upload_uri]
+        return b''.join(chunks[offset] for offset in sorted(chunks))
+
+def write_tree(tmp_path):
+    files = {
+        'large.bin': b'L' * 1000,
+        'a/small1.txt': b'small one',
+        'a/small2.txt': b'small two',
+        'b/medium.bin': bytes(range(256)) * 2,
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return files
+
+def test_directory_upload(handler, mocker, tmp_path):
+    files = write_tree(tmp_path)
+    server = FakeServer()
+    mocker.patch.object(handler, 'upload_chunk', side_effect=server.upload_chunk)
+
+    manager = BatchUploadManager(handler, chunk_size=100, max_workers=4, max_in_flight_bytes=300)
+    assert manager.submit_directory(str(tmp_path)) == 4
+
+    results = list(manager.run())
+
+    assert sorted(result.filename for result in results) == sorted(files)
+    assert all(result.ok for result in results)
+    for name, content in files.items():
+        assert server.content(f'/upload?key={name}') == content
+    assert server.max_in_flight_bytes <= 300
+
+def test_small_files_are_not_stuck_behind_large_ones(handler, mocker, tmp_path):
+    for i in range(3):
+        (tmp_path / f'large{i}.bin').write_bytes(b'L' * 1000)
+    (tmp_path / 'small.txt').write_bytes(b'small')
+    server = FakeServer()
+    mocker.patch.object(handler, 'upload_chunk', side_effect=server.upload_chunk)
+
+    manager = BatchUploadManager(handler, chunk_size=100, max_workers=1, max_active_files=2)
+    for i in range(3):
+        manager.submit(str(tmp_path / f'large{i}.bin'))
+    manager.submit(str(tmp_path / 'small.txt'))
+
+    assert next(manager.run()).filename == 'small.txt'
+
+def test_failed_file_does_not_stop_the_batch(handler, mocker, tmp_path):
+    write_tree(tmp_path)
+    server = FakeServer()
+
+    def upload_chunk(upload_uri, *args):
+        if 'medium' in upload_uri:
+            raise Exception('Failed to upload chunk. Status code: 500')
+        return server.upload_chunk(upload_uri, *args)
+
+    mocker.patch.object(handler, 'upload_chunk', side_effect=upload_chunk)
+    mocker.patch.object(handler, 'finish_upload', side_effect=server.finish_upload)
+    (tmp_path / 'empty.txt').write_bytes(b'')
+
+    manager = BatchUploadManager(handler, chunk_size=100)
+    manager.submit_directory(str(tmp_path))
+
+    results = {result.filename: result for result in manager.run()}
+
+    assert not results['b/medium.bin'].ok
+    assert str(results['b/medium.bin'].error) == 'Failed to upload chunk. Status code: 500'
+    assert all(results[name].ok for name in ['empty.txt', 'large.bin', 'a/small1.txt', 'a/small2.txt'])
+    assert server.content('/upload?key=empty.txt') == b''
+
+def test_dedup_index_skips_uploaded_files(handler, mocker, tmp_path):
+    files = write_tree(tmp_path / 'tree')
+    server = FakeServer()
+
+    def upload_chunk(upload_uri, *args):
+        headers = server.upload_chunk(upload_uri, *args)
+        return headers and {'Location': f'https://test-api.com/files/{upload_uri.rpartition("=")[2]}'}
+
+    mocker.patch.object(handler, 'upload_chunk', side_effect=upload_chunk)
+    index = DedupIndex(str(tmp_path / 'index.json'))
+
+    manager = BatchUploadManager(handler, chunk_size=100, dedup_index=index, hash_workers=2)
+    manager.submit_directory(str(tmp_path / 'tree'))
+    results = list(manager.run())
+    assert not any(result.skipped for result in results)
+    assert sorted(result.file_id for result in results) == sorted(name.rpartition('/')[2] for name in files)
+
+    (tmp_path / 'tree' / 'a' / 'small1.txt').write_bytes(b'changed')
+    manager = BatchUploadManager(handler, chunk_size=100, dedup_index=DedupIndex(str(tmp_path / 'index.json')))
+    manager.submit_directory(str(tmp_path / 'tree'))
+    results = {result.filename: result for result in manager.run()}
+
+    assert not results['a/small1.txt'].skipped
+    assert all(results[name].skipped for name in ['large.bin', 'a/small2.txt', 'b/medium.bin'])
+    assert results['large.bin'].file_id == 'large.bin'
+
+def test_checksums_are_computed_while_uploading(handler, mocker, tmp_path):
+    files = write_tree(tmp_path)
+    server = FakeServer()
+    mocker.patch.object(handler, 'upload_chunk', side_effect=lambda *args: server.upload_chunk(*args[:5]))
+
+    manager = BatchUploadManager(handler, chunk_size=100, checksum_algorithms=('md5', 'sha256'))
+    manager.submit_directory(str(tmp_path))
+
+    for result in manager.run():
+        assert result.ok
+        assert result.checksums == {
+            'md5': hashlib.md5(files[result.filename]).hexdigest(),
+            'sha256': hashlib.sha256(files[result.filename]).hexdigest(),
+        }
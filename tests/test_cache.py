@@ -0,0 +1,131 @@
+import threading
+import time
+
+from u2s_sdk.cache import DownloadTokenCache, ResponseCache, parse_expiry
+from u2s_sdk.client import ApiClient
+from u2s_sdk.file import FileHandler
+
+def token(expiry, name='t'):
+    return {'token': name, 'dl-token': 'd', 'dl-expiry': expiry}
+
+def test_parse_expiry():
+    assert parse_expiry(1700000000) == 1700000000
+    assert parse_expiry('1700000000') == 1700000000
+    assert parse_expiry(1700000000000) == 1700000000
+    assert parse_expiry('2023-11-14T22:13:20Z') == 1700000000
+    assert parse_expiry('soon') is None
+    assert parse_expiry(None) is None
+
+def test_tokens_are_refreshed_before_expiry():
+    cache = DownloadTokenCache(refresh_margin=60)
+    cache.put(1, token(time.time() + 3600))
+    cache.put(2, token(time.time() + 30))
+    cache.put(3, token('never'))
+
+    assert cache.get(1)['token'] == 't'
+    assert cache.get(2) is None
+    assert cache.get(3) is None
+
+def test_least_recently_used_tokens_are_evicted():
+    cache = DownloadTokenCache(max_size=2)
+    expiry = time.time() + 3600
+    cache.put(1, token(expiry))
+    cache.put(2, token(expiry))
+    cache.get(1)
+    cache.put(3, token(expiry))
+
+    assert len(cache) == 2
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    cache.invalidate()
+    assert len(cache) == 0
+
+def test_concurrent_callers_share_one_request():
+    cache = DownloadTokenCache()
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def create(file_id):
+        calls.append(file_id)
+        time.sleep(0.05)
+        return token(time.time() + 3600)
+
+    def worker():
+        barrier.wait()
+        assert cache.get_or_create(1, create) is not None
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+
+def test_file_handler_reuses_cached_tokens(mocker):
+    cache = DownloadTokenCache()
+    handlers = [FileHandler(ApiClient(base_url='https://test-api.com'), token_cache=cache) for _ in range(2)]
+    for handler in handlers:
+        mocker.patch.object(handler, 'create_download_token', return_value=token(time.time() + 3600))
+
+    assert handlers[0].get_download_token(1) == handlers[1].get_download_token(1)
+    handlers[0].create_download_token.assert_called_once_with(1)
+    handlers[1].create_download_token.assert_not_called()
+
+def fake_listing(mocker, client, etag='"v1"'):
+    """
+    Fake ApiClient.get serving a JSON page, answering 304 when the If-None-Match validator matches.
+    """
+    parsed = []
+
+    def json():
+        parsed.append(1)
+        return {'data': [{'id': 1}]}
+
+    def get(endpoint, headers=None, params=None):
+        if (headers or {}).get('If-None-Match') == etag:
+            return mocker.Mock(status_code=304, headers={})
+        return mocker.Mock(status_code=200, headers={'ETag': etag}, json=json)
+
+    return mocker.patch.object(client, 'get', side_effect=get), parsed
+
+def test_list_reuses_the_parsed_page_on_not_modified(mocker):
+    client = ApiClient(base_url='https://test-api.com', response_cache=ResponseCache())
+    mock_get, parsed = fake_listing(mocker, client)
+    handler = FileHandler(client)
+
+    first = handler.list(search='a')
+    second = handler.list(search='a')
+
+    assert second is first
+    assert len(parsed) == 1
+    assert mock_get.call_args_list[1].kwargs['headers'] == {'If-None-Match': '"v1"'}
+
+    # Other parameters are another entry
+    handler.list(search='b')
+    assert len(parsed) == 2
+
+def test_response_cache_ttl_and_size():
+    cache = ResponseCache(max_size=2, ttl=60)
+    keys = [cache.get_key('https://test-api.com/files', {'page': page, 'search': None}) for page in range(3)]
+    for key in keys:
+        cache.put(key, {'ETag': '"v1"'}, {'data': []})
+
+    assert len(cache) == 2
+    assert cache.get_validators(keys[0]) == {}
+    assert cache.get_validators(keys[2]) == {'If-None-Match': '"v1"'}
+
+    cache.put(keys[2], {}, {'data': []})
+    assert cache.get_validators(keys[2]) == {}
+
+    cache.put(keys[1], {'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}, {'data': []})
+    cache._entries[keys[1]] = cache._entries[keys[1]][:3] + (time.monotonic() - 61,)
+    assert cache.get_validators(keys[1]) == {}
+
+def test_response_cache_keys_include_credentials():
+    key_a = ResponseCache.get_key('/files', headers={'X-Api-Key': 'a'})
+    assert key_a != ResponseCache.get_key('/files', headers={'X-Api-Key': 'b'})
+    assert ResponseCache.get_key('/files', {'a': 1, 'b': 2}) == ResponseCache.get_key('/files', {'b': 2, 'a': 1, 'c': None})
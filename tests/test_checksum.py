@@ -0,0 +1,130 @@
+import base64
+import hashlib
+import io
+
+import pytest
+from u2s_sdk.checksum import UploadChecksum, get_digest_header, parse_digest_header
+from u2s_sdk.client import ApiClient
+from u2s_sdk.handler import ResumableUploadHandler
+from u2s_sdk.stream import FileSlice
+
+CONTENT = bytes(range(256)) * 40
+
+def b64(digest):
+    return base64.b64encode(digest).decode()
+
+def test_digest_header_round_trip():
+    digests = {'md5': hashlib.md5(b'data').digest(), 'sha256': hashlib.sha256(b'data').digest()}
+    header = get_digest_header(digests)
+
+    assert header == f'MD5={b64(digests["md5"])}, SHA-256={b64(digests["sha256"])}'
+    assert parse_digest_header(header) == digests
+    assert parse_digest_header('unknown=abc') == {}
+    assert parse_digest_header(None) == {}
+
+def test_update_returns_chunk_headers_and_hashes_the_file():
+    checksum = UploadChecksum(('md5', 'sha256'), block_size=100)
+
+    for chunk_start in range(0, len(CONTENT), 1000):
+        chunk = FileSlice(CONTENT, chunk_start, min(1000, len(CONTENT) - chunk_start))
+        headers = checksum.update(chunk, chunk_start)
+        data = CONTENT[chunk_start:chunk_start + 1000]
+        assert headers['Content-MD5'] == b64(hashlib.md5(data).digest())
+        assert headers['Digest'] == f'MD5={b64(hashlib.md5(data).digest())}, SHA-256={b64(hashlib.sha256(data).digest())}'
+        # The chunk is rewound for the upload
+        assert chunk.tell() == 0
+
+    # A chunk sent again does not change the file checksums
+    checksum.update(CONTENT[:1000], 0)
+
+    assert checksum.hexdigests() == {'md5': hashlib.md5(CONTENT).hexdigest(), 'sha256': hashlib.sha256(CONTENT).hexdigest()}
+
+def test_skipped_bytes_disable_the_file_checksums():
+    checksum = UploadChecksum()
+    checksum.update(CONTENT[1000:2000], 1000)
+
+    assert checksum.digests() is None
+    assert checksum.verify({'ETag': f'"{hashlib.md5(CONTENT).hexdigest()}"'}) is False
+
+def test_chunks_are_hashed_as_they_are_read_without_chunk_headers(tmp_path):
+    path = tmp_path / 'content.bin'
+    path.write_bytes(CONTENT)
+    checksum = UploadChecksum(('md5', 'sha256'), chunk_headers=False, block_size=100)
+
+    with open(path, 'rb') as file:
+        chunks = [FileSlice(file.fileno(), chunk_start, min(4000, len(CONTENT) - chunk_start))
+                  for chunk_start in range(0, len(CONTENT), 4000)]
+
+        # Sequential upload: each chunk body is read once, by the transport
+        assert checksum.update(chunks[0], 0) == {}
+        assert chunks[0].read_duration == 0
+        assert chunks[0].read(1000) == CONTENT[:1000]
+        # A retried body is read again from the start
+        chunks[0].seek(0)
+        assert chunks[0].read() == CONTENT[:4000]
+
+        # Concurrent upload: the unread bytes of the previous chunk are read by the checksum
+        checksum.update(chunks[1], 4000)
+        assert chunks[1].read(500) == CONTENT[4000:4500]
+        late_read = chunks[1].on_read
+        checksum.update(chunks[2], 8000)
+        assert chunks[1].read() == CONTENT[4500:8000]
+        # A read that picked up the callback before it was detached is ignored
+        late_read(chunks[1], 0, CONTENT[4000:8000])
+        assert chunks[2].read() == CONTENT[8000:]
+
+        assert checksum.hexdigests() == {'md5': hashlib.md5(CONTENT).hexdigest(),
+                                         'sha256': hashlib.sha256(CONTENT).hexdigest()}
+
+def test_unsent_streamed_chunk_disables_the_file_checksums():
+    checksum = UploadChecksum(chunk_headers=False)
+    chunk = FileSlice(CONTENT, 0, 1000)
+    checksum.update(chunk, 0)
+    chunk.read(10)
+    chunk.close()
+
+    assert checksum.digests() is None
+
+def test_verify():
+    checksum = UploadChecksum(('md5', 'sha256'), chunk_headers=False)
+    assert checksum.update(CONTENT, 0) == {}
+
+    assert checksum.verify({'Digest': f'SHA-256={b64(hashlib.sha256(CONTENT).digest())}'}) is True
+    assert checksum.verify({'ETag': f'"{hashlib.md5(CONTENT).hexdigest()}"'}) is True
+    assert checksum.verify({'ETag': 'W/"1"'}) is False
+    with pytest.raises(Exception, match=r'Checksum mismatch \(md5\)'):
+        checksum.verify({'Content-MD5': b64(hashlib.md5(b'other').digest())})
+
+def test_unsupported_algorithm():
+    with pytest.raises(ValueError, match='Unsupported checksum algorithm: sha1'):
+        UploadChecksum(('sha1',))
+
+def test_upload_sends_checksums_and_verifies_the_final_response(mocker):
+    handler = ResumableUploadHandler(ApiClient(base_url='https://test-api.com'))
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    sent = []
+
+    def put(upload_uri, data=None, headers=None):
+        sent.append((data.read(), headers))
+        final = len(sent) == 3
+        response_headers = {'Location': '/files/1', 'ETag': f'"{hashlib.md5(CONTENT).hexdigest()}"'} if final else {}
+        return mocker.Mock(status_code=201 if final else 308, headers=response_headers, text='')
+
+    mocker.patch.object(handler.api_client, 'put', side_effect=put)
+
+    checksum = UploadChecksum()
+    result = handler.parallel_chunk_upload(io.BytesIO(CONTENT), chunk_size=4000, max_workers=1, checksum=checksum)
+
+    assert result['Location'] == '/files/1'
+    for data, headers in sent:
+        assert headers['Content-MD5'] == b64(hashlib.md5(data).digest())
+    assert checksum.hexdigests() == {'md5': hashlib.md5(CONTENT).hexdigest()}
+
+def test_upload_fails_on_checksum_mismatch(mocker):
+    handler = ResumableUploadHandler(ApiClient(base_url='https://test-api.com'))
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mocker.patch.object(handler.api_client, 'put', return_value=mocker.Mock(
+        status_code=201, headers={'Content-MD5': b64(hashlib.md5(b'other').digest())}, text='',
+    ))
+
+    assert handler.simulate_chunk_upload(io.BytesIO(CONTENT), checksum=UploadChecksum()) is False
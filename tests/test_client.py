@@ -1,5 +1,9 @@
+import io
+import time
+
 import pytest
 from u2s_sdk.client import ApiClient
+from u2s_sdk.retry import RetryPolicy
 import requests.exceptions
 
 @pytest.fixture
@@ -24,18 +28,101 @@ def test_get_headers_oauth_token():
     assert headers['Authorization'] == 'Bearer test_token'
 
 def test_get_request_successful(client, mocker):
-    # Mock the requests.get method
-    mock_get = mocker.patch('requests.get')
+    # Mock the pooled session request method
+    mock_request = mocker.patch('requests.Session.request')
     mock_response = mocker.MagicMock()
     mock_response.status_code = 200
-    mock_get.return_value = mock_response
+    mock_request.return_value = mock_response
 
     response = client.get('/test')
     assert response.status_code == 200
 
 def test_get_request_exception(client, mocker):
-    # Mock the requests.get method to raise an exception
-    mocker.patch('requests.get', side_effect=requests.exceptions.RequestException('Test error'))
+    # Mock the pooled session request method to raise an exception
+    mocker.patch('requests.Session.request', side_effect=requests.exceptions.RequestException('Test error'))
 
     response = client.get('/test')
     assert response is None
+
+def test_get_error_status_without_raise_for_status(client, mocker):
+    mock_response = mocker.MagicMock(status_code=404)
+    mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError('404 Client Error')
+    mocker.patch('requests.Session.request', return_value=mock_response)
+
+    assert client.get('/test') is None
+    assert client.get('/test', raise_for_status=False) is mock_response
+
+def test_session_is_reused(client, mocker):
+    mock_request = mocker.patch('requests.Session.request', return_value=mocker.MagicMock(status_code=200))
+
+    client.get('/test')
+    session = client.get_session()
+    client.put('/test', data=b'data')
+
+    assert client.get_session() is session
+    assert mock_request.call_count == 2
+
+def test_session_pool_configuration():
+    client = ApiClient(base_url='https://test-api.com', pool_connections=2, pool_maxsize=20, pool_block=True)
+    adapter = client.get_session().get_adapter('https://test-api.com')
+
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 20
+    assert adapter._pool_block is True
+
+def test_session_without_keep_alive():
+    client = ApiClient(base_url='https://test-api.com', keep_alive=False)
+    assert client.get_session().headers['Connection'] == 'close'
+
+def test_idle_connections_are_evicted(mocker):
+    client = ApiClient(base_url='https://test-api.com', idle_timeout=30)
+    adapter = client.get_session().get_adapter('https://test-api.com')
+    mock_close = mocker.patch.object(adapter, 'close')
+
+    client._last_used -= 60
+    client.get_session()
+
+    mock_close.assert_called()
+
+def test_context_manager_closes_session():
+    with ApiClient(base_url='https://test-api.com') as client:
+        session = client.get_session()
+
+    assert client._session is None
+    assert client.get_session() is not session
+
+@pytest.fixture
+def retry_client(mocker):
+    mocker.patch('time.sleep')
+    return ApiClient(base_url='https://test-api.com', retry_policy=RetryPolicy(max_retries=2))
+
+def test_transient_status_is_retried(retry_client, mocker):
+    responses = [mocker.MagicMock(status_code=502, headers={}), mocker.MagicMock(status_code=308, headers={})]
+    mock_request = mocker.patch('requests.Session.request', side_effect=responses)
+    body = io.BytesIO(b'data')
+
+    response = retry_client.put('/upload', data=body, headers={'Content-Range': 'bytes 0-3/8'})
+
+    assert response.status_code == 308
+    assert mock_request.call_count == 2
+    assert responses[0].close.called
+    assert body.tell() == 0
+
+def test_connection_error_is_retried_until_exhausted(retry_client, mocker):
+    mock_request = mocker.patch('requests.Session.request', side_effect=requests.exceptions.ConnectionError('Reset'))
+
+    assert retry_client.get('/test') is None
+    assert mock_request.call_count == 3
+
+def test_post_is_not_retried(retry_client, mocker):
+    mock_request = mocker.patch('requests.Session.request', side_effect=requests.exceptions.ConnectionError('Reset'))
+
+    assert retry_client.post('/files', data='{}') is None
+    assert mock_request.call_count == 1
+
+def test_retry_after_is_honored(retry_client, mocker):
+    responses = [mocker.MagicMock(status_code=429, headers={'Retry-After': '3'}), mocker.MagicMock(status_code=200)]
+    mocker.patch('requests.Session.request', side_effect=responses)
+
+    assert retry_client.get('/test').status_code == 200
+    time.sleep.assert_called_once_with(3.0)
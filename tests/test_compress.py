@@ -0,0 +1,45 @@
+import io
+import gzip
+
+import pytest
+from u2s_sdk.compress import CompressionStage, compress_block
+
+DATA = b''.join(b'line %d of a very repetitive log file\n' % i for i in range(20000))
+
+def test_compress_block_is_self_contained():
+    compressed = compress_block(DATA[:1000], 'gzip') + compress_block(DATA[1000:], 'gzip')
+
+    # Concatenated gzip members decompress as one stream
+    assert gzip.decompress(compressed) == DATA
+
+def test_compression_stage_serial():
+    stage = CompressionStage(block_size=4096)
+
+    compressed = b''.join(stage.iter_compress(io.BytesIO(DATA)))
+
+    assert gzip.decompress(compressed) == DATA
+    assert stage.original_size == len(DATA)
+    assert stage.compressed_size == len(compressed)
+    assert stage.ratio > 5
+    assert stage.get_metadata() == {
+        'content_encoding': 'gzip', 'original_size': len(DATA), 'compressed_size': len(compressed),
+    }
+
+def test_compression_stage_parallel_keeps_order():
+    stage = CompressionStage(block_size=65536, workers=3)
+    blocks = (DATA[offset:offset + 1000] for offset in range(0, len(DATA), 1000))
+
+    compressed = b''.join(stage.iter_compress(blocks))
+
+    assert gzip.decompress(compressed) == DATA
+    assert stage.original_size == len(DATA)
+
+def test_unsupported_codec():
+    with pytest.raises(ValueError, match='Unsupported compression codec: lz4'):
+        CompressionStage('lz4')
+
+def test_zstd_requires_zstandard(mocker):
+    mocker.patch('u2s_sdk.compress.zstandard', None)
+
+    with pytest.raises(ImportError, match='zstandard'):
+        CompressionStage('zstd')
@@ -0,0 +1,52 @@
+import hashlib
+import os
+
+import pytest
+from u2s_sdk.dedup import DedupIndex, hash_file
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f'file{i}.bin'
+        path.write_bytes(bytes([i]) * (1000 * (i + 1)))
+        paths.append(str(path))
+    return paths
+
+def test_hash_file_streams_blocks(tmp_path):
+    path = tmp_path / 'file.bin'
+    content = os.urandom(10000)
+    path.write_bytes(content)
+
+    assert hash_file(str(path), block_size=1024) == hashlib.sha256(content).hexdigest()
+    assert hash_file(str(path), 'md5') == hashlib.md5(content).hexdigest()
+
+def test_hash_files_reuses_unchanged_hashes(files, mocker, tmp_path):
+    index = DedupIndex(str(tmp_path / 'index.json'))
+    hashes = index.hash_files(files, max_workers=2)
+    assert hashes == {path: hash_file(path) for path in files}
+    index.save()
+
+    # A reloaded index only hashes the changed file again
+    with open(files[0], 'wb') as file:
+        file.write(b'changed')
+    index = DedupIndex(str(tmp_path / 'index.json'))
+    assert index.get_hash(files[0]) is None
+    assert index.get_hash(files[1]) == hashes[files[1]]
+    hashes = index.hash_files(files, max_workers=2)
+    assert hashes[files[0]] == hashlib.sha256(b'changed').hexdigest()
+
+def test_find_remote_and_sync_remote(files, mocker):
+    index = DedupIndex()
+    hashes = index.hash_files(files)
+    index.add_remote(hashes[files[0]], 'abc', 'file0.bin')
+    index.add_remote(hashes[files[1]], 'def', 'file1.bin')
+
+    assert index.find_remote(hashes[files[0]]) == 'abc'
+    assert index.find_remote(hashes[files[2]]) is None
+
+    file_handler = mocker.Mock()
+    file_handler.iter_list.return_value = iter([{'id': 'abc'}, {'id': 'xyz'}])
+    assert index.sync_remote(file_handler) == 1
+    assert index.find_remote(hashes[files[0]]) == 'abc'
+    assert index.find_remote(hashes[files[1]]) is None
@@ -0,0 +1,195 @@
+import pytest
+from u2s_sdk.client import ApiClient
+from u2s_sdk.file import FileHandler
+from u2s_sdk.retry import RetryPolicy
+
+CONTENT = bytes(range(256)) * 40
+
+@pytest.fixture
+def client(mocker):
+    return ApiClient(base_url='https://test-api.com')
+
+@pytest.fixture
+def handler(client, mocker):
+    handler = FileHandler(client)
+    mocker.patch.object(handler, 'create_download_token', return_value={'token': 't', 'dl-token': 'd', 'dl-expiry': 1})
+    return handler
+
+def fake_raw_get(mocker, content, fail_once=()):
+    """
+    Fake ApiClient.get serving ranged raw downloads, dropping the connection once for the given range starts.
+    """
+    failed = set()
+
+    def get(endpoint, headers=None, params=None, stream=False, raise_for_status=True):
+        assert params == {'token': 't', 'dl-token': 'd', 'dl-expiry': 1}
+        range_start, _, range_end = headers['Range'][len('bytes='):].partition('-')
+        range_start, range_end = int(range_start), int(range_end or len(content) - 1)
+        body = content[range_start:range_end + 1]
+
+        def iter_content(chunk_size=1):
+            for offset in range(0, len(body), 100):
+                if range_start in fail_once and range_start not in failed and offset >= 200:
+                    failed.add(range_start)
+                    raise ConnectionError('Connection reset')
+                yield body[offset:offset + 100]
+
+        content_range = f'bytes {range_start}-{range_end}/{len(content)}'
+        response = mocker.MagicMock(status_code=206, headers={'Content-Range': content_range})
+        response.iter_content.side_effect = iter_content
+        response.__enter__.return_value = response
+        return response
+
+    return get
+
+def test_download_writes_ranges_to_offsets(client, handler, mocker, tmp_path):
+    mock_get = mocker.patch.object(client, 'get', side_effect=fake_raw_get(mocker, CONTENT))
+    dest = tmp_path / 'download.bin'
+
+    assert handler.download(1, str(dest), part_size=1000, max_workers=4) is True
+
+    assert dest.read_bytes() == CONTENT
+    assert all(call.kwargs['stream'] for call in mock_get.call_args_list)
+    # One size probe and 11 ranges
+    assert mock_get.call_count == 12
+
+def test_download_retries_only_failed_ranges(client, handler, mocker, tmp_path):
+    mock_get = mocker.patch.object(client, 'get', side_effect=fake_raw_get(mocker, CONTENT, fail_once={3000, 7000}))
+    dest = tmp_path / 'download.bin'
+
+    assert handler.download(1, str(dest), part_size=1000) is True
+
+    assert dest.read_bytes() == CONTENT
+    retried = [call.kwargs['headers']['Range'] for call in mock_get.call_args_list[12:]]
+    assert sorted(retried) == ['bytes=3200-3999', 'bytes=7200-7999']
+
+def test_download_gives_up_after_retries(client, handler, mocker, tmp_path):
+    mocker.patch.object(client, 'get', side_effect=fake_raw_get(mocker, CONTENT))
+    mocker.patch.object(handler, '_download_range', return_value=(0, 999))
+
+    assert handler.download(1, str(tmp_path / 'download.bin'), max_retries=2) is False
+    assert handler._download_range.call_count == 3
+
+def test_download_without_token(client, handler, mocker, tmp_path):
+    handler.create_download_token.return_value = None
+
+    assert handler.download(1, str(tmp_path / 'download.bin')) is False
+
+def test_get_raw_failed_request(client, handler, mocker):
+    mocker.patch.object(client, 'get', return_value=None)
+
+    assert handler.get_raw(1, 'bytes=0-99', 't', 'd', 1) is None
+
+def test_iter_raw_resumes_after_dropped_connection(client, handler, mocker):
+    mocker.patch('time.sleep')
+    mock_get = mocker.patch.object(client, 'get', side_effect=fake_raw_get(mocker, CONTENT, fail_once={0, 200}))
+
+    blocks = list(handler.iter_raw(1, chunk_size=100))
+
+    assert b''.join(blocks) == CONTENT
+    assert max(len(block) for block in blocks) <= 100
+    assert [call.kwargs['headers']['Range'] for call in mock_get.call_args_list] == ['bytes=0-', 'bytes=200-', 'bytes=400-']
+
+def test_iter_raw_range(client, handler, mocker):
+    mocker.patch.object(client, 'get', side_effect=fake_raw_get(mocker, CONTENT))
+
+    assert b''.join(handler.iter_raw(1, start=1000, end=1499)) == CONTENT[1000:1500]
+
+def test_iter_raw_gives_up_after_retries(client, handler, mocker):
+    mock_sleep = mocker.patch('time.sleep')
+    mocker.patch.object(client, 'get', side_effect=ConnectionError('Connection refused'))
+    client.retry_policy = RetryPolicy(backoff_factor=0.5, jitter=False)
+
+    with pytest.raises(Exception, match='Failed to download file 1: Connection refused'):
+        list(handler.iter_raw(1, max_retries=2))
+    assert client.get.call_count == 3
+    # Each resume backs off as the client's retry policy does
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.5, 1.0]
+
+def test_open_raw_reads_incrementally(client, handler, mocker):
+    mocker.patch('time.sleep')
+    mocker.patch.object(client, 'get', side_effect=fake_raw_get(mocker, CONTENT, fail_once={0}))
+
+    with handler.open_raw(1) as reader:
+        assert reader.read(150) == CONTENT[:150]
+        assert reader.read() == CONTENT[150:]
+
+def fake_pages(mocker, total, limit):
+    total_pages = (total + limit - 1) // limit
+    pages = {}
+    for page in range(1, total_pages + 1):
+        records = [{'id': i} for i in range((page - 1) * limit, min(page * limit, total))]
+        pages[page] = {'data': records, 'meta': {'pagination': {'current_page': page, 'total_pages': total_pages}}}
+
+    def get(endpoint, headers=None, params=None, stream=False):
+        return mocker.Mock(status_code=200, json=lambda: pages[params['page']])
+
+    return get
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_iter_list_walks_every_page(client, mocker, prefetch):
+    mock_get = mocker.patch.object(client, 'get', side_effect=fake_pages(mocker, 25, 10))
+    handler = FileHandler(client)
+
+    records = handler.iter_list(limit=10, prefetch=prefetch)
+
+    assert next(records) == {'id': 0}
+    assert [record['id'] for record in records] == list(range(1, 25))
+    assert [call.kwargs['params']['page'] for call in mock_get.call_args_list] == [1, 2, 3]
+
+def test_iter_list_without_pagination_metadata(client, mocker):
+    pages = {1: [{'id': 1}, {'id': 2}], 2: [{'id': 3}]}
+    mocker.patch.object(client, 'get', side_effect=lambda endpoint, headers=None, params=None: mocker.Mock(
+        status_code=200, json=lambda: pages[params['page']]))
+    handler = FileHandler(client)
+
+    assert [record['id'] for record in handler.iter_list(limit=2)] == [1, 2, 3]
+
+def test_iter_list_failed_page(client, mocker):
+    mocker.patch.object(client, 'get', return_value=None)
+    handler = FileHandler(client)
+
+    with pytest.raises(Exception, match=r'Failed to list files\. Page: 1'):
+        list(handler.iter_list())
+
+def test_bulk_delete_reports_partial_failures(client, mocker):
+    handler = FileHandler(client)
+
+    def delete(file_id):
+        if file_id == 3:
+            raise Exception('Connection reset')
+        return file_id != 5
+
+    mocker.patch.object(handler, 'delete', side_effect=delete)
+
+    results = {result.item: result for result in handler.bulk_delete(iter(range(10)), max_workers=3)}
+
+    assert sorted(results) == list(range(10))
+    assert sorted(file_id for file_id, result in results.items() if not result.ok) == [3, 5]
+    assert str(results[3].error) == 'Connection reset'
+
+def test_bulk_delete_streams_results(client, mocker):
+    handler = FileHandler(client)
+    mocker.patch.object(handler, 'delete', return_value=True)
+    consumed = []
+
+    def file_ids():
+        for file_id in range(100):
+            consumed.append(file_id)
+            yield file_id
+
+    results = handler.bulk_delete(file_ids(), max_workers=2)
+    next(results)
+
+    assert len(consumed) < 100
+    results.close()
+
+def test_bulk_update(client, mocker):
+    mock_put = mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=200, json=lambda: {'id': 1}))
+    handler = FileHandler(client)
+
+    result, = handler.bulk_update([{'file_id': 1, 'visibility': 'private'}])
+
+    assert result.ok and result.value == {'id': 1}
+    # Fields left to None are not sent, so they are not cleared
+    assert mock_put.call_args.kwargs['json'] == {'visibility': 'private'}
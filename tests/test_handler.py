@@ -1,3 +1,6 @@
+import io
+import threading
+
 import pytest
 from u2s_sdk.client import ApiClient
 from u2s_sdk.handler import ResumableUploadHandler
@@ -52,4 +55,151 @@ def test_upload_chunk_failed(client, mocker):
     with pytest.raises(Exception, match=r'Failed to upload chunk\. Status code: 400'):
         handler.upload_chunk('/upload?key=123', 1024, b'data', 0, 3)
 
+def test_simulate_chunk_upload_sends_trailing_byte(client, mocker):
+    handler = ResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mock_upload_chunk = mocker.patch.object(handler, 'upload_chunk', side_effect=[False, False, {'Location': '/files/1'}])
+
+    result = handler.simulate_chunk_upload(io.BytesIO(b'0123456789a'), chunk_size=5)
+
+    assert result == {'Location': '/files/1'}
+    assert [call.args[3:] for call in mock_upload_chunk.call_args_list] == [(0, 4, None), (5, 9, None), (10, 10, None)]
+
+def test_parallel_chunk_upload_finalizes_with_last_chunk(client, mocker):
+    handler = ResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+
+    lock = threading.Lock()
+    received = {}
+
+    def upload_chunk(upload_uri, total_size, chunk_data, chunk_start, chunk_end, extra_headers):
+        with lock:
+            received[chunk_start] = chunk_data.read()
+            if len(received) * 4 >= total_size:
+                return {'Location': '/files/1'}
+        return False
+
+    mocker.patch.object(handler, 'upload_chunk', side_effect=upload_chunk)
+
+    data = bytes(range(256)) * 4
+    result = handler.parallel_chunk_upload(io.BytesIO(data), chunk_size=4, max_workers=8, max_in_flight=3)
+
+    assert result == {'Location': '/files/1'}
+    assert b''.join(received[offset] for offset in sorted(received)) == data
+    assert handler.upload_chunk.call_args_list[-1].args[3:] == (1020, 1023, None)
+
+def test_parallel_chunk_upload_failed_chunk(client, mocker):
+    handler = ResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mocker.patch.object(handler, 'upload_chunk', side_effect=Exception('Failed to upload chunk. Status code: 500'))
+
+    assert handler.parallel_chunk_upload(io.BytesIO(b'x' * 64), chunk_size=4) is False
+
+def test_parallel_chunk_upload_not_finalized(client, mocker):
+    handler = ResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mocker.patch.object(handler, 'upload_chunk', return_value=False)
+
+    assert handler.parallel_chunk_upload(io.BytesIO(b'x' * 64), chunk_size=4) is False
+
+def test_get_upload_offset(client, mocker):
+    mock_put = mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=308, headers={'Range': 'bytes=0-1023'}))
+
+    handler = ResumableUploadHandler(client)
+
+    assert handler.get_upload_offset('/upload?key=123', 4096) == 1024
+    assert mock_put.call_args.kwargs['headers']['Content-Range'] == 'bytes */4096'
+    assert mock_put.call_args.kwargs['headers']['Content-Length'] == '0'
+
+def test_get_upload_offset_nothing_committed(client, mocker):
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=308, headers={}))
+
+    handler = ResumableUploadHandler(client)
+
+    assert handler.get_upload_offset('/upload?key=123', 4096) == 0
+
+def test_resume_upload_sends_missing_tail(client, mocker):
+    handler = ResumableUploadHandler(client)
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=308, headers={'Range': 'bytes=0-5'}))
+    received = []
+
+    def upload_chunk(upload_uri, total_size, chunk_data, chunk_start, chunk_end, extra_headers):
+        received.append((chunk_data.read(), chunk_start, chunk_end))
+        return {'Location': '/files/1'} if chunk_end == total_size - 1 else False
+
+    mocker.patch.object(handler, 'upload_chunk', side_effect=upload_chunk)
+
+    result = handler.resume_upload(io.BytesIO(b'0123456789abcd'), upload_key='123', chunk_size=4)
+
+    assert result == {'Location': '/files/1'}
+    assert client.put.call_args.args[0] == '/files?key=123'
+    assert received == [(b'6789', 6, 9), (b'abcd', 10, 13)]
+
+def test_resume_upload_already_complete(client, mocker):
+    handler = ResumableUploadHandler(client)
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=201, headers={'Location': '/files/1'}))
+    mock_upload_chunk = mocker.patch.object(handler, 'upload_chunk')
+
+    assert handler.resume_upload(io.BytesIO(b'0123'), upload_uri='/upload?key=123') == {'Location': '/files/1'}
+    mock_upload_chunk.assert_not_called()
+
+def test_start_upload_unknown_size(client, mocker):
+    mocker.patch.object(client, 'post', return_value=mocker.Mock(status_code=201, headers={'Location': '/upload?key=123'}))
+
+    ResumableUploadHandler(client).start_upload('test.txt', None)
+
+    assert 'X-Upload-Content-Length' not in client.post.call_args.kwargs['headers']
+
+def test_stream_upload_sends_total_with_last_chunk(client, mocker):
+    handler = ResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    responses = iter([
+        mocker.Mock(status_code=308, headers={}),
+        mocker.Mock(status_code=308, headers={}),
+        mocker.Mock(status_code=201, headers={'Location': '/files/1'}),
+    ])
+    received = []
+
+    def put(upload_uri, data=None, headers=None):
+        received.append((headers['Content-Range'], data.read()))
+        return next(responses)
+
+    mocker.patch.object(client, 'put', side_effect=put)
+
+    result = handler.stream_upload((block for block in [b'012', b'3456789', b'ab']), chunk_size=4)
+
+    assert result == {'Location': '/files/1'}
+    assert handler.start_upload.call_args.args[1] is None
+    assert received == [('bytes 0-3/*', b'0123'), ('bytes 4-7/*', b'4567'), ('bytes 8-11/12', b'89ab')]
+
+def test_stream_upload_empty_stream(client, mocker):
+    handler = ResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=201, headers={'Location': '/files/1'}))
+
+    assert handler.stream_upload(iter([])) == {'Location': '/files/1'}
+    assert client.put.call_args.kwargs['headers']['Content-Range'] == 'bytes */0'
+
+def test_parallel_chunk_upload_empty_file(client, mocker):
+    handler = ResumableUploadHandler(client)
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=201, headers={'Location': '/files/1'}))
+
+    assert handler.parallel_chunk_upload(io.BytesIO(b''), chunk_size=1024) == {'Location': '/files/1'}
+    assert client.put.call_args.kwargs['headers']['Content-Range'] == 'bytes */0'
+
+def test_set_metadata(client, mocker):
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=200, json=lambda: {'id': 'abc'}))
+
+    result = ResumableUploadHandler(client).set_metadata('https://test-api.com/files/abc', {'content_encoding': 'gzip'})
+
+    assert result == {'id': 'abc'}
+    client.put.assert_called_once_with('/files/abc', json={'metadata': {'content_encoding': 'gzip'}})
+
+def test_set_metadata_failed(client, mocker):
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=404))
+
+    with pytest.raises(Exception, match=r'Failed to record file metadata\. Status code: 404'):
+        ResumableUploadHandler(client).set_metadata('/files/abc', {})
+
 # Add more test cases for the ResumableUploadHandler class as needed
@@ -0,0 +1,52 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules used by short-lived scripts that never touch the network
+LIGHT_MODULES = ('u2s_sdk.utils', 'u2s_sdk.client', 'u2s_sdk.handler', 'u2s_sdk.file', 'u2s_sdk.sync')
+
+# Dependencies that must only be loaded on first network use (or when actually needed)
+HEAVY_MODULES = ('requests', 'urllib3', 'charset_normalizer', 'chardet', 'httpx', 'multiprocessing', 'email.utils')
+
+# Cumulative import time budget of LIGHT_MODULES (in seconds), the best of a few runs
+IMPORT_TIME_BUDGET = 0.15
+
+def run_python(code, *options):
+    return subprocess.run([sys.executable, *options, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                          check=True)
+
+@pytest.mark.parametrize('module', (*LIGHT_MODULES, 'u2s_sdk.async_client', 'u2s_sdk.async_handler'))
+def test_import_does_not_load_heavy_dependencies(module):
+    code = f'import sys, {module}; print(" ".join(sorted(sys.modules)))'
+
+    loaded = set(run_python(code).stdout.split())
+
+    assert not loaded.intersection(HEAVY_MODULES)
+
+def test_client_construction_does_not_load_requests():
+    code = ('import sys, logging; from u2s_sdk.client import ApiClient; ApiClient(api_key="key"); '
+            'print("requests" in sys.modules, logging.getLogger("u2s_sdk").handlers)')
+
+    assert run_python(code).stdout.split(None, 1) == ['False', '[<NullHandler (NOTSET)>]\n']
+
+def get_import_time(modules):
+    """
+    Get the cumulative import time of modules in a fresh interpreter.
+    """
+    stderr = run_python(f'import {", ".join(modules)}', '-X', 'importtime').stderr
+    total = 0
+    for line in stderr.splitlines():
+        # import time: <self us> | <cumulative us> | <module, indented by nesting level>
+        _, cumulative, name = line.split('|')
+        if not name.startswith('  ') and name.strip().startswith('u2s_sdk'):
+            total += int(cumulative)
+    return total / 1e6
+
+def test_import_time_budget():
+    import_time = min(get_import_time(LIGHT_MODULES) for _ in range(3))
+
+    assert import_time < IMPORT_TIME_BUDGET
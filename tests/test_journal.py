@@ -0,0 +1,97 @@
+import os
+
+import pytest
+from u2s_sdk.client import ApiClient
+from u2s_sdk.handler import ResumableUploadHandler
+from u2s_sdk.journal import UploadJournal, get_file_fingerprint
+
+@pytest.fixture
+def source_file(tmp_path):
+    path = tmp_path / 'source.bin'
+    path.write_bytes(b'0123456789abcdef')
+    return str(path)
+
+@pytest.fixture
+def journal(tmp_path):
+    with UploadJournal(str(tmp_path / 'uploads.journal'), sync_every=100) as journal:
+        yield journal
+
+def test_pending_tracks_acknowledged_offset(journal, source_file):
+    journal.start(source_file, '/upload?key=1', '1', 4)
+    journal.ack('/upload?key=1', 0, 3)
+    journal.ack('/upload?key=1', 8, 11)
+    journal.ack('/upload?key=1', 4, 7)
+
+    entry, = journal.pending()
+
+    assert entry.upload_key == '1'
+    assert entry.size == 16
+    assert entry.offset == 12
+    assert entry.is_unchanged()
+
+def test_completed_uploads_are_not_pending(journal, source_file):
+    journal.start(source_file, '/upload?key=1', '1', 4)
+    journal.start(source_file, '/upload?key=2', '2', 4)
+    journal.complete('/upload?key=1')
+
+    assert [entry.upload_key for entry in journal.pending()] == ['2']
+
+def test_journal_survives_reopen_and_torn_writes(journal, source_file):
+    journal.start(source_file, '/upload?key=1', '1', 4)
+    journal.ack('/upload?key=1', 0, 3)
+    journal.close()
+
+    with open(journal.path, 'a') as file:
+        file.write('{"op": "ack", "upl')
+
+    entry, = UploadJournal(journal.path).pending()
+    assert entry.offset == 4
+
+def test_compact_keeps_pending_entries(journal, source_file):
+    journal.start(source_file, '/upload?key=1', '1', 4)
+    journal.ack('/upload?key=1', 0, 3)
+    journal.start(source_file, '/upload?key=2', '2', 4)
+    journal.complete('/upload?key=2')
+    journal.compact()
+
+    with open(journal.path) as file:
+        assert len(file.readlines()) == 2
+    entry, = journal.pending()
+    assert entry.offset == 4
+
+def test_changed_file_is_detected(journal, source_file):
+    entry = journal.start(source_file, '/upload?key=1', '1', 4)
+    with open(source_file, 'wb') as file:
+        file.write(b'changed')
+    os.utime(source_file, (0, 0))
+
+    assert not entry.is_unchanged()
+    assert get_file_fingerprint(source_file) != entry.fingerprint
+
+def test_handler_resumes_pending_uploads(journal, source_file, mocker):
+    client = ApiClient(base_url='https://test-api.com')
+    handler = ResumableUploadHandler(client, journal=journal)
+
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=1', '1'))
+    mocker.patch.object(handler, 'upload_chunk', side_effect=[False, Exception('Connection lost')])
+    assert handler.upload_file(source_file, chunk_size=4) is False
+
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=308, headers={'Range': 'bytes=0-3'}))
+    mock_upload_chunk = mocker.patch.object(handler, 'upload_chunk', side_effect=[False, False, {'Location': '/files/1'}])
+
+    assert handler.resume_pending() == {source_file: {'Location': '/files/1'}}
+    assert [call.args[3] for call in mock_upload_chunk.call_args_list] == [4, 8, 12]
+    assert journal.pending() == []
+
+def test_handler_finalizes_empty_files(journal, tmp_path, mocker):
+    empty_file = tmp_path / 'empty.bin'
+    empty_file.write_bytes(b'')
+    client = ApiClient(base_url='https://test-api.com')
+    handler = ResumableUploadHandler(client, journal=journal)
+
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=1', '1'))
+    mocker.patch.object(client, 'put', return_value=mocker.Mock(status_code=201, headers={'Location': '/files/1'}))
+
+    assert handler.upload_file(str(empty_file)) == {'Location': '/files/1'}
+    assert client.put.call_args.kwargs['headers']['Content-Range'] == 'bytes */0'
+    assert journal.pending() == []
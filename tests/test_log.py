@@ -0,0 +1,59 @@
+import logging
+
+import pytest
+from u2s_sdk import log
+from u2s_sdk.client import ApiClient
+from u2s_sdk.handler import ResumableUploadHandler
+
+@pytest.fixture(autouse=True)
+def reset_logging():
+    yield
+    log.disable_logging()
+
+def get_stream_handlers(name):
+    return [handler for handler in logging.getLogger(name).handlers if isinstance(handler, logging.StreamHandler)]
+
+def test_clients_do_not_add_handlers():
+    for _ in range(3):
+        ApiClient(base_url='https://test-api.com')
+
+    assert get_stream_handlers('u2s_sdk') == []
+    assert get_stream_handlers('u2s_sdk.client') == []
+    assert get_stream_handlers('urllib3') == []
+    assert any(isinstance(handler, logging.NullHandler) for handler in logging.getLogger('u2s_sdk').handlers)
+
+def test_enable_logging_installs_a_single_handler():
+    for _ in range(3):
+        ApiClient(base_url='https://test-api.com').set_logging(logging.INFO)
+
+    assert len(get_stream_handlers('u2s_sdk')) == 1
+    assert get_stream_handlers('urllib3') == []
+    assert not log.get_trace_logger().isEnabledFor(logging.DEBUG)
+
+    log.enable_logging(trace=True)
+    assert len(get_stream_handlers('u2s_sdk')) == 1
+    assert len(get_stream_handlers('urllib3')) == 1
+    assert log.get_trace_logger().isEnabledFor(logging.DEBUG)
+
+    log.disable_logging()
+    assert get_stream_handlers('u2s_sdk') == []
+    assert get_stream_handlers('urllib3') == []
+
+def test_chunk_response_body_is_only_read_when_tracing(mocker):
+    client = ApiClient(base_url='https://test-api.com')
+    response = mocker.Mock(status_code=308, headers={})
+    text = mocker.PropertyMock(return_value='')
+    type(response).text = text
+    mocker.patch.object(client, 'put', return_value=response)
+    handler = ResumableUploadHandler(client)
+
+    logging.getLogger('u2s_sdk').setLevel(logging.DEBUG)
+    try:
+        handler.upload_chunk('/upload?key=123', 4, b'data', 0, 3)
+        text.assert_not_called()
+
+        log.set_trace(True)
+        handler.upload_chunk('/upload?key=123', 4, b'data', 0, 3)
+        text.assert_called_once()
+    finally:
+        logging.getLogger('u2s_sdk').setLevel(logging.NOTSET)
@@ -0,0 +1,94 @@
+import datetime
+
+import pytest
+import requests.exceptions
+from u2s_sdk.client import ApiClient
+from u2s_sdk.handler import ResumableUploadHandler
+from u2s_sdk.metrics import Histogram, MetricsCollector, RequestEvent
+from u2s_sdk.retry import RetryPolicy
+from u2s_sdk.stream import get_chunk_body
+
+def make_response(mocker, status_code, content=b'', headers=None):
+    response = mocker.MagicMock(status_code=status_code, headers=headers or {}, content=content)
+    response.elapsed = datetime.timedelta(milliseconds=20)
+    return response
+
+def test_histogram():
+    histogram = Histogram((1, 2, 5))
+    for value in (0.5, 1.5, 1.5, 3, 10):
+        histogram.observe(value)
+
+    summary = histogram.to_dict()
+    assert summary['buckets'] == {1: 1, 2: 2, 5: 1, float('inf'): 1}
+    assert summary['count'] == 5 and summary['min'] == 0.5 and summary['max'] == 10
+    assert summary['mean'] == pytest.approx(3.3)
+    assert summary['p50'] == 2
+    assert summary['p99'] == 10
+    assert Histogram((1,)).percentile(50) is None
+
+def test_request_events_report_retries_and_sizes(mocker):
+    mocker.patch('time.sleep')
+    collector = MetricsCollector()
+    events = []
+    client = ApiClient(base_url='https://test-api.com', hooks=[collector, events.append],
+                       retry_policy=RetryPolicy(max_retries=2, jitter=False))
+    mocker.patch('requests.Session.request', side_effect=[
+        make_response(mocker, 503),
+        make_response(mocker, 200, b'{"data": []}'),
+    ])
+
+    client.put('/files/1', data=b'12345')
+
+    [event] = events
+    assert isinstance(event, RequestEvent)
+    assert (event.method, event.url, event.status_code) == ('PUT', 'https://test-api.com/files/1', 200)
+    assert event.retries == 1
+    assert event.bytes_sent == 5
+    assert event.bytes_received == 12
+    assert event.time_to_headers == pytest.approx(0.02)
+    assert event.error is None
+
+    snapshot = collector.snapshot()
+    assert snapshot['requests'] == 1
+    assert snapshot['retries'] == 1
+    assert snapshot['status_codes'] == {200: 1}
+    assert snapshot['request_duration']['count'] == 1
+
+def test_failed_request_event(mocker):
+    events = []
+    client = ApiClient(base_url='https://test-api.com', hooks=[events.append])
+    response = make_response(mocker, 500)
+    response.raise_for_status.side_effect = requests.exceptions.HTTPError('500 Server Error')
+    mocker.patch('requests.Session.request', return_value=response)
+
+    assert client.get('/files') is None
+    assert events[0].status_code == 500
+    assert str(events[0].error) == '500 Server Error'
+
+def test_failing_hook_does_not_break_requests(mocker):
+    def hook(event):
+        raise ValueError('broken hook')
+
+    client = ApiClient(base_url='https://test-api.com', hooks=[hook])
+    mocker.patch('requests.Session.request', return_value=make_response(mocker, 200))
+
+    assert client.get('/files').status_code == 200
+
+def test_chunk_events(mocker, tmp_path):
+    collector = MetricsCollector()
+    client = ApiClient(base_url='https://test-api.com', hooks=[collector])
+    mocker.patch.object(client, 'put', side_effect=lambda upload_uri, data=None, headers=None: (
+        data.read(), make_response(mocker, 308))[1])
+    handler = ResumableUploadHandler(client)
+
+    path = tmp_path / 'file.bin'
+    path.write_bytes(b'x' * 1000)
+    with open(path, 'rb') as file:
+        chunk_data = get_chunk_body(file, 0, 499)
+        handler.upload_chunk('/upload?key=1', 1000, chunk_data, 0, 499)
+
+    snapshot = collector.snapshot()
+    assert snapshot['chunks'] == 1
+    assert snapshot['chunk_bytes'] == 500
+    assert snapshot['chunk_read_duration']['count'] == 1
+    assert chunk_data.read_duration > 0
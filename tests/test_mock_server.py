@@ -0,0 +1,118 @@
+import io
+import os
+import gzip
+
+import pytest
+from benchmarks.server import MockServer
+from u2s_sdk.cache import DownloadTokenCache
+from u2s_sdk.checksum import UploadChecksum
+from u2s_sdk.client import ApiClient
+from u2s_sdk.compress import CompressionStage
+from u2s_sdk.file import FileHandler
+from u2s_sdk.handler import ResumableUploadHandler
+from u2s_sdk.retry import RetryPolicy
+
+@pytest.fixture
+def server():
+    with MockServer(files=250, file_size=10000, seed=1) as server:
+        yield server
+
+@pytest.fixture
+def client(server):
+    with ApiClient(server.url, retry_policy=RetryPolicy(max_retries=20, backoff_factor=0)) as client:
+        yield client
+
+def test_parallel_upload_and_download(server, client, tmp_path):
+    content = os.urandom(300000)
+    handler = ResumableUploadHandler(client)
+    checksum = UploadChecksum()
+
+    headers = handler.parallel_chunk_upload(io.BytesIO(content), chunk_size=65536, max_workers=4, checksum=checksum)
+
+    assert headers
+    assert checksum.verify(headers) is True
+    file_id = int(headers['Location'].rpartition('/')[2])
+    assert server.get_file_content(file_id) == content
+
+    dest = tmp_path / 'download.bin'
+    assert FileHandler(client).download(file_id, str(dest), part_size=50000) is True
+    assert dest.read_bytes() == content
+
+def test_resume_upload(server, client):
+    content = os.urandom(100000)
+    handler = ResumableUploadHandler(client)
+    upload_uri, upload_key = handler.start_upload('resumed.bin', len(content))
+    assert handler.upload_chunk(upload_uri, len(content), content[:40000], 0, 39999) is False
+
+    assert handler.get_upload_offset(upload_uri, len(content)) == 40000
+    headers = handler.resume_upload(io.BytesIO(content), upload_key=upload_key, chunk_size=32768)
+
+    assert headers
+    assert server.get_file_content(int(headers['Location'].rpartition('/')[2])) == content
+
+def test_listing_and_injected_errors(server, client, tmp_path):
+    server.error_rate = 0.2
+
+    records = list(FileHandler(client).iter_list(limit=100))
+    dest = tmp_path / 'download.bin'
+    downloaded = FileHandler(client).download(1, str(dest), part_size=1000)
+
+    assert [record['id'] for record in records] == list(range(1, 251))
+    assert downloaded is True
+    assert dest.read_bytes() == server.get_file_content(1)
+    assert server.errors > 0
+
+def test_stream_upload(server, client):
+    content = os.urandom(200000)
+    checksum = UploadChecksum(algorithms=('md5', 'sha256'))
+    blocks = (content[offset:offset + 7000] for offset in range(0, len(content), 7000))
+
+    headers = ResumableUploadHandler(client).stream_upload(blocks, chunk_size=65536, checksum=checksum)
+
+    assert headers
+    assert server.get_file_content(int(headers['Location'].rpartition('/')[2])) == content
+
+def test_compressed_stream_upload(server, client):
+    content = b''.join(b'%08d\n' % i for i in range(50000))
+    compression = CompressionStage(block_size=65536, workers=2)
+
+    headers = ResumableUploadHandler(client).stream_upload(io.BytesIO(content), chunk_size=16384,
+                                                            compression=compression)
+
+    assert headers
+    file = server.files[int(headers['Location'].rpartition('/')[2])]
+    assert file['size'] == compression.compressed_size < len(content)
+    assert gzip.decompress(bytes(file['content'])) == content
+    assert file['metadata'] == compression.get_metadata()
+
+def test_open_raw(server, client):
+    with FileHandler(client).open_raw(2, chunk_size=1000) as reader:
+        content = reader.read()
+
+    assert content == server.get_file_content(2)
+
+def test_iter_raw_empty_file(client):
+    headers = ResumableUploadHandler(client).stream_upload(iter([]), filename='empty.bin')
+    file_id = int(headers['Location'].rpartition('/')[2])
+
+    # The server answers 416 (bytes */0) to the open-ended range
+    assert list(FileHandler(client).iter_raw(file_id)) == []
+
+def test_download_empty_file(client, tmp_path):
+    headers = ResumableUploadHandler(client).stream_upload(iter([]), filename='empty.bin')
+    file_id = int(headers['Location'].rpartition('/')[2])
+    dest = tmp_path / 'empty.bin'
+
+    assert FileHandler(client).download(file_id, str(dest)) is True
+    assert dest.read_bytes() == b''
+
+def test_iter_raw_client_error_is_not_retried(server, client):
+    handler = FileHandler(client, token_cache=DownloadTokenCache())
+    handler.get_download_token(3)
+    # The cached token outlives the file
+    assert handler.delete(3) is True
+    requests = server.requests
+
+    with pytest.raises(Exception, match=r'Failed to download file\. Status code: 404'):
+        list(handler.iter_raw(3))
+    assert server.requests == requests + 1
@@ -0,0 +1,60 @@
+import pytest
+from u2s_sdk.client import ApiClient
+from u2s_sdk.ratelimit import TokenBucket, RateLimiter, get_body_size
+from u2s_sdk.stream import FileSlice
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch('time.monotonic', side_effect=lambda: now[0])
+    return now
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket()
+    assert bucket.reserve(10 ** 9) == 0
+
+def test_bucket_allows_burst_then_paces(clock):
+    bucket = TokenBucket(rate=10, capacity=5)
+
+    assert [bucket.reserve() for _ in range(5)] == [0, 0, 0, 0, 0]
+    assert bucket.reserve() == pytest.approx(0.1)
+
+    clock[0] += 1
+    assert bucket.reserve() == 0
+
+def test_large_reservation_goes_into_debt(clock):
+    bucket = TokenBucket(rate=1000)
+
+    assert bucket.reserve(5000) == pytest.approx(4)
+    assert bucket.reserve(1000) == pytest.approx(5)
+
+def test_rate_can_change_at_runtime(clock):
+    bucket = TokenBucket(rate=10, capacity=1)
+    bucket.reserve()
+
+    bucket.set_rate(100, capacity=1)
+    assert bucket.reserve() == pytest.approx(0.01)
+
+    bucket.set_rate(None)
+    assert bucket.reserve(100) == 0
+
+def test_limiter_waits_for_the_slowest_bucket(clock):
+    limiter = RateLimiter(requests_per_second=100, bytes_per_second=1000)
+
+    assert limiter.reserve(3000) == pytest.approx(2)
+
+def test_get_body_size():
+    assert get_body_size(None) == 0
+    assert get_body_size('é') == 2
+    assert get_body_size(FileSlice(b'0123456789', 2, 4)) == 4
+    assert get_body_size(iter([b'data'])) == 0
+
+def test_client_applies_rate_limiter(mocker):
+    limiter = RateLimiter(bytes_per_second=1000)
+    mock_acquire = mocker.patch.object(limiter, 'acquire')
+    mocker.patch('requests.Session.request', return_value=mocker.MagicMock(status_code=308))
+    client = ApiClient(base_url='https://test-api.com', rate_limiter=limiter)
+
+    client.put('/upload', data=b'x' * 4096)
+
+    mock_acquire.assert_called_once_with(4096)
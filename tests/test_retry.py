@@ -0,0 +1,43 @@
+import io
+
+from u2s_sdk.retry import RetryPolicy, rewind_body
+
+def test_only_idempotent_requests_are_retryable():
+    policy = RetryPolicy()
+    assert policy.is_retryable_request('PUT', b'data')
+    assert policy.is_retryable_request('get')
+    assert not policy.is_retryable_request('POST', '{}')
+
+def test_streamed_bodies_must_be_rewindable():
+    policy = RetryPolicy()
+    assert policy.is_retryable_request('PUT', io.BytesIO(b'data'))
+    assert not policy.is_retryable_request('PUT', iter([b'data']))
+
+def test_exponential_backoff_is_capped():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+    assert [policy.get_delay(attempt) for attempt in range(5)] == [1, 2, 4, 5, 5]
+
+def test_jitter_stays_below_backoff():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5)
+    assert all(0 <= policy.get_delay(2) <= 4 for _ in range(100))
+
+def test_retry_after_header(mocker):
+    policy = RetryPolicy(max_backoff=60)
+    assert policy.get_delay(0, mocker.Mock(headers={'Retry-After': '7'})) == 7
+    assert policy.get_delay(0, mocker.Mock(headers={'Retry-After': 'Thu, 01 Jan 1970 00:00:00 GMT'})) == 0
+    assert RetryPolicy(max_backoff=3).get_delay(0, mocker.Mock(headers={'Retry-After': '120'})) == 3
+
+def test_can_retry_respects_limits_and_budget(mocker):
+    mocker.patch('time.monotonic', return_value=100.0)
+    policy = RetryPolicy(max_retries=2, budget=10)
+
+    assert policy.can_retry(1, 95.0, 1.0)
+    assert not policy.can_retry(2, 95.0, 1.0)
+    assert not policy.can_retry(0, 95.0, 6.0)
+
+def test_rewind_body():
+    body = io.BytesIO(b'data')
+    body.read()
+    rewind_body(body)
+    rewind_body(b'data')
+    assert body.read() == b'data'
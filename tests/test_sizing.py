@@ -0,0 +1,76 @@
+import io
+
+import pytest
+from u2s_sdk.client import ApiClient
+from u2s_sdk.handler import ResumableUploadHandler
+from u2s_sdk.sizing import AdaptiveChunkSizer
+
+KB = 1024
+MB = 1024 * KB
+
+def test_initial_size_is_rounded_to_granularity():
+    sizer = AdaptiveChunkSizer(initial_size=5 * MB + 100, granularity=256 * KB)
+    assert sizer.next_size() == 5 * MB
+
+def test_grows_on_fast_link_within_step_and_bounds():
+    sizer = AdaptiveChunkSizer(initial_size=4 * MB, max_size=16 * MB, target_duration=1.0)
+
+    sizer.record(4 * MB, 0.01)
+    assert sizer.next_size() == 8 * MB
+
+    sizer.record(8 * MB, 0.01)
+    sizer.record(16 * MB, 0.01)
+    assert sizer.next_size() == 16 * MB
+
+def test_shrinks_on_slow_link():
+    sizer = AdaptiveChunkSizer(initial_size=8 * MB, min_size=256 * KB, target_duration=1.0)
+
+    sizer.record(8 * MB, 4.0)
+    assert sizer.next_size() == 4 * MB
+
+    for _ in range(10):
+        sizer.record(sizer.next_size(), 8.0)
+    assert sizer.next_size() == 256 * KB
+
+def test_converges_to_target_duration():
+    sizer = AdaptiveChunkSizer(initial_size=1 * MB, target_duration=2.0)
+
+    for _ in range(20):
+        size = sizer.next_size()
+        sizer.record(size, size / (3 * MB))
+
+    assert sizer.next_size() == 6 * MB
+
+def test_min_size_not_a_multiple_of_granularity():
+    sizer = AdaptiveChunkSizer(initial_size=300000, min_size=300000, target_duration=1.0)
+    assert sizer.next_size() == 512 * KB
+
+    sizer.record(512 * KB, 10.0)
+    assert sizer.next_size() == 512 * KB
+
+def test_min_size_below_granularity():
+    sizer = AdaptiveChunkSizer(initial_size=64 * KB, min_size=64 * KB, max_size=8 * MB, target_duration=1.0)
+    assert sizer.next_size() == 256 * KB
+
+    sizer.record(256 * KB, 10.0)
+    assert sizer.next_size() == 256 * KB
+
+def test_invalid_bounds():
+    with pytest.raises(ValueError):
+        AdaptiveChunkSizer(min_size=8 * MB, max_size=4 * MB)
+    with pytest.raises(ValueError):
+        AdaptiveChunkSizer(min_size=300000, max_size=400000)
+
+def test_handler_uses_adaptive_chunk_sizes(mocker):
+    handler = ResumableUploadHandler(ApiClient(base_url='https://test-api.com'))
+    mocker.patch.object(handler, 'start_upload', return_value=('/upload?key=123', '123'))
+    mock_upload_chunk = mocker.patch.object(handler, 'upload_chunk', return_value=False)
+    sizer = AdaptiveChunkSizer(initial_size=256 * KB, granularity=256 * KB, min_size=256 * KB)
+    mocker.patch.object(sizer, 'record', side_effect=lambda nbytes, duration: setattr(sizer, '_size', 2 * nbytes))
+
+    handler.simulate_chunk_upload(io.BytesIO(b'x' * (2 * MB)), chunk_sizer=sizer)
+
+    assert [call.args[3:] for call in mock_upload_chunk.call_args_list] == [
+        (0, 256 * KB - 1, None), (256 * KB, 768 * KB - 1, None), (768 * KB, 1792 * KB - 1, None),
+        (1792 * KB, 2 * MB - 1, None),
+    ]
@@ -0,0 +1,85 @@
+import io
+
+import pytest
+import requests
+from u2s_sdk.stream import FileSlice, get_chunk_body, iter_stream_chunks
+
+@pytest.fixture
+def source_file(tmp_path):
+    path = tmp_path / 'source.bin'
+    path.write_bytes(b'0123456789abcdef')
+    return path
+
+def test_file_slice_reads_range(source_file):
+    with open(source_file, 'rb') as file:
+        body = get_chunk_body(file, 4, 9)
+
+        assert len(body) == 6
+        assert body.read(4) == b'4567'
+        assert body.read() == b'89'
+        assert body.read() == b''
+        assert file.tell() == 0
+
+def test_file_slice_rewinds(source_file):
+    with open(source_file, 'rb') as file:
+        body = get_chunk_body(file, 10, 15)
+        body.read()
+        body.seek(0)
+        assert body.read() == b'abcdef'
+
+def test_buffer_slice_is_zero_copy():
+    buffer = io.BytesIO(b'0123456789')
+    body = get_chunk_body(buffer, 2, 5)
+
+    block = body.read(2)
+    assert isinstance(block, memoryview)
+    assert bytes(block) == b'23'
+    assert bytes(body) == b'2345'
+
+    block.release()
+    body.close()
+    # The buffer exports are released once the slice is closed
+    buffer.write(b'more')
+
+def test_unsliceable_buffer_falls_back_to_copy(mocker):
+    buffer = mocker.Mock(spec=['seek', 'read'])
+    buffer.read.return_value = b'2345'
+
+    body = get_chunk_body(buffer, 2, 5)
+
+    buffer.seek.assert_called_with(2)
+    assert body.read() == b'2345'
+
+def test_requests_streams_file_slice(source_file):
+    with open(source_file, 'rb') as file:
+        body = FileSlice(file.fileno(), 4, 6)
+        request = requests.Request('PUT', 'https://test-api.com/upload', data=body).prepare()
+
+    assert request.headers['Content-Length'] == '6'
+    assert request.body is body
+
+def test_iter_stream_chunks_from_blocks():
+    chunks = list(iter_stream_chunks(iter([b'01', b'23456', b'', bytearray(b'789a')]), 4))
+
+    assert [bytes(chunk) for chunk in chunks] == [b'0123', b'4567', b'89a']
+
+class Pipe(io.RawIOBase):
+    """
+    Non-seekable reader returning at most 3 bytes per read.
+    """
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.data.read(min(len(buffer), 3))
+        buffer[:len(data)] = data
+        return len(data)
+
+def test_iter_stream_chunks_from_short_reads():
+    chunks = list(iter_stream_chunks(Pipe(b'0123456789'), 4))
+
+    assert [bytes(chunk) for chunk in chunks] == [b'0123', b'4567', b'89']
+    assert list(iter_stream_chunks(Pipe(b''), 4)) == []
@@ -0,0 +1,98 @@
+import pytest
+from benchmarks.server import MockServer
+from u2s_sdk.client import ApiClient
+from u2s_sdk.dedup import hash_file
+from u2s_sdk.handler import ResumableUploadHandler
+from u2s_sdk.retry import RetryPolicy
+from u2s_sdk.sync import SyncEngine, SyncState
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / 'root'
+    (root / 'docs').mkdir(parents=True)
+    (root / 'a.txt').write_bytes(b'a' * 100)
+    (root / 'docs' / 'b.txt').write_bytes(b'b' * 2000)
+    return root
+
+@pytest.fixture
+def engine(mocker):
+    client = ApiClient(base_url='https://test-api.com')
+    engine = SyncEngine(ResumableUploadHandler(client), hash_workers=1)
+    mocker.patch.object(engine.file_handler, 'iter_list', return_value=[])
+    return engine
+
+def test_plan_uploads_new_files(engine, root):
+    plan = engine.plan(str(root))
+
+    assert [(action.kind, action.name, action.reason) for action in plan] == [
+        ('upload', 'a.txt', 'new'), ('upload', 'docs/b.txt', 'new'),
+    ]
+    assert plan.summary() == {'upload': 2, 'update': 0, 'delete': 0, 'unchanged': 0, 'upload_bytes': 2100}
+
+def test_plan_compares_size_and_recorded_hash(engine, root):
+    engine.file_handler.iter_list.return_value = [
+        {'id': 1, 'filename': 'a.txt', 'size': 100},
+        {'id': 2, 'filename': 'docs/b.txt', 'size': 2000},
+    ]
+    engine.state.put(2, 'docs/b.txt', 2000, 'stale hash')
+
+    plan = engine.plan(str(root))
+
+    # a.txt has no recorded hash, its name and size are trusted
+    assert plan.unchanged == 1
+    assert [(action.kind, action.name, action.replaces) for action in plan] == [('upload', 'docs/b.txt', [2])]
+
+def test_plan_renames_and_deletes(engine, root):
+    engine.file_handler.iter_list.return_value = [
+        {'id': 1, 'filename': 'old-a.txt', 'size': 100},
+        {'id': 2, 'filename': 'docs/b.txt', 'size': 2000},
+        {'id': 3, 'filename': 'gone.txt', 'size': 5},
+    ]
+    engine.state.put(1, 'old-a.txt', 100, hash_file(str(root / 'a.txt')))
+    engine.state.put(4, 'deleted-remotely.txt', 5, 'hash')
+
+    assert [action.kind for action in engine.plan(str(root))] == ['update']
+
+    engine.delete = True
+    plan = engine.plan(str(root))
+
+    assert [(action.kind, action.name, action.file_id) for action in plan] == [
+        ('update', 'a.txt', 1), ('delete', 'gone.txt', 3),
+    ]
+    # Files missing from the listing are forgotten
+    assert engine.state.get(4) is None
+
+def test_sync_against_server(root, tmp_path):
+    with MockServer() as server, ApiClient(server.url, retry_policy=RetryPolicy(backoff_factor=0)) as client:
+        (root / 'empty.txt').write_bytes(b'')
+        state_path = str(tmp_path / 'sync.state')
+        engine = SyncEngine(ResumableUploadHandler(client), state=SyncState(state_path), delete=True,
+                            chunk_size=512, hash_workers=1)
+
+        plan, results = engine.sync(str(root), dry_run=True)
+        assert len(plan) == 3 and results == [] and not server.files
+
+        plan, results = engine.sync(str(root))
+        assert all(result.ok for result in results) and len(results) == 3
+        files = {file['filename']: file for file in server.files.values()}
+        assert sorted(files) == ['a.txt', 'docs/b.txt', 'empty.txt']
+        assert files['empty.txt']['size'] == 0
+        files['a.txt']['description'] = 'kept on rename'
+
+        # Incremental re-run from the saved state
+        (root / 'a.txt').rename(root / 'c.txt')
+        (root / 'docs' / 'b.txt').write_bytes(b'B' * 1500)
+        engine = SyncEngine(ResumableUploadHandler(client), state=SyncState(state_path), delete=True,
+                            chunk_size=512, hash_workers=1)
+        plan, results = engine.sync(str(root))
+
+        assert sorted((result.action.kind, result.action.name) for result in results) == [
+            ('delete', 'docs/b.txt'), ('update', 'c.txt'), ('upload', 'docs/b.txt'),
+        ]
+        assert all(result.ok for result in results)
+        files = {file['filename']: file for file in server.files.values()}
+        assert sorted(files) == ['c.txt', 'docs/b.txt', 'empty.txt']
+        assert files['c.txt']['description'] == 'kept on rename'
+        assert bytes(files['docs/b.txt']['content']) == b'B' * 1500
+
+        assert len(engine.sync(str(root))[0]) == 0
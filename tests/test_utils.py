@@ -1,4 +1,16 @@
-from u2s_sdk.utils import get_key_value_from_uri
+import io
+
+from u2s_sdk.utils import (
+    get_key_value_from_uri,
+    get_upload_uri,
+    get_file_id_from_location,
+    build_url,
+    parse_range_header,
+    get_buffer_size,
+    iter_chunk_ranges,
+    get_page_records,
+    has_next_page,
+)
 
 def test_get_key_value_from_uri_with_valid_key():
     uri = "https://example.com/path?key=value"
@@ -19,3 +31,42 @@ def test_get_key_value_from_uri_with_empty_uri():
     uri = ""
     result = get_key_value_from_uri(uri)
     assert result is None
+
+def test_get_buffer_size_rewinds():
+    buffer = io.BytesIO(b'0123456789')
+    buffer.read(3)
+    assert get_buffer_size(buffer) == 10
+    assert buffer.tell() == 0
+
+def test_iter_chunk_ranges():
+    assert list(iter_chunk_ranges(11, 5)) == [(0, 4), (5, 9), (10, 10)]
+    assert list(iter_chunk_ranges(10, 5, start=5)) == [(5, 9)]
+    assert list(iter_chunk_ranges(0, 5)) == []
+
+def test_get_upload_uri_round_trip():
+    assert get_key_value_from_uri(get_upload_uri('abc 123')) == 'abc 123'
+
+def test_build_url():
+    assert build_url('https://api.up2sha.re', '/files') == 'https://api.up2sha.re/files'
+    assert build_url('https://api.up2sha.re/', 'files') == 'https://api.up2sha.re/files'
+    assert build_url('https://api.up2sha.re', 'https://upload.up2sha.re/files?key=1') == 'https://upload.up2sha.re/files?key=1'
+
+def test_parse_range_header():
+    assert parse_range_header('bytes=0-1023') == 1024
+    assert parse_range_header(None) == 0
+
+def test_has_next_page():
+    assert has_next_page({'data': [], 'meta': {'pagination': {'current_page': 1, 'total_pages': 2}}}, 100)
+    assert not has_next_page({'data': [{}], 'current_page': 3, 'last_page': 3}, 1)
+    assert has_next_page([{}, {}], 2)
+    assert not has_next_page({'data': [{}]}, 2)
+
+def test_get_page_records():
+    assert get_page_records({'data': [{'id': 1}]}) == [{'id': 1}]
+    assert get_page_records([{'id': 1}]) == [{'id': 1}]
+    assert get_page_records(None) == []
+
+def test_get_file_id_from_location():
+    assert get_file_id_from_location('https://api.up2sha.re/files/abc123') == 'abc123'
+    assert get_file_id_from_location('/files/abc123/') == 'abc123'
+    assert get_file_id_from_location(None) is None
@@ -0,0 +1 @@
+from . import log  # noqa: F401  (installs the default NullHandler of the SDK loggers)
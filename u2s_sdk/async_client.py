@@ -0,0 +1,339 @@
+"""
+Async client module.
+
+u2s_sdk.async_client
+"""
+import time
+import asyncio
+import logging
+from importlib.util import find_spec
+
+from .cache import ResponseCache
+from .client import get_response_size
+from .metrics import RequestEvent, emit_event
+from .ratelimit import RateLimiter, get_body_size
+from .retry import RetryPolicy, rewind_body
+from .utils import build_url
+
+
+class AsyncApiClient:
+    """
+    Asyncio API client.
+
+    Requires the optional ``httpx`` dependency (``pip install u2s-sdk[async]``).
+    """
+    def __init__(self, base_url='https://api.up2sha.re', timeout=10, api_key=None, oauth_token=None,
+                 max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0,
+                 retry_policy: RetryPolicy = None, rate_limiter: RateLimiter = None,
+                 response_cache: ResponseCache = None, hooks=None):
+        """
+        Constructor.
+
+        The client owns a pooled async HTTP transport shared by every coroutine using the client.
+        Call :meth:`aclose` (or use the client as an async context manager) to release it.
+
+        :param base_url: The base URL (default: https://api.up2sha.re)
+        :param timeout: The timeout (in seconds)
+        :param api_key: The API key (optional)
+        :param oauth_token: The OAuth token (optional)
+        :param max_connections: The maximum number of open connections (default: 100)
+        :param max_keepalive_connections: The maximum number of idle keep-alive connections (default: 20)
+        :param keepalive_expiry: Drop idle keep-alive connections after this many seconds (default: 5.0)
+        :param retry_policy: The retry policy for transient failures (default: None, no retries)
+        :param rate_limiter: The rate limiter shared by every request of the client (default: None, unlimited)
+        :param response_cache: The cache of JSON responses revalidated with ETag / Last-Modified (default: None)
+        :param hooks: Callables receiving a :class:`u2s_sdk.metrics.RequestEvent` after each request, and a
+            :class:`u2s_sdk.metrics.ChunkEvent` after each chunk upload (e.g. a MetricsCollector)
+        """
+        if find_spec('httpx') is None:
+            raise ImportError('AsyncApiClient requires httpx, install it with: pip install u2s-sdk[async]')
+
+        self.base_url = base_url
+        self.timeout = timeout
+        self.api_key = api_key
+        self.oauth_token = oauth_token
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.hooks = list(hooks or [])
+
+        self.logger = logging.getLogger(__name__)
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        Close the pooled async transport and release its connections.
+
+        The client can still be used afterwards; a new transport is created on the next request.
+        """
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.aclose()
+
+    def get_logger(self):
+        """
+        Get the logger.
+
+        :return: The logger
+        """
+        return self.logger
+
+    def get_session(self):
+        """
+        Get the pooled async HTTP session, creating it on first use.
+
+        :return: The session
+        """
+        if self._session is None:
+            # httpx is imported on first network use, to keep the SDK import cheap
+            import httpx
+
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            )
+            self._session = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        return self._session
+
+    def add_hook(self, hook):
+        """
+        Add an instrumentation hook.
+
+        :param hook: A callable receiving the request and chunk events
+        """
+        self.hooks.append(hook)
+
+    def emit(self, event):
+        """
+        Send an event to the instrumentation hooks.
+
+        :param event: The event
+        """
+        emit_event(self.hooks, event, self.logger)
+
+    def get_headers(self):
+        """
+        Get the headers.
+
+        :return: The headers
+        """
+        headers = {
+            'Accept': 'application/json'
+        }
+
+        if self.api_key:
+            headers['X-Api-Key'] = self.api_key
+
+        if self.oauth_token:
+            headers['Authorization'] = f'Bearer {self.oauth_token}'
+
+        return headers
+
+    async def get(self, endpoint: str, headers=None, params=None):
+        """
+        Perform a GET request.
+
+        :param endpoint: The endpoint
+        :param headers: The headers
+        :param params: The query parameters
+        :return: The response
+        """
+        return await self._make_request('GET', endpoint, headers=headers, params=params)
+
+    async def get_json(self, endpoint: str, headers=None, params=None):
+        """
+        Perform a GET request and parse its JSON body.
+
+        With a response cache, a cached body is revalidated with ``If-None-Match`` /
+        ``If-Modified-Since`` and reused as-is when the server answers 304 Not Modified.
+
+        :param endpoint: The endpoint
+        :param headers: The headers
+        :param params: The query parameters
+        :return: The parsed body, or None on error
+        """
+        cache = self.response_cache
+        if cache is None:
+            response = await self.get(endpoint, headers=headers, params=params)
+            if response is not None and response.status_code == 200:
+                return response.json()
+            return None
+
+        key = cache.get_key(build_url(self.base_url, endpoint), params, {**self.get_headers(), **(headers or {})})
+        headers = {**(headers or {}), **cache.get_validators(key)}
+
+        response = await self.get(endpoint, headers=headers, params=params)
+        if response is None:
+            return None
+
+        if response.status_code == 304:
+            data = cache.get(key)
+            if data is not None:
+                self.logger.debug('Not modified, reusing the cached response of %s', endpoint)
+                return data
+            # The entry was evicted in the meantime, fetch the body again
+            headers = {name: value for name, value in headers.items()
+                       if name not in ('If-None-Match', 'If-Modified-Since')}
+            response = await self.get(endpoint, headers=headers, params=params)
+            if response is None:
+                return None
+
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        cache.put(key, response.headers, data)
+        return data
+
+    async def post(self, endpoint: str, data=None, headers=None):
+        """
+        Perform a POST request.
+
+        :param endpoint: The endpoint
+        :param data: The data
+        :param headers: The headers
+        :return: The response
+        """
+        return await self._make_request('POST', endpoint, data=data, headers=headers)
+
+    async def put(self, endpoint: str, data=None, headers=None, json=None):
+        """
+        Perform a PUT request.
+
+        :param endpoint: The endpoint
+        :param data: The data
+        :param headers: The headers
+        :param json: The JSON body
+        :return: The response
+        """
+        return await self._make_request('PUT', endpoint, data=data, headers=headers, json=json)
+
+    async def delete(self, endpoint: str, headers=None):
+        """
+        Perform a DELETE request.
+
+        :param endpoint: The endpoint
+        :param headers: The headers
+        :return: The response
+        """
+        return await self._make_request('DELETE', endpoint, headers=headers)
+
+    async def _make_request(self, method: str, endpoint: str, data=None, headers=None, params=None, json=None):
+        """
+        Make a request.
+
+        :param method: The method
+        :param endpoint: The endpoint
+        :param data: The data
+        :param headers: The headers
+        :param params: The query parameters
+        :param json: The JSON body
+        :return: The response
+        """
+        url = build_url(self.base_url, endpoint)
+        _headers = self.get_headers()
+
+        # Merge the headers
+        if headers:
+            _headers.update(headers)
+        headers = _headers
+
+        if params:
+            # Drop unset parameters, like requests does
+            params = {key: value for key, value in params.items() if value is not None}
+
+        if not self.hooks:
+            return await self._send(method, url, data, headers, params, json)
+
+        event = RequestEvent(method, url, bytes_sent=get_body_size(data))
+        started_at = time.monotonic()
+        response = await self._send(method, url, data, headers, params, json, event)
+        event.duration = time.monotonic() - started_at
+
+        if response is not None:
+            event.bytes_received = get_response_size(response)
+        elif event.error is None:
+            event.error = Exception(f'Request failed. Status code: {event.status_code}')
+
+        self.emit(event)
+        return response
+
+    async def _send(self, method: str, url: str, data, headers: dict, params, json, event=None):
+        """
+        Send a request, retrying it according to the retry policy.
+
+        :meta private:
+
+        :param event: The RequestEvent to fill in (optional)
+        :return: The response, or None on error
+        """
+        # Lazily imported, see get_session
+        import httpx
+
+        retry_policy = self.retry_policy
+        retryable = retry_policy is not None and retry_policy.is_retryable_request(method, data)
+        started_at = time.monotonic()
+        attempt = 0
+
+        while True:
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve(get_body_size(data))
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            try:
+                response = await self.get_session().request(
+                    method, url, headers=headers, content=data, params=params, json=json
+                )
+
+                if event is not None:
+                    event.status_code = response.status_code
+                    event.time_to_headers = response.elapsed.total_seconds()
+
+                if not (retryable and retry_policy.is_retryable_status(response.status_code)):
+                    # Resumable upload progress (308) is not an error
+                    if response.status_code >= 400:
+                        response.raise_for_status()
+                    return response
+
+                reason = f'status {response.status_code}'
+                delay = retry_policy.get_delay(attempt, response)
+
+            except httpx.TransportError as e:
+                if event is not None:
+                    event.error = e
+                if not retryable:
+                    self.logger.error('Error: %s', e)
+                    return None
+
+                response = None
+                reason = f'error: {e}'
+                delay = retry_policy.get_delay(attempt)
+
+            except httpx.HTTPError as e:
+                if event is not None:
+                    event.error = e
+                self.logger.error('Error: %s', e)
+                return None
+
+            if not retry_policy.can_retry(attempt, started_at, delay):
+                self.logger.error('Error: giving up %s %s after %s retries, last %s', method, url, attempt, reason)
+                return None
+
+            self.logger.warning('Retrying %s %s in %.2fs after %s', method, url, delay, reason)
+            await asyncio.sleep(delay)
+            rewind_body(data)
+            attempt += 1
+            if event is not None:
+                event.retries = attempt
+                event.error = None
@@ -0,0 +1,298 @@
+"""
+Async file module.
+
+u2s_sdk.async_file
+"""
+import asyncio
+
+from .async_client import AsyncApiClient
+from .cache import DownloadTokenCache
+from .file import BulkResult
+from .utils import get_page_records, has_next_page
+
+
+class AsyncFileHandler:
+    """
+    Asyncio file handler.
+
+    Mirrors :class:`u2s_sdk.file.FileHandler` on top of an :class:`AsyncApiClient`.
+    """
+    def __init__(self, api_client: AsyncApiClient, token_cache: DownloadTokenCache = None):
+        """
+        Constructor.
+
+        :param api_client: The async API client
+        :param token_cache: The download token cache, may be shared between handlers (default: None, no caching)
+        """
+        self.api_client = api_client
+        self.token_cache = token_cache
+        self._token_locks = {}
+        self.logger = api_client.get_logger()
+        self.limit = 100
+        self.include = 'owner'
+        self.search_join = 'and'
+
+    async def create_download_token(self, file_id: int):
+        """
+        Create a download token for a file.
+
+        :param file_id: The file ID
+        :return: The download token
+        """
+        endpoint = f'/files/{str(file_id)}/downloadtoken'
+        response = await self.api_client.get(endpoint)
+        if response is not None and response.status_code == 200:
+            return response.json()
+        else:
+            # Handle error response here
+            return None
+
+    async def get_download_token(self, file_id: int):
+        """
+        Get a download token for a file, reusing the cached one until shortly before it expires.
+
+        Concurrent callers missing the cache share a single token request.
+
+        :param file_id: The file ID
+        :return: The download token
+        """
+        if self.token_cache is None:
+            return await self.create_download_token(file_id)
+
+        token_data = self.token_cache.get(file_id)
+        if token_data is not None:
+            return token_data
+
+        key = str(file_id)
+        key_lock = self._token_locks.setdefault(key, asyncio.Lock())
+
+        async with key_lock:
+            # Another task may have created the token while we were waiting
+            token_data = self.token_cache.get(file_id)
+            if token_data is None:
+                token_data = await self.create_download_token(file_id)
+                if token_data is not None:
+                    self.token_cache.put(file_id, token_data)
+
+        if not key_lock.locked():
+            self._token_locks.pop(key, None)
+
+        return token_data
+
+    async def get_raw(self, file_id: int, range_header: str, token: str, dl_token: str, dl_expiry: int|str):
+        """
+        Get the raw file data.
+
+        :param file_id: The file ID
+        :param range_header: The range header
+        :param token: The token
+        :param dl_token: The download token
+        :param dl_expiry: The download expiry
+        :return: The raw file data
+        """
+        endpoint = f'/files/{str(file_id)}/raw'
+        headers = {
+            'Range': range_header,
+        }
+        params = {
+            'token': token,
+            'dl-token': dl_token,
+            'dl-expiry': dl_expiry,
+        }
+        response = await self.api_client.get(endpoint, headers=headers, params=params)
+        if response is not None and response.status_code in (200, 206):
+            return response.content
+        else:
+            # Handle error response here
+            return None
+
+    async def list(self, include=None, search=None, limit=None, search_join=None, page=None):
+        """
+        List files.
+
+        :param include: The include parameter (owner|uploadKey|shares|activity)
+        :param search: The search parameter
+        :param limit: The limit parameter
+        :param search_join: The search join parameter (or|and)
+        :param page: The page number, starting at 1 (default: first page)
+        :return: The file list
+        """
+
+        # Validate include parameter
+        if include is not None:
+            if include not in ['owner', 'uploadKey', 'shares', 'activity']:
+                raise Exception('Invalid include parameter')
+        else:
+            include = self.include
+
+        # Validate search_join parameter
+        if search_join is not None:
+            if search_join not in ['or', 'and']:
+                raise Exception('Invalid search_join parameter')
+        else:
+            search_join = self.search_join
+
+        # Validate limit parameter
+        if limit is not None:
+            if limit < 1 or limit > 100:
+                raise Exception('Invalid limit parameter')
+        else:
+            limit = self.limit
+
+        endpoint = '/files'
+        params = {
+            'include': include,
+            'search': search,
+            'limit': limit,
+            'searchJoin': search_join,
+            'page': page,
+        }
+        return await self.api_client.get_json(endpoint, params=params)
+
+    async def iter_list(self, include=None, search=None, limit=None, search_join=None, prefetch=False):
+        """
+        Iterate over every file, walking the listing page by page.
+
+        See :meth:`u2s_sdk.file.FileHandler.iter_list`; with ``prefetch`` the next page is fetched
+        by a background task.
+
+        :param include: The include parameter (owner|uploadKey|shares|activity)
+        :param search: The search parameter
+        :param limit: The page size (default: 100)
+        :param search_join: The search join parameter (or|and)
+        :param prefetch: Fetch the next page while the current one is consumed (default: False)
+        :return: An async generator of file records
+        """
+        limit = limit or self.limit
+
+        async def fetch(page):
+            page_data = await self.list(include=include, search=search, limit=limit, search_join=search_join, page=page)
+            if page_data is None:
+                raise Exception(f'Failed to list files. Page: {page}')
+            return page_data
+
+        prefetched = None
+        try:
+            page = 1
+            page_data = await fetch(page)
+            while True:
+                more = has_next_page(page_data, limit)
+                prefetched = asyncio.create_task(fetch(page + 1)) if prefetch and more else None
+
+                for record in get_page_records(page_data):
+                    yield record
+
+                if not more:
+                    break
+
+                page += 1
+                page_data = await prefetched if prefetched else await fetch(page)
+                prefetched = None
+        finally:
+            if prefetched is not None:
+                prefetched.cancel()
+
+    async def delete(self, file_id: int):
+        """
+        Delete a file.
+
+        :param file_id: The file ID
+        :return: True if the deletion was successful, False otherwise
+        """
+        endpoint = f'/files/{str(file_id)}'
+        response = await self.api_client.delete(endpoint)
+        if response is not None and response.status_code == 204:
+            # Deletion successful
+            return True
+        else:
+            # Handle error response here
+            return False
+
+    async def update(self, file_id: int, filename=None, description=None, visibility=None):
+        """
+        Update a file.
+
+        :param file_id: The file ID
+        :param filename: The filename (default: None, unchanged)
+        :param description: The description (default: None, unchanged)
+        :param visibility: The visibility (default: None, unchanged)
+        :return: The updated file
+        """
+        endpoint = f'/files/{str(file_id)}'
+        # Only the given fields are sent, the others keep their current value
+        fields = {
+            'filename': filename,
+            'description': description,
+            'visibility': visibility,
+        }
+        data = {key: value for key, value in fields.items() if value is not None}
+        response = await self.api_client.put(endpoint, json=data)
+        if response is not None and response.status_code == 200:
+            return response.json()
+        else:
+            # Handle error response here
+            return None
+
+    async def bulk_delete(self, file_ids, max_workers=8):
+        """
+        Delete many files concurrently.
+
+        See :meth:`u2s_sdk.file.FileHandler.bulk_delete`.
+
+        :param file_ids: An iterable of file IDs
+        :param max_workers: The maximum number of concurrent requests (default: 8)
+        :return: An async generator of BulkResult (the value is the delete return value)
+        """
+        items = ((file_id, {'file_id': file_id}) for file_id in file_ids)
+        async for result in self._run_bulk(self.delete, items, max_workers):
+            yield result
+
+    async def bulk_update(self, items, max_workers=8):
+        """
+        Update many files concurrently.
+
+        See :meth:`u2s_sdk.file.FileHandler.bulk_update`.
+
+        :param items: An iterable of dictionaries of update parameters (file_id, filename, description, visibility)
+        :param max_workers: The maximum number of concurrent requests (default: 8)
+        :return: An async generator of BulkResult (the value is the updated file)
+        """
+        async for result in self._run_bulk(self.update, ((item, item) for item in items), max_workers):
+            yield result
+
+    async def _run_bulk(self, operation, items, max_workers: int):
+        """
+        Run an operation over many items as concurrent tasks.
+
+        :meta private:
+
+        :param operation: The coroutine function, called with the keyword arguments of each item
+        :param items: An iterable of (item, keyword arguments) tuples
+        :param max_workers: The maximum number of concurrent operations
+        :return: An async generator of BulkResult
+        """
+        async def run(item, kwargs):
+            try:
+                value = await operation(**kwargs)
+                return BulkResult(item, ok=value not in (None, False), value=value)
+            except Exception as e:
+                self.logger.error('Error: %s', e)
+                return BulkResult(item, ok=False, error=e)
+
+        in_flight = set()
+        try:
+            for item, kwargs in items:
+                if len(in_flight) >= max_workers:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+
+                in_flight.add(asyncio.create_task(run(item, kwargs)))
+
+            while in_flight:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in in_flight:
+                task.cancel()
@@ -0,0 +1,413 @@
+"""
+Async handler module.
+
+u2s_sdk.async_handler
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+
+from .utils import (
+    get_key_value_from_uri,
+    get_upload_uri,
+    get_buffer_size,
+    iter_chunk_ranges,
+    parse_range_header,
+)
+from .async_client import AsyncApiClient
+from .log import get_trace_logger
+from .metrics import get_chunk_event
+from .stream import StreamChunker, iter_stream_chunks
+
+
+class AsyncResumableUploadHandler:
+    """
+    Asyncio resumable upload handler.
+
+    Mirrors :class:`u2s_sdk.handler.ResumableUploadHandler` on top of an :class:`AsyncApiClient`.
+    """
+
+    def __init__(self, api_client: AsyncApiClient):
+        """
+        Constructor.
+
+        :param api_client: The async API client
+        """
+        self.api_client = api_client
+        self.logger = api_client.get_logger()
+
+    async def start_upload(self, filename: str, total_size: int, content_type='application/octet-stream'):
+        """
+        Start a resumable upload.
+
+        :param filename: The filename
+        :param total_size: The total file size (in bytes), None if unknown (streaming upload)
+        :param content_type: The content type (default: application/octet-stream)
+        :return: The upload URI and the upload key
+        """
+        headers = {
+            'Content-Type': content_type,
+            'X-Upload-Content-Type': 'application/octet-stream'
+        }
+        if total_size is not None:
+            headers['X-Upload-Content-Length'] = str(total_size)
+
+        endpoint = '/files#resumable'
+        data = {
+            'filename': filename,
+        }
+        response = await self.api_client.post(endpoint, data=json.dumps(data), headers=headers)
+
+        if response is not None and response.status_code == 201:
+            location_uri = response.headers['Location']
+            self.logger.debug('Location URI: %s', location_uri)
+            upload_key = get_key_value_from_uri(location_uri)
+            self.logger.info('Resumable upload initiated successfully')
+            return location_uri, upload_key
+        else:
+            status_code = response.status_code if response is not None else None
+            raise Exception(f'Failed to initiate resumable upload. Status code: {status_code}')
+
+    async def upload_chunk(self, upload_uri: str, total_size: int, chunk_data: bytes, chunk_start: int, chunk_end: int):
+        """
+        Upload a chunk of data.
+
+        :param upload_uri: The upload URI (obtained from the response of the start_upload method)
+        :param total_size: The total file size (in bytes), None if unknown until the last chunk
+        :param chunk_data: The chunk data (bytes)
+        :param chunk_start: The start position of the chunk (0-based)
+        :param chunk_end: The end position of the chunk (0-based)
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        total = '*' if total_size is None else total_size
+        self.logger.debug('Uploading chunk %s-%s/%s', chunk_start, chunk_end, total)
+
+        headers = {
+            'Content-Range': f'bytes {chunk_start}-{chunk_end}/{total}',
+            'Content-Type': 'application/octet-stream',
+            'Content-Length': str(chunk_end - chunk_start + 1),
+        }
+
+        started_at = time.monotonic()
+        response = await self.api_client.put(upload_uri, data=chunk_data, headers=headers)
+
+        if self.api_client.hooks:
+            self.api_client.emit(get_chunk_event(
+                upload_uri, total_size, chunk_data, chunk_start, chunk_end, response, time.monotonic() - started_at
+            ))
+
+        if response is None:
+            raise Exception('Failed to upload chunk. Status code: None')
+
+        self.logger.debug('Response status code: %s', response.status_code)
+
+        trace_logger = get_trace_logger()
+        if trace_logger.isEnabledFor(logging.DEBUG):
+            trace_logger.debug('Response headers: %s', response.headers)
+            trace_logger.debug('Response text: %s', response.text)
+
+        if response.status_code == 201:
+            return response.headers
+        elif response.status_code == 308:
+            return False  # Chunk upload is still in progress
+        else:
+            self.logger.error(response.text)
+            raise Exception(f'Failed to upload chunk. Status code: {response.status_code}')
+
+    async def simulate_chunk_upload(self, buffer: bytes, chunk_size=5242880, filename=None):
+        """
+        Simulate chunk upload.
+
+        File reads run in a worker thread so they do not block the event loop.
+
+        :param buffer: The file buffer
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :param filename: The filename (default: random filename)
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        try:
+            total_size = get_buffer_size(buffer)
+
+            self.logger.info('Total file size: %s', total_size)
+
+            if not filename:
+                # Use a random filename
+                filename = os.urandom(16).hex()
+
+            upload_uri, upload_key = await self.start_upload(filename, total_size)
+
+            success = await self._upload_chunks(buffer, upload_uri, total_size, chunk_size)
+
+            self.logger.info('Resumable upload completed successfully')
+            return success
+        except Exception as e:
+            self.logger.error('Error: %s', e)
+            return False
+
+    async def get_upload_offset(self, upload_uri: str, total_size: int):
+        """
+        Get the number of bytes the server has committed for a resumable upload.
+
+        :param upload_uri: The upload URI (obtained from the response of the start_upload method)
+        :param total_size: The total file size (in bytes)
+        :return: The committed offset (in bytes)
+        """
+        offset, _ = await self._query_upload_status(upload_uri, total_size)
+        return offset
+
+    async def resume_upload(self, buffer: bytes, upload_uri=None, upload_key=None, chunk_size=5242880):
+        """
+        Resume an interrupted upload, sending only the bytes the server has not committed yet.
+
+        :param buffer: The file buffer (the same content as the interrupted upload)
+        :param upload_uri: The upload URI (obtained from the response of the start_upload method)
+        :param upload_key: The upload key, used when the upload URI is not given
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        if upload_uri is None:
+            if upload_key is None:
+                raise ValueError('Either upload_uri or upload_key is required')
+            upload_uri = get_upload_uri(upload_key)
+
+        try:
+            total_size = get_buffer_size(buffer)
+
+            offset, headers = await self._query_upload_status(upload_uri, total_size)
+            if headers:
+                self.logger.info('Resumable upload already completed')
+                return headers
+
+            self.logger.info('Resuming upload at %s/%s', offset, total_size)
+
+            buffer.seek(offset)
+            success = await self._upload_chunks(buffer, upload_uri, total_size, chunk_size, start=offset)
+
+            self.logger.info('Resumable upload completed successfully')
+            return success
+        except Exception as e:
+            self.logger.error('Error: %s', e)
+            return False
+
+    async def finish_upload(self, upload_uri: str, total_size: int):
+        """
+        Finalize an upload whose bytes are all sent, e.g. an empty file (which has no chunk to upload).
+
+        See :meth:`u2s_sdk.handler.ResumableUploadHandler.finish_upload`.
+
+        :param upload_uri: The upload URI (obtained from the response of the start_upload method)
+        :param total_size: The total file size (in bytes)
+        :return: Response headers (includes location) if the upload was finalized, False otherwise
+        """
+        _, headers = await self._query_upload_status(upload_uri, total_size)
+        return headers or False
+
+    async def _query_upload_status(self, upload_uri: str, total_size: int):
+        """
+        Query the status of a resumable upload.
+
+        :meta private:
+
+        :param upload_uri: The upload URI
+        :param total_size: The total file size (in bytes)
+        :return: The committed offset and the response headers if the upload is complete (None otherwise)
+        """
+        headers = {
+            'Content-Range': f'bytes */{total_size}',
+            'Content-Length': '0',
+        }
+        response = await self.api_client.put(upload_uri, headers=headers)
+
+        if response is None:
+            raise Exception('Failed to query upload status. Status code: None')
+
+        if response.status_code == 308:
+            return parse_range_header(response.headers.get('Range')), None
+        elif response.status_code in (200, 201):
+            return total_size, response.headers
+        else:
+            raise Exception(f'Failed to query upload status. Status code: {response.status_code}')
+
+    async def _upload_chunks(self, buffer: bytes, upload_uri: str, total_size: int, chunk_size: int, start=0):
+        """
+        Upload the chunks of a buffer sequentially, from its current position.
+
+        :meta private:
+
+        :param buffer: The file buffer, positioned at ``start``
+        :param upload_uri: The upload URI
+        :param total_size: The total file size (in bytes)
+        :param chunk_size: The chunk size (in bytes)
+        :param start: The offset of the first chunk (default: 0)
+        :return: Response headers (includes location) if the upload was finalized, False otherwise
+        """
+        success = False
+        for chunk_start, chunk_end in iter_chunk_ranges(total_size, chunk_size, start=start):
+            chunk_data = await asyncio.to_thread(buffer.read, chunk_end - chunk_start + 1)
+            success = await self.upload_chunk(upload_uri, total_size, chunk_data, chunk_start, chunk_end)
+
+        return success
+
+    async def parallel_chunk_upload(self, buffer: bytes, chunk_size=5242880, filename=None, max_workers=4,
+                                    max_in_flight=None):
+        """
+        Upload a file with several chunks in flight at once.
+
+        See :meth:`u2s_sdk.handler.ResumableUploadHandler.parallel_chunk_upload`; here the chunk
+        uploads are concurrent tasks on the running event loop.
+
+        :param buffer: The file buffer
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :param filename: The filename (default: random filename)
+        :param max_workers: The number of concurrent chunk uploads (default: 4)
+        :param max_in_flight: The maximum number of chunks read but not yet acknowledged (default: max_workers)
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        if max_in_flight is None:
+            max_in_flight = max_workers
+        max_in_flight = min(max_in_flight, max_workers)
+
+        try:
+            total_size = get_buffer_size(buffer)
+
+            self.logger.info('Total file size: %s', total_size)
+
+            if not filename:
+                # Use a random filename
+                filename = os.urandom(16).hex()
+
+            upload_uri, upload_key = await self.start_upload(filename, total_size)
+
+            if total_size == 0:
+                # No chunk to send, finalize the upload with its size
+                success = await self.finish_upload(upload_uri, 0)
+            else:
+                chunk_ranges = list(iter_chunk_ranges(total_size, chunk_size))
+                last_start, last_end = chunk_ranges.pop()
+
+                success = False
+                in_flight = set()
+                try:
+                    for chunk_start, chunk_end in chunk_ranges:
+                        if len(in_flight) >= max_in_flight:
+                            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                            success = self._collect_chunk_results(done) or success
+
+                        chunk_data = await asyncio.to_thread(buffer.read, chunk_end - chunk_start + 1)
+                        in_flight.add(asyncio.create_task(
+                            self.upload_chunk(upload_uri, total_size, chunk_data, chunk_start, chunk_end)
+                        ))
+
+                    if in_flight:
+                        done, in_flight = await asyncio.wait(in_flight)
+                        success = self._collect_chunk_results(done) or success
+                finally:
+                    for task in in_flight:
+                        task.cancel()
+
+                # All other chunks are acknowledged, the last one finalizes the upload
+                chunk_data = await asyncio.to_thread(buffer.read, last_end - last_start + 1)
+                success = await self.upload_chunk(upload_uri, total_size, chunk_data, last_start, last_end) or success
+
+            if not success:
+                raise Exception('Upload was not finalized by the server')
+
+            self.logger.info('Resumable upload completed successfully')
+            return success
+        except Exception as e:
+            self.logger.error('Error: %s', e)
+            return False
+
+    async def stream_upload(self, source, chunk_size=5242880, filename=None, content_type='application/octet-stream'):
+        """
+        Upload a stream of unknown length, such as a pipe or an async generator.
+
+        See :meth:`u2s_sdk.handler.ResumableUploadHandler.stream_upload`; reads from a synchronous
+        source run in a worker thread.
+
+        :param source: An async iterable of bytes-like blocks, a readable file-like object or an iterable of blocks
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :param filename: The filename (default: random filename)
+        :param content_type: The content type (default: application/octet-stream)
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        try:
+            if not filename:
+                # Use a random filename
+                filename = os.urandom(16).hex()
+
+            upload_uri, upload_key = await self.start_upload(filename, None, content_type)
+
+            # Hold each chunk until the next one is read, to send the total size with the last one
+            chunk_start = 0
+            pending = None
+            async for chunk_data in self._iter_stream_chunks(source, chunk_size):
+                if pending is not None:
+                    await self.upload_chunk(upload_uri, None, pending, chunk_start, chunk_start + len(pending) - 1)
+                    chunk_start += len(pending)
+                pending = chunk_data
+
+            if pending is None:
+                # Empty stream, finalize the upload with its size
+                success = await self.finish_upload(upload_uri, 0)
+            else:
+                total_size = chunk_start + len(pending)
+                success = await self.upload_chunk(upload_uri, total_size, pending, chunk_start, total_size - 1)
+                chunk_start = total_size
+
+            if not success:
+                raise Exception('Upload was not finalized by the server')
+
+            self.logger.info('Streaming upload of %s bytes completed successfully', chunk_start)
+            return success
+        except Exception as e:
+            self.logger.error('Error: %s', e)
+            return False
+
+    async def _iter_stream_chunks(self, source, chunk_size: int):
+        """
+        Split a stream of unknown length into chunks.
+
+        :meta private:
+
+        :param source: An async iterable of bytes-like blocks, a readable file-like object or an iterable of blocks
+        :param chunk_size: The chunk size (in bytes)
+        :return: An async iterator of chunks (bytes), every one of ``chunk_size`` bytes but the last
+        """
+        if hasattr(source, '__aiter__'):
+            chunker = StreamChunker(chunk_size)
+            async for block in source:
+                for chunk in chunker.feed(block):
+                    with chunk:
+                        yield bytes(chunk)
+
+            chunk = chunker.flush()
+            if chunk is not None:
+                with chunk:
+                    yield bytes(chunk)
+            return
+
+        chunks = iter_stream_chunks(source, chunk_size)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            with chunk:
+                yield bytes(chunk)
+
+    def _collect_chunk_results(self, tasks):
+        """
+        Collect the results of finished chunk uploads.
+
+        :meta private:
+
+        :param tasks: The finished tasks
+        :return: Response headers if one of the chunks finalized the upload, False otherwise
+        """
+        success = False
+        for task in tasks:
+            # Re-raises the chunk upload exception, if any
+            success = task.result() or success
+        return success
@@ -0,0 +1,351 @@
+"""
+Batch upload module.
+
+u2s_sdk.batch
+"""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .checksum import UploadChecksum
+from .dedup import DedupIndex
+from .handler import ResumableUploadHandler
+from .stream import get_chunk_body
+from .utils import iter_chunk_ranges, get_file_id_from_location
+
+
+class UploadResult:
+    """
+    The result of one file of a batch upload.
+    """
+    def __init__(self, file_path: str, filename: str, ok: bool, headers=None, error=None, file_id=None,
+                 skipped=False, checksums=None):
+        """
+        Constructor.
+
+        :param file_path: The uploaded file path
+        :param filename: The remote filename
+        :param ok: True if the upload was successful, False otherwise
+        :param headers: The response headers of the finalized upload (includes location)
+        :param error: The exception that failed the upload, if any
+        :param file_id: The remote file ID, if known
+        :param skipped: True if the file was already uploaded and was not sent again
+        :param checksums: The whole-file checksums, as a dictionary of algorithm to hex digest (if enabled)
+        """
+        self.file_path = file_path
+        self.filename = filename
+        self.ok = ok
+        self.headers = headers
+        self.error = error
+        self.file_id = file_id
+        self.skipped = skipped
+        self.checksums = checksums
+
+    def __repr__(self):
+        return (f'UploadResult(file_path={self.file_path!r}, ok={self.ok!r}, skipped={self.skipped!r}, '
+                f'error={self.error!r})')
+
+
+class _FileUpload:
+    """
+    The scheduling state of one file.
+
+    :meta private:
+    """
+    def __init__(self, file_path: str, filename: str, size: int, chunk_size: int):
+        self.file_path = file_path
+        self.filename = filename
+        self.size = size
+        self.content_hash = None
+        self.checksum = None
+        self.buffer = None
+        self.upload_uri = None
+        self.started = False
+        self.chunks = deque(iter_chunk_ranges(size, chunk_size))
+        # An empty file has no chunk, its upload is finalized with an empty range
+        self.final_chunk = self.chunks.pop() if self.chunks else (0, -1)
+        self.outstanding = 0
+        self.failed = False
+
+    def next_task(self):
+        """
+        Get the next task of the file, if one can be scheduled now.
+
+        :return: A (kind, chunk range) tuple, or None
+        """
+        if self.failed:
+            return None
+        if not self.started:
+            return 'start', None
+        if self.upload_uri is None:
+            return None
+        if self.chunks:
+            return 'chunk', self.chunks[0]
+        if self.final_chunk is not None and self.outstanding == 0:
+            # The last chunk finalizes the upload once every other chunk is acknowledged
+            return 'final', self.final_chunk
+        return None
+
+
+class BatchUploadManager:
+    """
+    Batch upload manager.
+
+    Uploads many files on one shared worker pool (and the connection pool of the handler's client).
+    Chunks of the active files are scheduled round-robin, within global limits on in-flight bytes
+    and requests. Small files (a single chunk) and large files are admitted alternately, so small
+    files are not stuck behind large ones.
+
+    With a :class:`u2s_sdk.dedup.DedupIndex`, files whose content was already uploaded are skipped.
+    """
+    def __init__(self, handler: ResumableUploadHandler, chunk_size=5242880, max_workers=8,
+                 max_in_flight_bytes=67108864, max_in_flight_requests=None, max_active_files=None,
+                 dedup_index: DedupIndex = None, hash_workers=None, checksum_algorithms=None):
+        """
+        Constructor.
+
+        :param handler: The resumable upload handler
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :param max_workers: The number of worker threads (default: 8)
+        :param max_in_flight_bytes: The maximum number of chunk bytes in flight (default: 64 MB)
+        :param max_in_flight_requests: The maximum number of requests in flight (default: max_workers)
+        :param max_active_files: The maximum number of files uploading at once (default: 2 * max_workers)
+        :param dedup_index: The content-hash index used to skip already uploaded files (default: None)
+        :param hash_workers: The number of hashing processes (default: the number of CPUs)
+        :param checksum_algorithms: The checksum algorithms computed while uploading and verified against the
+            final response, e.g. ('md5', 'sha256') (default: None, no checksums)
+        """
+        self.handler = handler
+        self.logger = handler.logger
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self.max_in_flight_requests = max_in_flight_requests or max_workers
+        self.max_active_files = max_active_files or 2 * max_workers
+        self.dedup_index = dedup_index
+        self.hash_workers = hash_workers
+        self.checksum_algorithms = checksum_algorithms
+
+        self._small_files = deque()
+        self._large_files = deque()
+
+    def submit(self, file_path: str, filename=None):
+        """
+        Add a file to the batch.
+
+        :param file_path: The file path
+        :param filename: The remote filename (default: the file base name)
+        """
+        size = os.path.getsize(file_path)
+        upload = _FileUpload(file_path, filename or os.path.basename(file_path), size, self.chunk_size)
+
+        if size <= self.chunk_size:
+            self._small_files.append(upload)
+        else:
+            self._large_files.append(upload)
+
+    def submit_directory(self, root: str):
+        """
+        Add every file of a directory tree to the batch.
+
+        The remote filenames are the paths relative to ``root``, with ``/`` separators.
+
+        :param root: The directory path
+        :return: The number of files added
+        """
+        count = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                file_path = os.path.join(dirpath, name)
+                self.submit(file_path, os.path.relpath(file_path, root).replace(os.sep, '/'))
+                count += 1
+        return count
+
+    def run(self):
+        """
+        Upload the submitted files.
+
+        :return: A generator of UploadResult, yielded as each file completes
+        """
+        active = deque()
+        admitted = []
+        in_flight = {}
+        in_flight_bytes = 0
+        take_small = True
+
+        if self.dedup_index is not None:
+            yield from self._skip_uploaded()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while self._small_files or self._large_files or active:
+                # Admit new files, alternating between small and large ones
+                while len(active) < self.max_active_files and (self._small_files or self._large_files):
+                    if (take_small and self._small_files) or not self._large_files:
+                        upload = self._small_files.popleft()
+                    else:
+                        upload = self._large_files.popleft()
+                    take_small = not take_small
+                    active.append(upload)
+                    admitted.append(upload)
+
+                # Schedule the next task, round-robin over the active files
+                if len(in_flight) < self.max_in_flight_requests:
+                    task = None
+                    for _ in range(len(active)):
+                        task = active[0].next_task()
+                        if task is not None:
+                            break
+                        active.rotate(-1)
+
+                    if task is not None:
+                        upload = active[0]
+                        kind, chunk_range = task
+                        nbytes = chunk_range[1] - chunk_range[0] + 1 if chunk_range else 0
+
+                        # A chunk larger than the budget is still sent alone
+                        if not in_flight_bytes or in_flight_bytes + nbytes <= self.max_in_flight_bytes:
+                            active.rotate(-1)
+                            in_flight[self._submit_task(executor, upload, kind, chunk_range)] = (upload, kind, nbytes)
+                            in_flight_bytes += nbytes
+                            continue
+
+                if not in_flight:
+                    continue
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    upload, kind, nbytes = in_flight.pop(future)
+                    in_flight_bytes -= nbytes
+                    result = self._complete_task(upload, kind, future)
+                    if result is not None:
+                        active.remove(upload)
+                        yield result
+                    self._release(upload)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for upload in admitted:
+                if upload.buffer is not None:
+                    upload.buffer.close()
+                    upload.buffer = None
+            if self.dedup_index is not None:
+                self.dedup_index.save()
+
+    def _skip_uploaded(self):
+        """
+        Hash the submitted files and drop the ones whose content is already uploaded.
+
+        :meta private:
+
+        :return: A generator of UploadResult for the skipped files
+        """
+        uploads = [*self._small_files, *self._large_files]
+        hashes = self.dedup_index.hash_files([upload.file_path for upload in uploads], self.hash_workers)
+
+        skipped = set()
+        for upload in uploads:
+            upload.content_hash = hashes[upload.file_path]
+            file_id = self.dedup_index.find_remote(upload.content_hash)
+            if file_id is not None:
+                self.logger.debug('Skipping %s, already uploaded as %s', upload.file_path, file_id)
+                skipped.add(id(upload))
+                yield UploadResult(upload.file_path, upload.filename, True, file_id=file_id, skipped=True)
+
+        if skipped:
+            self._small_files = deque(upload for upload in self._small_files if id(upload) not in skipped)
+            self._large_files = deque(upload for upload in self._large_files if id(upload) not in skipped)
+
+    def _submit_task(self, executor, upload: _FileUpload, kind: str, chunk_range):
+        """
+        Submit a task of a file to the worker pool.
+
+        :meta private:
+
+        :param executor: The worker pool
+        :param upload: The file upload state
+        :param kind: The task kind (start|chunk|final)
+        :param chunk_range: The (start, end) chunk range, None for the start task
+        :return: The future
+        """
+        upload.outstanding += 1
+
+        if kind == 'start':
+            upload.started = True
+            upload.buffer = open(upload.file_path, 'rb')
+            if self.checksum_algorithms:
+                upload.checksum = UploadChecksum(self.checksum_algorithms)
+            return executor.submit(self.handler.start_upload, upload.filename, upload.size)
+
+        if kind == 'chunk':
+            upload.chunks.popleft()
+        else:
+            upload.final_chunk = None
+
+        if upload.size == 0:
+            return executor.submit(self.handler.finish_upload, upload.upload_uri, 0)
+
+        chunk_data = get_chunk_body(upload.buffer, *chunk_range)
+        # Chunks of a file are scheduled in order, so its checksums are computed in a single pass
+        extra_headers = upload.checksum.update(chunk_data, chunk_range[0]) if upload.checksum is not None else None
+        return executor.submit(
+            self.handler.upload_chunk_body, upload.upload_uri, upload.size, chunk_data, *chunk_range, extra_headers
+        )
+
+    def _complete_task(self, upload: _FileUpload, kind: str, future):
+        """
+        Record a finished task.
+
+        :meta private:
+
+        :param upload: The file upload state
+        :param kind: The task kind (start|chunk|final)
+        :param future: The finished future
+        :return: The UploadResult if the file is done, None otherwise
+        """
+        upload.outstanding -= 1
+        if upload.failed:
+            return None
+
+        try:
+            value = future.result()
+        except Exception as e:
+            self.logger.error('Error uploading %s: %s', upload.file_path, e)
+            upload.failed = True
+            return UploadResult(upload.file_path, upload.filename, False, error=e)
+
+        if kind == 'start':
+            upload.upload_uri, _ = value
+        elif kind == 'final':
+            if not value:
+                upload.failed = True
+                return UploadResult(upload.file_path, upload.filename, False,
+                                    error=Exception('Upload was not finalized by the server'))
+            checksums = None
+            if upload.checksum is not None:
+                try:
+                    upload.checksum.verify(value)
+                except Exception as e:
+                    self.logger.error('Error uploading %s: %s', upload.file_path, e)
+                    return UploadResult(upload.file_path, upload.filename, False, headers=value, error=e)
+                checksums = upload.checksum.hexdigests()
+
+            file_id = get_file_id_from_location(value.get('Location'))
+            if self.dedup_index is not None and upload.content_hash is not None and file_id is not None:
+                self.dedup_index.add_remote(upload.content_hash, file_id, upload.filename)
+            return UploadResult(upload.file_path, upload.filename, True, headers=value, file_id=file_id,
+                                checksums=checksums)
+
+        return None
+
+    @staticmethod
+    def _release(upload: _FileUpload):
+        """
+        Close the file of a finished or failed upload once none of its chunks are in flight.
+
+        :meta private:
+        """
+        done = upload.failed or (upload.final_chunk is None and not upload.chunks and upload.started)
+        if done and upload.outstanding == 0 and upload.buffer is not None:
+            upload.buffer.close()
+            upload.buffer = None
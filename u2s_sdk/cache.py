@@ -0,0 +1,272 @@
+"""
+Cache module.
+
+u2s_sdk.cache
+"""
+import time
+import threading
+from collections import OrderedDict
+
+
+def parse_expiry(expiry):
+    """
+    Parse a download token expiry.
+
+    :param expiry: The expiry, as a UNIX timestamp in seconds or milliseconds (int or str) or an ISO 8601 date
+    :return: The expiry as a UNIX timestamp (in seconds), or None if it can't be parsed
+    """
+    if expiry is None or isinstance(expiry, bool):
+        return None
+
+    try:
+        timestamp = float(expiry)
+    except (TypeError, ValueError):
+        from datetime import datetime
+
+        try:
+            return datetime.fromisoformat(str(expiry).replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
+
+    # Timestamps in milliseconds
+    if timestamp > 1e11:
+        timestamp /= 1000
+    return timestamp
+
+
+class DownloadTokenCache:
+    """
+    Thread-safe LRU cache of download tokens, keyed by file ID.
+
+    A token is reused until ``refresh_margin`` seconds before its ``dl-expiry``, then refreshed, so
+    a request never starts with a token about to expire. Concurrent callers asking for the same
+    missing token wait for a single request. Share one cache between the handlers (and threads)
+    downloading the same files.
+    """
+    def __init__(self, max_size=1024, refresh_margin=60.0):
+        """
+        Constructor.
+
+        :param max_size: The maximum number of cached tokens, the least recently used are evicted (default: 1024)
+        :param refresh_margin: The number of seconds before the expiry at which a token is refreshed (default: 60)
+        """
+        self.max_size = max_size
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+        self._key_locks = {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tokens)
+
+    def get(self, file_id):
+        """
+        Get a cached token, if it is not about to expire.
+
+        :param file_id: The file ID
+        :return: The download token, or None
+        """
+        key = str(file_id)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+
+            token_data, expires_at = entry
+            if expires_at - self.refresh_margin <= time.time():
+                del self._tokens[key]
+                return None
+
+            self._tokens.move_to_end(key)
+            return token_data
+
+    def put(self, file_id, token_data: dict):
+        """
+        Cache a token.
+
+        Tokens without a parsable ``dl-expiry`` are not cached.
+
+        :param file_id: The file ID
+        :param token_data: The download token (as returned by create_download_token)
+        """
+        expires_at = parse_expiry(token_data.get('dl-expiry')) if token_data else None
+        if expires_at is None:
+            return
+
+        key = str(file_id)
+        with self._lock:
+            self._tokens[key] = (token_data, expires_at)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+
+    def get_or_create(self, file_id, create):
+        """
+        Get a cached token, or create and cache a new one.
+
+        :param file_id: The file ID
+        :param create: A function creating a token for a file ID (e.g. FileHandler.create_download_token)
+        :return: The download token, or None if it could not be created
+        """
+        token_data = self.get(file_id)
+        if token_data is not None:
+            return token_data
+
+        key = str(file_id)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have created the token while we were waiting
+            token_data = self.get(file_id)
+            if token_data is None:
+                token_data = create(file_id)
+                if token_data is not None:
+                    self.put(file_id, token_data)
+
+        with self._lock:
+            if not key_lock.locked():
+                self._key_locks.pop(key, None)
+
+        return token_data
+
+    def invalidate(self, file_id=None):
+        """
+        Drop a cached token, or every cached token.
+
+        :param file_id: The file ID (default: None, every token)
+        """
+        with self._lock:
+            if file_id is None:
+                self._tokens.clear()
+            else:
+                self._tokens.pop(str(file_id), None)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of parsed JSON responses, revalidated with conditional requests.
+
+    Entries are keyed by URL, query parameters and credentials, and store the ``ETag`` and
+    ``Last-Modified`` validators of the response. A cached entry is revalidated with
+    ``If-None-Match`` / ``If-Modified-Since``; on a 304 the parsed body is reused without being
+    downloaded or decoded again. Entries not confirmed for ``ttl`` seconds are dropped.
+
+    The cached bodies are shared between callers and must be treated as read-only.
+    """
+    def __init__(self, max_size=256, ttl=300.0):
+        """
+        Constructor.
+
+        :param max_size: The maximum number of cached responses, the least recently used are evicted (default: 256)
+        :param ttl: The number of seconds an entry is kept without being confirmed by the server (default: 300)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @staticmethod
+    def get_key(url: str, params=None, headers=None):
+        """
+        Get the cache key of a request.
+
+        :param url: The request URL
+        :param params: The query parameters (None values are ignored)
+        :param headers: The request headers (only the credentials are part of the key)
+        :return: The cache key
+        """
+        params = tuple(sorted((str(name), str(value)) for name, value in (params or {}).items() if value is not None))
+        credentials = tuple((headers or {}).get(name) for name in ('Authorization', 'X-Api-Key'))
+        return url, params, credentials
+
+    def get_validators(self, key):
+        """
+        Get the conditional request headers of a cached response.
+
+        :param key: The cache key
+        :return: The If-None-Match / If-Modified-Since headers, empty if the response is not cached
+        """
+        entry = self._get_entry(key)
+        if entry is None:
+            return {}
+
+        etag, last_modified, _ = entry
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def get(self, key):
+        """
+        Get a cached response body, confirmed by a 304 response, and reset its TTL.
+
+        :param key: The cache key
+        :return: The parsed body, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            etag, last_modified, data, _ = entry
+            self._entries[key] = (etag, last_modified, data, time.monotonic())
+            self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, response_headers, data):
+        """
+        Cache a response body, if the response carries a validator.
+
+        :param key: The cache key
+        :param response_headers: The response headers
+        :param data: The parsed body
+        """
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        cache_control = (response_headers.get('Cache-Control') or '').lower()
+        if not (etag or last_modified) or 'no-store' in cache_control:
+            self.invalidate(key)
+            return
+
+        with self._lock:
+            self._entries[key] = (etag, last_modified, data, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """
+        Drop a cached response, or every cached response.
+
+        :param key: The cache key (default: None, every response)
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _get_entry(self, key):
+        """
+        Get the validators and body of an entry, dropping it if its TTL is over.
+
+        :meta private:
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            etag, last_modified, data, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+
+            return etag, last_modified, data
@@ -0,0 +1,299 @@
+"""
+Checksum module.
+
+u2s_sdk.checksum
+"""
+import base64
+import hashlib
+import threading
+
+from .stream import FileSlice
+
+try:
+    import crc32c
+except ImportError:  # pragma: no cover - optional dependency
+    crc32c = None
+
+
+class _Crc32cHash:
+    """
+    hashlib-like wrapper of the ``crc32c`` package.
+
+    :meta private:
+    """
+    def __init__(self):
+        self._value = 0
+
+    def update(self, data):
+        self._value = crc32c.crc32c(data, self._value)
+
+    def copy(self):
+        hash_object = _Crc32cHash()
+        hash_object._value = self._value
+        return hash_object
+
+    def digest(self):
+        return self._value.to_bytes(4, 'big')
+
+
+# Digest algorithm names, as used in the Digest header (RFC 3230)
+DIGEST_NAMES = {
+    'md5': 'MD5',
+    'sha256': 'SHA-256',
+    'crc32c': 'CRC32C',
+}
+
+
+def new_hash(algorithm: str):
+    """
+    Create an incremental hash object.
+
+    :param algorithm: The algorithm (md5|sha256|crc32c)
+    :return: The hash object
+    """
+    if algorithm == 'crc32c':
+        if crc32c is None:
+            raise ImportError('crc32c checksums require the crc32c package (pip install u2s-sdk[crc32c])')
+        return _Crc32cHash()
+
+    if algorithm not in DIGEST_NAMES:
+        raise ValueError(f'Unsupported checksum algorithm: {algorithm}')
+    return hashlib.new(algorithm)
+
+
+def get_digest_header(digests):
+    """
+    Build a Digest header.
+
+    :param digests: A dictionary of algorithm to raw digest
+    :return: The header value (e.g. "MD5=..., SHA-256=...")
+    """
+    return ', '.join(f'{DIGEST_NAMES[algorithm]}={base64.b64encode(digest).decode()}'
+                     for algorithm, digest in digests.items())
+
+
+def parse_digest_header(header: str):
+    """
+    Parse a Digest header.
+
+    :param header: The header value, may be None
+    :return: A dictionary of algorithm to raw digest, for the supported algorithms
+    """
+    names = {name.lower(): algorithm for algorithm, name in DIGEST_NAMES.items()}
+    digests = {}
+    for item in (header or '').split(','):
+        name, _, value = item.strip().partition('=')
+        algorithm = names.get(name.lower())
+        if algorithm is None:
+            continue
+        try:
+            digests[algorithm] = base64.b64decode(value)
+        except ValueError:
+            continue
+    return digests
+
+
+class UploadChecksum:
+    """
+    Incremental checksums of a resumable upload.
+
+    Each chunk is hashed once when it is prepared for upload: the chunk digests are sent with the
+    chunk (``Content-MD5`` and ``Digest`` headers) and the same bytes feed the whole-file digests,
+    so the file is not read in a separate pass. Without chunk headers, a :class:`FileSlice` chunk is
+    not read ahead: it is hashed as the transport reads its body, and only the bytes still unread
+    when the next chunk is given (chunks uploaded concurrently) are read by the checksum. Chunks
+    must be given in order; a chunk sent again (e.g. after a failure) does not change the whole-file
+    digests. Once the upload is finalized, :meth:`verify` compares the whole-file digests with the
+    ones returned by the server.
+
+    Use one instance per upload.
+    """
+    def __init__(self, algorithms=('md5',), chunk_headers=True, block_size=1048576):
+        """
+        Constructor.
+
+        :param algorithms: The checksum algorithms, among md5, sha256 and crc32c (default: md5)
+        :param chunk_headers: Send the chunk digests as request headers (default: True)
+        :param block_size: The read block size in bytes (default: 1 MB)
+        """
+        self.algorithms = tuple(algorithms)
+        self.chunk_headers = chunk_headers
+        self.block_size = block_size
+        self.offset = 0
+        self.complete = True
+        self._hashes = {algorithm: new_hash(algorithm) for algorithm in self.algorithms}
+        # The chunk hashed as it streams, and the number of its bytes hashed so far
+        self._streamed = None
+        self._streamed_length = 0
+        self._lock = threading.Lock()
+
+    def update(self, chunk_data, chunk_start: int):
+        """
+        Hash a chunk.
+
+        :param chunk_data: The chunk data (bytes or a seekable file-like object such as a FileSlice)
+        :param chunk_start: The start position of the chunk (0-based)
+        :return: The request headers carrying the chunk digests
+        """
+        # The whole-file digests must be fed in order
+        self._finish_streamed()
+
+        chunk_hashes = {algorithm: new_hash(algorithm) for algorithm in self.algorithms} \
+            if self.chunk_headers else {}
+
+        if chunk_start != self.offset:
+            if chunk_start > self.offset:
+                # The bytes before this chunk were never seen, the whole-file digests can't be computed
+                self.complete = False
+            elif not chunk_hashes:
+                return {}
+
+        if not chunk_hashes and isinstance(chunk_data, FileSlice) and self.complete:
+            # No header to send before the body, hash it as it is read
+            with self._lock:
+                self._streamed = chunk_data
+                self._streamed_length = 0
+            chunk_data.on_read = self._hash_read
+            self.offset += len(chunk_data)
+            return {}
+
+        hashes = list(chunk_hashes.values())
+        if chunk_start == self.offset and self.complete:
+            hashes.extend(self._hashes.values())
+
+        length = 0
+        for block in self._iter_blocks(chunk_data):
+            length += len(block)
+            for hash_object in hashes:
+                hash_object.update(block)
+
+        if chunk_start == self.offset:
+            self.offset += length
+
+        if not chunk_hashes:
+            return {}
+
+        digests = {algorithm: hash_object.digest() for algorithm, hash_object in chunk_hashes.items()}
+        headers = {'Digest': get_digest_header(digests)}
+        if 'md5' in digests:
+            headers['Content-MD5'] = base64.b64encode(digests['md5']).decode()
+        return headers
+
+    def digests(self):
+        """
+        Get the whole-file digests.
+
+        :return: A dictionary of algorithm to raw digest, None if some bytes were not hashed
+        """
+        self._finish_streamed()
+        if not self.complete:
+            return None
+        return {algorithm: hash_object.copy().digest() for algorithm, hash_object in self._hashes.items()}
+
+    def hexdigests(self):
+        """
+        Get the whole-file digests as hex strings.
+
+        :return: A dictionary of algorithm to hex digest, None if some bytes were not hashed
+        """
+        digests = self.digests()
+        if digests is None:
+            return None
+        return {algorithm: digest.hex() for algorithm, digest in digests.items()}
+
+    def verify(self, headers):
+        """
+        Check the whole-file digests against the final response of the upload.
+
+        The server digests are read from the ``Digest`` and ``Content-MD5`` headers, and from an
+        ``ETag`` holding a plain MD5 hex digest.
+
+        :param headers: The response headers of the finalized upload
+        :return: True if at least one digest was verified, False if there was nothing to compare
+        """
+        digests = self.digests()
+        if digests is None or not headers:
+            return False
+
+        server_digests = parse_digest_header(headers.get('Digest'))
+        if 'md5' not in server_digests:
+            if headers.get('Content-MD5'):
+                server_digests['md5'] = base64.b64decode(headers['Content-MD5'])
+            else:
+                etag = (headers.get('ETag') or '').strip('"')
+                if len(etag) == 32:
+                    try:
+                        server_digests['md5'] = bytes.fromhex(etag)
+                    except ValueError:
+                        pass
+
+        verified = False
+        for algorithm, digest in digests.items():
+            if algorithm not in server_digests:
+                continue
+            if server_digests[algorithm] != digest:
+                raise Exception(f'Checksum mismatch ({algorithm}): expected {digest.hex()}, '
+                                f'got {server_digests[algorithm].hex()}')
+            verified = True
+
+        return verified
+
+    def _hash_read(self, chunk_data, position: int, data):
+        """
+        Hash the bytes of the streamed chunk as they are read, once (a rewound body is read again).
+
+        :meta private:
+        """
+        with self._lock:
+            if chunk_data is not self._streamed:
+                # A late read of a previous chunk, already hashed by _finish_streamed
+                return
+            hashed = self._streamed_length
+            if position <= hashed < position + len(data):
+                block = data[hashed - position:]
+                for hash_object in self._hashes.values():
+                    hash_object.update(block)
+                self._streamed_length += len(block)
+
+    def _finish_streamed(self):
+        """
+        Hash the bytes of the streamed chunk that were not read yet, and stop following its reads.
+
+        :meta private:
+        """
+        with self._lock:
+            chunk_data = self._streamed
+            if chunk_data is None:
+                return
+            self._streamed = None
+            chunk_data.on_read = None
+
+            if self._streamed_length < len(chunk_data) and chunk_data.closed:
+                # The body was not sent in full and can't be read anymore
+                self.complete = False
+                return
+
+            while self._streamed_length < len(chunk_data):
+                block = chunk_data.pread(self.block_size, self._streamed_length)
+                for hash_object in self._hashes.values():
+                    hash_object.update(block)
+                self._streamed_length += len(block)
+
+    def _iter_blocks(self, chunk_data):
+        """
+        Read a chunk block by block, and rewind it for the upload.
+
+        :meta private:
+        """
+        if isinstance(chunk_data, (bytes, bytearray, memoryview)):
+            yield chunk_data
+            return
+
+        chunk_data.seek(0)
+        try:
+            for block in iter(lambda: chunk_data.read(self.block_size), b''):
+                if not block:
+                    break
+                yield block
+        finally:
+            chunk_data.seek(0)
@@ -4,53 +4,79 @@ Client module.
 u2s_sdk.client
 """
 import logging
-import requests
+import threading
+import time
+
+from .cache import ResponseCache
+from .log import DEFAULT_FORMAT, enable_logging
+from .metrics import RequestEvent, emit_event
+from .ratelimit import RateLimiter, get_body_size
+from .retry import RetryPolicy, rewind_body
+from .utils import build_url
 
 
 class ApiClient:
     """
     API client.
     """
-    def __init__(self, base_url='https://api.up2sha.re', timeout=10, api_key=None, oauth_token=None):
+    def __init__(self, base_url='https://api.up2sha.re', timeout=10, api_key=None, oauth_token=None,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True, idle_timeout=None,
+                 retry_policy: RetryPolicy = None, rate_limiter: RateLimiter = None,
+                 response_cache: ResponseCache = None, hooks=None):
         """
         Constructor.
 
+        The client owns a pooled HTTP session which is shared by every thread using the client,
+        so concurrent callers reuse warm keep-alive connections. Call :meth:`close` (or use the
+        client as a context manager) to release the pooled connections.
+
         :param base_url: The base URL (default: https://api.up2sha.re)
         :param timeout: The timeout (in seconds)
         :param api_key: The API key (optional)
         :param oauth_token: The OAuth token (optional)
+        :param pool_connections: The number of per-host connection pools to cache (default: 10)
+        :param pool_maxsize: The maximum number of connections kept per host (default: 10)
+        :param pool_block: Block when a host pool is exhausted instead of opening extra connections (default: False)
+        :param keep_alive: Keep connections open between requests (default: True)
+        :param idle_timeout: Drop pooled connections after this many idle seconds (default: None, never)
+        :param retry_policy: The retry policy for transient failures (default: None, no retries)
+        :param rate_limiter: The rate limiter shared by every request of the client (default: None, unlimited)
+        :param response_cache: The cache of JSON responses revalidated with ETag / Last-Modified (default: None)
+        :param hooks: Callables receiving a :class:`u2s_sdk.metrics.RequestEvent` after each request, and a
+            :class:`u2s_sdk.metrics.ChunkEvent` after each chunk upload (e.g. a MetricsCollector)
         """
         self.base_url = base_url
         self.timeout = timeout
         self.api_key = api_key
         self.oauth_token = oauth_token
-
-        # default logging level and format
-        self.set_logging()
-
-    # a method that defines the request logging level and format
-    def set_logging(self, level: int =logging.DEBUG, fmt: str ='%(asctime)s - %(name)s - %(levelname)s - %(message)s'):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.hooks = list(hooks or [])
+
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._last_used = None
+
+        self.logger = logging.getLogger(__name__)
+
+    def set_logging(self, level: int = logging.DEBUG, fmt: str = DEFAULT_FORMAT):
         """
-        Set logging.
+        Send the SDK logs to the console.
+
+        Logging is off by default. This is a shortcut for :func:`u2s_sdk.log.enable_logging`, which
+        installs a single handler however many clients call it; DEBUG also enables the verbose tracing.
 
         :param level: The logging level (default: logging.DEBUG)
         :param fmt: The logging format (default: '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         """
-        logger = logging.getLogger(__name__)
-        logger.setLevel(level)
-        # Create a console handler
-        console_handler = logging.StreamHandler()
-        # Set the formatter for the console handler (customize this as needed)
-        formatter = logging.Formatter(fmt)
-        console_handler.setFormatter(formatter)
-        # Add the console handler to the logger
-        logger.addHandler(console_handler)
-
-        # Store the logger in the class
-        self.logger = logger
-        self._set_requests_logging(level, fmt)
-
-    # method to get the logger
+        enable_logging(level, fmt, trace=level <= logging.DEBUG)
+
     def get_logger(self):
         """
         Get the logger.
@@ -59,31 +85,87 @@ class ApiClient:
         """
         return self.logger
 
-    # same for the request library
-    def _set_requests_logging(self, level: int, fmt: str):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close the pooled HTTP session and release its connections.
+
+        The client can still be used afterwards; a new session is created on the next request.
+        """
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            self._last_used = None
+
+    def get_session(self):
+        """
+        Get the pooled HTTP session, creating it on first use.
+
+        Pooled connections are evicted when the session has been idle for longer than ``idle_timeout``.
+
+        :return: The session
         """
-        Set logging for the requests library.
+        with self._session_lock:
+            now = time.monotonic()
+
+            if self._session is None:
+                self._session = self._create_session()
+            elif self.idle_timeout is not None and self._last_used is not None \
+                    and now - self._last_used > self.idle_timeout:
+                self.logger.debug('Evicting idle pooled connections')
+                for adapter in self._session.adapters.values():
+                    adapter.close()
+
+            self._last_used = now
+            return self._session
+
+    def _create_session(self):
+        """
+        Create a pooled HTTP session.
 
         :meta private:
 
-        :param level: The logging level
-        :param fmt: The logging format
+        :return: The session
+        """
+        # requests is imported on first network use, to keep the SDK import cheap
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+
+        return session
+
+    def add_hook(self, hook):
         """
-        logging.getLogger("requests").setLevel(level)
-        logging.getLogger("urllib3").setLevel(level)
-        # Create a console handler
-        console_handler = logging.StreamHandler()
-        # Set the formatter for the console handler (customize this as needed)
-        formatter = logging.Formatter(fmt)
-        console_handler.setFormatter(formatter)
-        # Add the console handler to the logger
-        logging.getLogger("requests").addHandler(console_handler)
-        logging.getLogger("urllib3").addHandler(console_handler)
+        Add an instrumentation hook.
 
-        # from http.client import HTTPConnection  # py3
+        :param hook: A callable receiving the request and chunk events
+        """
+        self.hooks.append(hook)
 
-        # # print statements from `http.client.HTTPConnection` to console/stdout
-        # HTTPConnection.debuglevel = 1
+    def emit(self, event):
+        """
+        Send an event to the instrumentation hooks.
+
+        :param event: The event
+        """
+        emit_event(self.hooks, event, self.logger)
 
     def get_headers(self):
         """
@@ -104,15 +186,65 @@ class ApiClient:
 
         return headers
 
-    def get(self, endpoint: str, headers=None):
+    def get(self, endpoint: str, headers=None, params=None, stream=False, raise_for_status=True):
         """
         Perform a GET request.
 
         :param endpoint: The endpoint
         :param headers: The headers
+        :param params: The query parameters
+        :param stream: Do not download the response body immediately (default: False)
+        :param raise_for_status: Treat 4xx and 5xx responses as errors (default: True). Set it to False to get
+            them back and handle their status code
         :return: The response
         """
-        return self._make_request('GET', endpoint, headers=headers)
+        return self._make_request('GET', endpoint, headers=headers, params=params, stream=stream,
+                                  raise_for_status=raise_for_status)
+
+    def get_json(self, endpoint: str, headers=None, params=None):
+        """
+        Perform a GET request and parse its JSON body.
+
+        With a response cache, a cached body is revalidated with ``If-None-Match`` /
+        ``If-Modified-Since`` and reused as-is when the server answers 304 Not Modified.
+
+        :param endpoint: The endpoint
+        :param headers: The headers
+        :param params: The query parameters
+        :return: The parsed body, or None on error
+        """
+        cache = self.response_cache
+        if cache is None:
+            response = self.get(endpoint, headers=headers, params=params)
+            if response is not None and response.status_code == 200:
+                return response.json()
+            return None
+
+        key = cache.get_key(build_url(self.base_url, endpoint), params, {**self.get_headers(), **(headers or {})})
+        headers = {**(headers or {}), **cache.get_validators(key)}
+
+        response = self.get(endpoint, headers=headers, params=params)
+        if response is None:
+            return None
+
+        if response.status_code == 304:
+            data = cache.get(key)
+            if data is not None:
+                self.logger.debug('Not modified, reusing the cached response of %s', endpoint)
+                return data
+            # The entry was evicted in the meantime, fetch the body again
+            headers = {name: value for name, value in headers.items()
+                       if name not in ('If-None-Match', 'If-Modified-Since')}
+            response = self.get(endpoint, headers=headers, params=params)
+            if response is None:
+                return None
+
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        cache.put(key, response.headers, data)
+        return data
 
     def post(self, endpoint:str , data=None, headers=None):
         """
@@ -125,16 +257,17 @@ class ApiClient:
         """
         return self._make_request('POST', endpoint, data=data, headers=headers)
 
-    def put(self, endpoint: str, data=None, headers=None):
+    def put(self, endpoint: str, data=None, headers=None, json=None):
         """
         Perform a PUT request.
 
         :param endpoint: The endpoint
         :param data: The data
         :param headers: The headers
+        :param json: The JSON body
         :return: The response
         """
-        return self._make_request('PUT', endpoint, data=data, headers=headers)
+        return self._make_request('PUT', endpoint, data=data, headers=headers, json=json)
 
     def delete(self, endpoint: str, headers=None):
         """
@@ -146,7 +279,8 @@ class ApiClient:
         """
         return self._make_request('DELETE', endpoint, headers=headers)
 
-    def _make_request(self, method: str, endpoint: str, data=None, headers=None):
+    def _make_request(self, method: str, endpoint: str, data=None, headers=None, params=None, stream=False,
+                      json=None, raise_for_status=True):
         """
         Make a request.
 
@@ -154,9 +288,13 @@ class ApiClient:
         :param endpoint: The endpoint
         :param data: The data
         :param headers: The headers
+        :param params: The query parameters
+        :param stream: Do not download the response body immediately (default: False)
+        :param json: The JSON body
+        :param raise_for_status: Treat 4xx and 5xx responses as errors (default: True)
         :return: The response
         """
-        url = f'{self.base_url}/{endpoint}'
+        url = build_url(self.base_url, endpoint)
         _headers = self.get_headers()
 
         # Merge the headers
@@ -164,24 +302,114 @@ class ApiClient:
             _headers.update(headers)
         headers = _headers
 
-        response = None
+        if not self.hooks:
+            return self._send(method, url, data, headers, params, stream, json, raise_for_status)
 
-        try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=self.timeout)
-            elif method == 'POST':
-                response = requests.post(url, headers=headers, data=data, timeout=self.timeout)
-            elif method == 'PUT':
-                response = requests.put(url, headers=headers, data=data, timeout=self.timeout)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers, timeout=self.timeout)
-
-            response.raise_for_status()
-
-        except requests.exceptions.RequestException as e:
-            # print(f'Error: {e}')
-            self.logger.error(f'Error: {e}')
-            return None
+        event = RequestEvent(method, url, bytes_sent=get_body_size(data))
+        started_at = time.monotonic()
+        response = self._send(method, url, data, headers, params, stream, json, raise_for_status, event)
+        event.duration = time.monotonic() - started_at
 
-        # return response.json()
+        if response is not None:
+            event.bytes_received = get_response_size(response, stream)
+        elif event.error is None:
+            event.error = Exception(f'Request failed. Status code: {event.status_code}')
+
+        self.emit(event)
         return response
+
+    def _send(self, method: str, url: str, data, headers: dict, params, stream: bool, json, raise_for_status=True,
+              event=None):
+        """
+        Send a request, retrying it according to the retry policy.
+
+        :meta private:
+
+        :param raise_for_status: Treat 4xx and 5xx responses as errors (default: True)
+        :param event: The RequestEvent to fill in (optional)
+        :return: The response, or None on error
+        """
+        # Lazily imported, see _create_session
+        import requests
+
+        retry_policy = self.retry_policy
+        retryable = retry_policy is not None and retry_policy.is_retryable_request(method, data)
+        started_at = time.monotonic()
+        attempt = 0
+
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(get_body_size(data))
+
+            try:
+                response = self.get_session().request(
+                    method, url, headers=headers, data=data, params=params, json=json, stream=stream,
+                    timeout=self.timeout,
+                )
+
+                if event is not None:
+                    event.status_code = response.status_code
+                    event.time_to_headers = response.elapsed.total_seconds()
+
+                if not (retryable and retry_policy.is_retryable_status(response.status_code)):
+                    if raise_for_status:
+                        response.raise_for_status()
+                    # return response.json()
+                    return response
+
+                reason = f'status {response.status_code}'
+                delay = retry_policy.get_delay(attempt, response)
+
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if event is not None:
+                    event.error = e
+                if not retryable:
+                    self.logger.error('Error: %s', e)
+                    return None
+
+                response = None
+                reason = f'error: {e}'
+                delay = retry_policy.get_delay(attempt)
+
+            except requests.exceptions.RequestException as e:
+                # print(f'Error: {e}')
+                if event is not None:
+                    event.error = e
+                self.logger.error('Error: %s', e)
+                return None
+
+            if not retry_policy.can_retry(attempt, started_at, delay):
+                self.logger.error('Error: giving up %s %s after %s retries, last %s', method, url, attempt, reason)
+                if response is not None:
+                    response.close()
+                return None
+
+            self.logger.warning('Retrying %s %s in %.2fs after %s', method, url, delay, reason)
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            rewind_body(data)
+            attempt += 1
+            if event is not None:
+                event.retries = attempt
+                event.error = None
+
+
+def get_response_size(response, stream=False):
+    """
+    Get the size of a response body.
+
+    :param response: The response
+    :param stream: True if the response body is streamed (its size is then only known from Content-Length)
+    :return: The size (in bytes), or None if unknown
+    """
+    content_length = response.headers.get('Content-Length')
+    if content_length is not None:
+        try:
+            return int(content_length)
+        except (TypeError, ValueError):
+            pass
+
+    if stream:
+        return None
+    return len(response.content)
@@ -0,0 +1,182 @@
+"""
+Compress module.
+
+u2s_sdk.compress
+"""
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .stream import iter_stream_chunks
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Compression codecs and their default levels
+CODECS = {
+    'gzip': 6,
+    'zstd': 3,
+}
+
+
+def _check_codec(codec: str):
+    """
+    Check that a codec is supported and available.
+
+    :meta private:
+    """
+    if codec not in CODECS:
+        raise ValueError(f'Unsupported compression codec: {codec}')
+    if codec == 'zstd' and zstandard is None:
+        raise ImportError('zstd compression requires the zstandard package (pip install u2s-sdk[zstd])')
+
+
+def new_compressobj(codec: str, level=None):
+    """
+    Create a streaming compressor.
+
+    :param codec: The codec (gzip|zstd)
+    :param level: The compression level (default: the codec default)
+    :return: An object with ``compress(data)`` and ``flush()`` methods
+    """
+    _check_codec(codec)
+    if level is None:
+        level = CODECS[codec]
+
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    # wbits=31 writes a gzip header and trailer
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def compress_block(block, codec: str, level=None):
+    """
+    Compress a block into a self-contained gzip member or zstd frame.
+
+    Compressed blocks can be concatenated: gzip and zstd decoders read the result as one stream.
+
+    :param block: The block (a bytes-like object)
+    :param codec: The codec (gzip|zstd)
+    :param level: The compression level (default: the codec default)
+    :return: The compressed block
+    """
+    compressobj = new_compressobj(codec, level)
+    return compressobj.compress(block) + compressobj.flush()
+
+
+class CompressionStage:
+    """
+    On-the-fly compression of an upload stream.
+
+    :meth:`iter_compress` turns a readable or an iterable of blocks into compressed blocks, to be
+    uploaded with :meth:`u2s_sdk.handler.ResumableUploadHandler.stream_upload` (chunk offsets and
+    the total size are then in compressed space). With several workers, blocks are compressed
+    independently on a thread pool (zlib and zstandard release the GIL), at the cost of a slightly
+    lower ratio; at most two blocks per worker are held in memory. The original and compressed
+    sizes are counted as the stream is read.
+
+    Use one instance per upload.
+    """
+    def __init__(self, codec='gzip', level=None, block_size=4194304, workers=1):
+        """
+        Constructor.
+
+        :param codec: The codec, gzip or zstd (default: gzip)
+        :param level: The compression level (default: the codec default)
+        :param block_size: The size of the blocks read from a readable source, and compressed independently
+            with several workers (in bytes, default: 4 MB)
+        :param workers: The number of compression threads (default: 1, a single compression stream)
+        """
+        _check_codec(codec)
+        self.codec = codec
+        self.level = level
+        self.block_size = block_size
+        self.workers = workers
+        self.original_size = 0
+        self.compressed_size = 0
+
+    @property
+    def ratio(self):
+        """
+        The compression ratio (original size / compressed size), None before any output.
+        """
+        return self.original_size / self.compressed_size if self.compressed_size else None
+
+    def get_metadata(self):
+        """
+        Get the file metadata describing the compression.
+
+        :return: A dictionary with the codec, the original size and the compressed size
+        """
+        return {
+            'content_encoding': self.codec,
+            'original_size': self.original_size,
+            'compressed_size': self.compressed_size,
+        }
+
+    def iter_compress(self, source):
+        """
+        Compress a stream.
+
+        :param source: A readable file-like object or an iterable of bytes-like blocks
+        :return: An iterator of compressed blocks (bytes)
+        """
+        blocks = self._iter_blocks(source)
+        compressed_blocks = self._compress_serial(blocks) if self.workers <= 1 else self._compress_parallel(blocks)
+        for compressed_block in compressed_blocks:
+            if compressed_block:
+                self.compressed_size += len(compressed_block)
+                yield compressed_block
+
+    def _iter_blocks(self, source):
+        """
+        Read the blocks of a source, counting the original size.
+
+        :meta private:
+        """
+        if hasattr(source, 'read'):
+            blocks = iter(lambda: source.read(self.block_size), b'')
+        elif self.workers > 1:
+            # Small blocks compress poorly on their own, regroup them
+            blocks = (bytes(chunk) for chunk in iter_stream_chunks(source, self.block_size))
+        else:
+            blocks = source
+
+        for block in blocks:
+            size = memoryview(block).nbytes
+            if size:
+                self.original_size += size
+                yield block
+
+    def _compress_serial(self, blocks):
+        """
+        Compress the blocks as a single stream.
+
+        :meta private:
+        """
+        compressobj = new_compressobj(self.codec, self.level)
+        for block in blocks:
+            yield compressobj.compress(block)
+        yield compressobj.flush()
+
+    def _compress_parallel(self, blocks):
+        """
+        Compress the blocks independently on a thread pool, keeping their order.
+
+        :meta private:
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            try:
+                for block in blocks:
+                    if len(pending) >= 2 * self.workers:
+                        yield pending.popleft().result()
+                    pending.append(executor.submit(compress_block, block, self.codec, self.level))
+
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
@@ -0,0 +1,158 @@
+"""
+Deduplication module.
+
+u2s_sdk.dedup
+"""
+import os
+import json
+import hashlib
+import threading
+
+
+def hash_file(file_path: str, algorithm='sha256', block_size=1048576):
+    """
+    Hash the content of a file, reading it block by block.
+
+    :param file_path: The file path
+    :param algorithm: The hashlib algorithm (default: sha256)
+    :param block_size: The read block size in bytes (default: 1 MB)
+    :return: The hex digest
+    """
+    digest = hashlib.new(algorithm)
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DedupIndex:
+    """
+    Local content-hash index used to skip re-uploading unchanged files.
+
+    The index maps a file (path, size, mtime) to its content hash, so unchanged files are not hashed
+    again, and a content hash to the remote file it was uploaded as. Remote entries can be checked
+    against the server listing with :meth:`sync_remote`.
+    """
+    def __init__(self, path=None, algorithm='sha256'):
+        """
+        Constructor.
+
+        :param path: The index file path (default: None, in memory only)
+        :param algorithm: The hashlib algorithm (default: sha256)
+        """
+        self.path = path
+        self.algorithm = algorithm
+        self._lock = threading.Lock()
+        self._files = {}
+        self._remote = {}
+
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                data = json.load(file)
+            if data.get('algorithm', algorithm) == algorithm:
+                self._files = data.get('files', {})
+                self._remote = data.get('remote', {})
+
+    def save(self):
+        """
+        Write the index to its file, atomically.
+        """
+        if self.path is None:
+            return
+
+        with self._lock:
+            data = {'algorithm': self.algorithm, 'files': self._files, 'remote': self._remote}
+
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.path)
+
+    def get_hash(self, file_path: str):
+        """
+        Get the indexed hash of a file, if the file did not change since it was hashed.
+
+        :param file_path: The file path
+        :return: The hex digest, or None
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        with self._lock:
+            entry = self._files.get(file_path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['hash']
+        return None
+
+    def hash_files(self, file_paths, max_workers=None):
+        """
+        Hash files, in parallel over a process pool, reusing the indexed hashes of unchanged files.
+
+        :param file_paths: An iterable of file paths
+        :param max_workers: The number of worker processes (default: the number of CPUs)
+        :return: A dictionary of file path to hex digest
+        """
+        hashes = {}
+        missing = []
+        for file_path in file_paths:
+            content_hash = self.get_hash(file_path)
+            if content_hash is None:
+                missing.append(file_path)
+            else:
+                hashes[file_path] = content_hash
+
+        if missing:
+            # Imports multiprocessing, only needed when some files must be hashed
+            from concurrent.futures import ProcessPoolExecutor
+
+            stats = [os.stat(file_path) for file_path in missing]
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                digests = executor.map(hash_file, missing, [self.algorithm] * len(missing), chunksize=16)
+                for file_path, stat, content_hash in zip(missing, stats, digests):
+                    hashes[file_path] = content_hash
+                    with self._lock:
+                        self._files[os.path.abspath(file_path)] = {
+                            'size': stat.st_size,
+                            'mtime_ns': stat.st_mtime_ns,
+                            'hash': content_hash,
+                        }
+
+        return hashes
+
+    def add_remote(self, content_hash: str, file_id, filename=None):
+        """
+        Record that a content hash was uploaded as a remote file.
+
+        :param content_hash: The hex digest
+        :param file_id: The remote file ID
+        :param filename: The remote filename (optional)
+        """
+        with self._lock:
+            self._remote[content_hash] = {'file_id': file_id, 'filename': filename}
+
+    def find_remote(self, content_hash: str):
+        """
+        Get the remote file ID of a content hash.
+
+        :param content_hash: The hex digest
+        :return: The remote file ID, or None
+        """
+        with self._lock:
+            entry = self._remote.get(content_hash)
+        return entry['file_id'] if entry else None
+
+    def sync_remote(self, file_handler):
+        """
+        Drop the remote entries whose file is no longer in the server listing.
+
+        :param file_handler: The FileHandler used to list the remote files
+        :return: The number of dropped entries
+        """
+        remote_ids = {str(record.get('id')) for record in file_handler.iter_list(prefetch=True)}
+
+        with self._lock:
+            stale = [content_hash for content_hash, entry in self._remote.items()
+                     if str(entry['file_id']) not in remote_ids]
+            for content_hash in stale:
+                del self._remote[content_hash]
+
+        return len(stale)
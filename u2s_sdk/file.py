@@ -3,20 +3,53 @@ File module.
 
 u2s_sdk.file
 """
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .cache import DownloadTokenCache
 from .client import ApiClient
+from .retry import RetryPolicy
+from .stream import IteratorReader
+from .utils import iter_chunk_ranges, get_page_records, has_next_page
+
+
+class BulkResult:
+    """
+    The result of one item of a bulk operation.
+    """
+    def __init__(self, item, ok: bool, value=None, error=None):
+        """
+        Constructor.
+
+        :param item: The item (file ID or update parameters)
+        :param ok: True if the operation was successful, False otherwise
+        :param value: The value returned by the operation
+        :param error: The exception raised by the operation, if any
+        """
+        self.item = item
+        self.ok = ok
+        self.value = value
+        self.error = error
+
+    def __repr__(self):
+        return f'BulkResult(item={self.item!r}, ok={self.ok!r}, error={self.error!r})'
 
 
 class FileHandler:
     """
     File handler.
     """
-    def __init__(self, api_client: ApiClient):
+    def __init__(self, api_client: ApiClient, token_cache: DownloadTokenCache = None):
         """
         Constructor.
 
         :param api_client: The API client
+        :param token_cache: The download token cache, may be shared between handlers (default: None, no caching)
         """
         self.api_client = api_client
+        self.token_cache = token_cache
         self.logger = api_client.get_logger()
         self.limit = 100
         self.include = 'owner'
@@ -31,12 +64,23 @@ class FileHandler:
         """
         endpoint = f'/files/{str(file_id)}/downloadtoken'
         response = self.api_client.get(endpoint)
-        if response.status_code == 200:
+        if response is not None and response.status_code == 200:
             return response.json()
         else:
             # Handle error response here
             return None
 
+    def get_download_token(self, file_id: int):
+        """
+        Get a download token for a file, reusing the cached one until shortly before it expires.
+
+        :param file_id: The file ID
+        :return: The download token
+        """
+        if self.token_cache is None:
+            return self.create_download_token(file_id)
+        return self.token_cache.get_or_create(file_id, self.create_download_token)
+
     def get_raw(self, file_id: int, range_header: str, token: str, dl_token: str, dl_expiry: int|str):
         """
         Get the raw file data.
@@ -58,16 +102,298 @@ class FileHandler:
             'dl-expiry': dl_expiry,
         }
         response = self.api_client.get(endpoint, headers=headers, params=params)
-        if response.status_code == 200:
-            return response.content
-        elif response.status_code == 206:
-            # Handle partial content response here
+        if response is not None and response.status_code in (200, 206):
             return response.content
         else:
             # Handle error response here
             return None
 
-    def list(self, include=None, search=None, limit=None, search_join=None):
+    def download(self, file_id: int, dest: str, part_size=8388608, max_workers=4, max_retries=3):
+        """
+        Download a file with several byte ranges in flight at once.
+
+        The destination file is preallocated and each range is streamed straight to its offset, so no
+        range is ever held in memory. Ranges that fail are retried from the last byte written, up to
+        ``max_retries`` times.
+
+        :param file_id: The file ID
+        :param dest: The destination file path
+        :param part_size: The size of each byte range in bytes (default: 8 MB)
+        :param max_workers: The number of concurrent range downloads (default: 4)
+        :param max_retries: The number of retries of the failed ranges (default: 3)
+        :return: True if the download was successful, False otherwise
+        """
+        token_data = self.get_download_token(file_id)
+        if token_data is None:
+            self.logger.error('Failed to create a download token for file %s', file_id)
+            return False
+
+        params = self._get_download_params(token_data)
+        total_size = self._get_file_size(file_id, params)
+        if total_size is None:
+            return False
+
+        with open(dest, 'wb') as file:
+            file.truncate(total_size)
+
+        pending = list(iter_chunk_ranges(total_size, part_size))
+        fd = os.open(dest, os.O_WRONLY)
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for attempt in range(max_retries + 1):
+                    if not pending:
+                        break
+                    if attempt:
+                        self.logger.warning('Retrying %s failed ranges of file %s', len(pending), file_id)
+                        # The token may have expired during the download
+                        token_data = self.get_download_token(file_id)
+                        if token_data is not None:
+                            params = self._get_download_params(token_data)
+
+                    results = executor.map(lambda part: self._download_range(file_id, params, fd, *part), pending)
+                    pending = [part for part in results if part is not None]
+        finally:
+            os.close(fd)
+
+        if pending:
+            self.logger.error('Failed to download file %s, %s ranges remaining', file_id, len(pending))
+            return False
+
+        return True
+
+    def iter_raw(self, file_id: int, chunk_size=65536, start=0, end=None, max_retries=3):
+        """
+        Stream the raw file data, with bounded memory.
+
+        The body is read incrementally, ``chunk_size`` bytes at a time. If the connection drops, the
+        download resumes from the last byte received with a new ``Range`` request (guarded by
+        ``If-Range`` when the server sent an ``ETag``), up to ``max_retries`` times in a row, backing off
+        as the client's retry policy does (or the default :class:`u2s_sdk.retry.RetryPolicy`). Client
+        errors (4xx) are raised without retrying.
+
+        :param file_id: The file ID
+        :param chunk_size: The size of the yielded blocks in bytes (default: 64 KB)
+        :param start: The start position (0-based, default: 0)
+        :param end: The end position (0-based, inclusive, default: the end of the file)
+        :param max_retries: The number of resumes in a row without receiving any byte (default: 3)
+        :return: An iterator of blocks (bytes)
+        """
+        endpoint = f'/files/{str(file_id)}/raw'
+        position = start
+        last_byte = end
+        etag = None
+        failures = 0
+
+        while last_byte is None or position <= last_byte:
+            if failures:
+                time.sleep(self._get_resume_delay(failures - 1))
+
+            token_data = self.get_download_token(file_id)
+            if token_data is None:
+                raise Exception(f'Failed to create a download token for file {file_id}')
+
+            headers = {
+                'Range': f'bytes={position}-{"" if end is None else end}',
+            }
+            if etag is not None:
+                headers['If-Range'] = etag
+
+            response = None
+            try:
+                # 4xx responses are returned, they are not worth retrying
+                response = self.api_client.get(endpoint, headers=headers, params=self._get_download_params(token_data),
+                                               stream=True, raise_for_status=False)
+                if response is None:
+                    raise ConnectionError('No response')
+                if response.status_code >= 500:
+                    response.close()
+                    raise ConnectionError(f'Status code: {response.status_code}')
+            except Exception as e:
+                failures += 1
+                if failures > max_retries:
+                    raise Exception(f'Failed to download file {file_id}: {e}') from e
+                self.logger.warning('Download of file %s failed at byte %s, retrying: %s', file_id, position, e)
+                continue
+
+            with response:
+                if response.status_code == 416 and end is None and \
+                        response.headers.get('Content-Range') == f'bytes */{position}':
+                    # Nothing left after position (e.g. an empty file)
+                    return
+
+                # A server ignoring the Range header (or If-Range after a change) sends the whole file
+                if not (response.status_code == 206 or (response.status_code == 200 and position == 0)):
+                    raise Exception(f'Failed to download file. Status code: {response.status_code}')
+
+                if last_byte is None:
+                    last_byte = self._get_last_byte(response, position)
+                if etag is None:
+                    etag = response.headers.get('ETag')
+
+                try:
+                    for block in response.iter_content(chunk_size=chunk_size):
+                        if last_byte is not None:
+                            block = block[:last_byte + 1 - position]
+                        if not block:
+                            continue
+
+                        position += len(block)
+                        failures = 0
+                        yield block
+
+                        if last_byte is not None and position > last_byte:
+                            return
+
+                    if last_byte is None:
+                        # No announced length, the body ends with the file
+                        return
+                    raise ConnectionError(f'Body ended early at byte {position}')
+                except Exception as e:
+                    failures += 1
+                    if failures > max_retries:
+                        raise Exception(f'Failed to download file {file_id}: {e}') from e
+                    self.logger.warning('Download of file %s interrupted at byte %s, resuming: %s', file_id,
+                                        position, e)
+
+    def open_raw(self, file_id: int, chunk_size=65536, start=0, end=None, max_retries=3):
+        """
+        Open the raw file data as a read-only file-like object.
+
+        See :meth:`iter_raw`, which it reads from. Close it (or use it as a context manager) to
+        release the connection.
+
+        :param file_id: The file ID
+        :param chunk_size: The size of the blocks read from the connection in bytes (default: 64 KB)
+        :param start: The start position (0-based, default: 0)
+        :param end: The end position (0-based, inclusive, default: the end of the file)
+        :param max_retries: The number of resumes in a row without receiving any byte (default: 3)
+        :return: A buffered reader over an IteratorReader
+        """
+        return io.BufferedReader(IteratorReader(self.iter_raw(file_id, chunk_size=chunk_size, start=start, end=end,
+                                                              max_retries=max_retries)), buffer_size=chunk_size)
+
+    def _get_resume_delay(self, attempt: int):
+        """
+        Get the delay before resuming a download.
+
+        :meta private:
+
+        :param attempt: The number of resumes already made in a row
+        :return: The delay (in seconds)
+        """
+        retry_policy = self.api_client.retry_policy or RetryPolicy()
+        return retry_policy.get_delay(attempt)
+
+    def _get_last_byte(self, response, position: int):
+        """
+        Get the position of the last byte of a raw download response.
+
+        :meta private:
+
+        :param response: The 200 or 206 response
+        :param position: The position of the first byte of the response
+        :return: The position of the last byte (0-based, inclusive), or None if the length is not announced
+        """
+        content_range = response.headers.get('Content-Range')
+        if content_range:
+            # Content-Range: bytes <start>-<end>/<total size>
+            byte_range = content_range.partition(' ')[2].partition('/')[0]
+            return int(byte_range.partition('-')[2])
+
+        content_length = response.headers.get('Content-Length')
+        if content_length:
+            return position + int(content_length) - 1
+        return None
+
+    def _get_download_params(self, token_data: dict):
+        """
+        Get the raw download query parameters from a download token.
+
+        :meta private:
+
+        :param token_data: The download token (as returned by create_download_token)
+        :return: The query parameters
+        """
+        return {
+            'token': token_data['token'],
+            'dl-token': token_data['dl-token'],
+            'dl-expiry': token_data['dl-expiry'],
+        }
+
+    def _get_file_size(self, file_id: int, params: dict):
+        """
+        Get the size of a file with a one-byte range request.
+
+        :meta private:
+
+        :param file_id: The file ID
+        :param params: The raw download query parameters
+        :return: The file size (in bytes), or None on error
+        """
+        endpoint = f'/files/{str(file_id)}/raw'
+        response = self.api_client.get(endpoint, headers={'Range': 'bytes=0-0'}, params=params, stream=True,
+                                       raise_for_status=False)
+        if response is None:
+            return None
+
+        try:
+            if response.status_code == 206:
+                # Content-Range: bytes 0-0/<total size>
+                return int(response.headers['Content-Range'].rpartition('/')[2])
+            elif response.status_code == 200:
+                return int(response.headers['Content-Length'])
+            elif response.status_code == 416 and response.headers.get('Content-Range') == 'bytes */0':
+                # Even the first byte is out of range, the file is empty
+                return 0
+            else:
+                self.logger.error('Failed to get the size of file %s. Status code: %s', file_id, response.status_code)
+                return None
+        finally:
+            response.close()
+
+    def _download_range(self, file_id: int, params: dict, fd: int, range_start: int, range_end: int):
+        """
+        Stream a byte range of a file to the same offset of a file descriptor.
+
+        :meta private:
+
+        :param file_id: The file ID
+        :param params: The raw download query parameters
+        :param fd: The destination file descriptor
+        :param range_start: The start position of the range (0-based)
+        :param range_end: The end position of the range (0-based, inclusive)
+        :return: None if the range was downloaded, the (start, end) range still missing otherwise
+        """
+        endpoint = f'/files/{str(file_id)}/raw'
+        headers = {
+            'Range': f'bytes={range_start}-{range_end}',
+        }
+        position = range_start
+
+        try:
+            response = self.api_client.get(endpoint, headers=headers, params=params, stream=True)
+            # A server ignoring the Range header sends the whole file, which only fits the first range
+            if response is None or not (response.status_code == 206 or (response.status_code == 200 and position == 0)):
+                status_code = response.status_code if response is not None else None
+                raise Exception(f'Failed to download range. Status code: {status_code}')
+
+            with response:
+                for block in response.iter_content(chunk_size=65536):
+                    block = block[:range_end + 1 - position]
+                    os.pwrite(fd, block, position)
+                    position += len(block)
+                    if position > range_end:
+                        break
+
+            if position <= range_end:
+                raise Exception(f'Range ended early at {position}')
+
+            return None
+        except Exception as e:
+            self.logger.error('Error downloading bytes %s-%s of file %s: %s', position, range_end, file_id, e)
+            return position, range_end
+
+    def list(self, include=None, search=None, limit=None, search_join=None, page=None):
         """
         List files.
 
@@ -75,6 +401,7 @@ class FileHandler:
         :param search: The search parameter
         :param limit: The limit parameter
         :param search_join: The search join parameter (or|and)
+        :param page: The page number, starting at 1 (default: first page)
         :return: The file list
         """
 
@@ -105,13 +432,50 @@ class FileHandler:
             'search': search,
             'limit': limit,
             'searchJoin': search_join,
+            'page': page,
         }
-        response = self.api_client.get(endpoint, params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            # Handle error response here
-            return None
+        return self.api_client.get_json(endpoint, params=params)
+
+    def iter_list(self, include=None, search=None, limit=None, search_join=None, prefetch=False):
+        """
+        Iterate over every file, walking the listing page by page.
+
+        Only one page is held in memory at a time. With ``prefetch``, the next page is fetched in
+        the background while the records of the current page are consumed.
+
+        :param include: The include parameter (owner|uploadKey|shares|activity)
+        :param search: The search parameter
+        :param limit: The page size (default: 100)
+        :param search_join: The search join parameter (or|and)
+        :param prefetch: Fetch the next page while the current one is consumed (default: False)
+        :return: A generator of file records
+        """
+        limit = limit or self.limit
+
+        def fetch(page):
+            page_data = self.list(include=include, search=search, limit=limit, search_join=search_join, page=page)
+            if page_data is None:
+                raise Exception(f'Failed to list files. Page: {page}')
+            return page_data
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = 1
+            page_data = fetch(page)
+            while True:
+                more = has_next_page(page_data, limit)
+                prefetched = executor.submit(fetch, page + 1) if executor and more else None
+
+                yield from get_page_records(page_data)
+
+                if not more:
+                    break
+
+                page += 1
+                page_data = prefetched.result() if prefetched else fetch(page)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
 
     def delete(self, file_id: int):
         """
@@ -122,7 +486,7 @@ class FileHandler:
         """
         endpoint = f'/files/{str(file_id)}'
         response = self.api_client.delete(endpoint)
-        if response.status_code == 204:
+        if response is not None and response.status_code == 204:
             # Deletion successful
             return True
         else:
@@ -134,20 +498,84 @@ class FileHandler:
         Update a file.
 
         :param file_id: The file ID
-        :param filename: The filename
-        :param description: The description
-        :param visibility: The visibility
+        :param filename: The filename (default: None, unchanged)
+        :param description: The description (default: None, unchanged)
+        :param visibility: The visibility (default: None, unchanged)
         :return: The updated file
         """
         endpoint = f'/files/{str(file_id)}'
-        data = {
+        # Only the given fields are sent, the others keep their current value
+        fields = {
             'filename': filename,
             'description': description,
             'visibility': visibility,
         }
+        data = {key: value for key, value in fields.items() if value is not None}
         response = self.api_client.put(endpoint, json=data)
-        if response.status_code == 200:
+        if response is not None and response.status_code == 200:
             return response.json()
         else:
             # Handle error response here
             return None
+
+    def bulk_delete(self, file_ids, max_workers=8):
+        """
+        Delete many files concurrently.
+
+        Results are yielded as the deletions complete, in no particular order. A failed deletion
+        yields an unsuccessful result instead of raising.
+
+        :param file_ids: An iterable of file IDs
+        :param max_workers: The maximum number of concurrent requests (default: 8)
+        :return: A generator of BulkResult (the value is the delete return value)
+        """
+        return self._run_bulk(self.delete, ((file_id, {'file_id': file_id}) for file_id in file_ids), max_workers)
+
+    def bulk_update(self, items, max_workers=8):
+        """
+        Update many files concurrently.
+
+        Results are yielded as the updates complete, in no particular order. A failed update
+        yields an unsuccessful result instead of raising.
+
+        :param items: An iterable of dictionaries of update parameters (file_id, filename, description, visibility)
+        :param max_workers: The maximum number of concurrent requests (default: 8)
+        :return: A generator of BulkResult (the value is the updated file)
+        """
+        return self._run_bulk(self.update, ((item, item) for item in items), max_workers)
+
+    def _run_bulk(self, operation, items, max_workers: int):
+        """
+        Run an operation over many items on a worker pool.
+
+        At most ``2 * max_workers`` items are queued at once, so that long iterables are consumed lazily.
+
+        :meta private:
+
+        :param operation: The operation, called with the keyword arguments of each item
+        :param items: An iterable of (item, keyword arguments) tuples
+        :param max_workers: The maximum number of concurrent operations
+        :return: A generator of BulkResult
+        """
+        def run(item, kwargs):
+            try:
+                value = operation(**kwargs)
+                return BulkResult(item, ok=value not in (None, False), value=value)
+            except Exception as e:
+                self.logger.error('Error: %s', e)
+                return BulkResult(item, ok=False, error=e)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = set()
+            for item, kwargs in items:
+                if len(in_flight) >= 2 * max_workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+                in_flight.add(executor.submit(run, item, kwargs))
+
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
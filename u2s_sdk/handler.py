@@ -5,9 +5,26 @@ u2s_sdk.handler
 """
 import os
 import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from .utils import get_key_value_from_uri
+from .utils import (
+    get_key_value_from_uri,
+    get_upload_uri,
+    get_buffer_size,
+    get_file_id_from_location,
+    iter_chunk_ranges,
+    parse_range_header,
+)
+from .checksum import UploadChecksum
 from .client import ApiClient
+from .compress import CompressionStage
+from .journal import UploadJournal
+from .log import get_trace_logger
+from .metrics import get_chunk_event
+from .sizing import AdaptiveChunkSizer
+from .stream import get_chunk_body, iter_stream_chunks
 
 
 class ResumableUploadHandler:
@@ -15,29 +32,32 @@ class ResumableUploadHandler:
     Resumable upload handler.
     """
 
-    def __init__(self, api_client: ApiClient):
+    def __init__(self, api_client: ApiClient, journal: UploadJournal = None):
         """
         Constructor.
 
         :param api_client: The API client
+        :param journal: The upload journal used by upload_file and resume_pending (optional)
         """
         self.api_client = api_client
         self.logger = api_client.get_logger()
+        self.journal = journal
 
     def start_upload(self, filename: str, total_size: int, content_type='application/octet-stream'):
         """
         Start a resumable upload.
 
         :param filename: The filename
-        :param total_size: The total file size (in bytes)
+        :param total_size: The total file size (in bytes), None if unknown (streaming upload)
         :param content_type: The content type (default: application/octet-stream)
         :return: The upload URI and the upload key
         """
         headers = {
             'Content-Type': content_type,
-            'X-Upload-Content-Length': str(total_size),
             'X-Upload-Content-Type': 'application/octet-stream'
         }
+        if total_size is not None:
+            headers['X-Upload-Content-Length'] = str(total_size)
 
         # Step 1: Initiate the resumable upload
         endpoint = '/files#resumable'
@@ -46,41 +66,61 @@ class ResumableUploadHandler:
         }
         response = self.api_client.post(endpoint, data=json.dumps(data), headers=headers)
 
+        if response is None:
+            raise Exception('Failed to initiate resumable upload. Status code: None')
+
         if response.status_code == 201:
             location_uri = response.headers['Location']
-            self.logger.debug(f'Location URI: {location_uri}')
+            self.logger.debug('Location URI: %s', location_uri)
             upload_key = get_key_value_from_uri(location_uri)
             self.logger.info('Resumable upload initiated successfully')
             return location_uri, upload_key
         else:
             raise Exception(f'Failed to initiate resumable upload. Status code: {response.status_code}')
 
-    def upload_chunk(self, upload_uri: str, total_size: int, chunk_data: bytes, chunk_start: int, chunk_end: int):
+    def upload_chunk(self, upload_uri: str, total_size: int, chunk_data: bytes, chunk_start: int, chunk_end: int,
+                     extra_headers=None):
         """
         Upload a chunk of data.
 
         :param upload_uri: The upload URI (obtained from the response of the start_upload method)
-        :param total_size: The total file size (in bytes)
-        :param chunk_data: The chunk data (bytes)
+        :param total_size: The total file size (in bytes), None if unknown until the last chunk
+        :param chunk_data: The chunk data (bytes or a readable file-like object such as a FileSlice)
         :param chunk_start: The start position of the chunk (0-based)
         :param chunk_end: The end position of the chunk (0-based)
+        :param extra_headers: Additional request headers, e.g. the chunk checksums (optional)
         :return: Response headers (includes location) if the upload was successful, False otherwise
         """
-        self.logger.info(f'Uploading chunk {chunk_start}-{chunk_end}/{total_size}')
+        total = '*' if total_size is None else total_size
+        self.logger.debug('Uploading chunk %s-%s/%s', chunk_start, chunk_end, total)
 
         headers = {
-            'Content-Range': f'bytes {chunk_start}-{chunk_end}/{total_size}',
+            'Content-Range': f'bytes {chunk_start}-{chunk_end}/{total}',
             'Content-Type': 'application/octet-stream',
             'Content-Length': str(chunk_end - chunk_start + 1),
         }
+        if extra_headers:
+            headers.update(extra_headers)
 
         # Step 2: Upload the chunk
+        started_at = time.monotonic()
         response = self.api_client.put(upload_uri, data=chunk_data, headers=headers)
 
-        self.logger.info(f'Response status code: {response.status_code}')
+        if self.api_client.hooks:
+            self.api_client.emit(get_chunk_event(
+                upload_uri, total_size, chunk_data, chunk_start, chunk_end, response, time.monotonic() - started_at
+            ))
 
-        self.logger.debug(f'Response headers: {response.headers}')
-        self.logger.debug(f'Response text: {response.text}')
+        if response is None:
+            raise Exception('Failed to upload chunk. Status code: None')
+
+        self.logger.debug('Response status code: %s', response.status_code)
+
+        # Decoding the body of every chunk response is only worth it when tracing
+        trace_logger = get_trace_logger()
+        if trace_logger.isEnabledFor(logging.DEBUG):
+            trace_logger.debug('Response headers: %s', response.headers)
+            trace_logger.debug('Response text: %s', response.text)
 
         if response.status_code == 201:
             # return True  # Chunk uploaded successfully
@@ -91,23 +131,23 @@ class ResumableUploadHandler:
             self.logger.error(response.text)
             raise Exception(f'Failed to upload chunk. Status code: {response.status_code}')
 
-    def simulate_chunk_upload(self, buffer: bytes, chunk_size=5242880, filename=None):
+    def simulate_chunk_upload(self, buffer: bytes, chunk_size=5242880, filename=None, chunk_sizer=None,
+                              checksum: UploadChecksum = None):
         """
         Simulate chunk upload.
 
         :param buffer: The file buffer
         :param chunk_size: The chunk size in bytes (default: 5 MB)
         :param filename: The filename (default: random filename)
+        :param chunk_sizer: An AdaptiveChunkSizer sizing each chunk from the measured throughput (optional,
+            overrides chunk_size)
+        :param checksum: An UploadChecksum computing the chunk and file checksums while uploading (optional)
         :return: Response headers (includes location) if the upload was successful, False otherwise
         """
         try:
-            # Seek to the end of the file
-            buffer.seek(0, 2)  # 0 indicates the offset and 2 indicates seeking from the end of the file
-            # Get the current file position, which is the length of the file
-            total_size = buffer.tell()
-            buffer.seek(0)  # Reset the file position to the beginning of the file
+            total_size = get_buffer_size(buffer)
 
-            self.logger.info(f'Total file size: {total_size}')
+            self.logger.info('Total file size: %s', total_size)
 
             if not filename:
                 # Use a random filename
@@ -115,23 +155,438 @@ class ResumableUploadHandler:
 
             upload_uri, upload_key = self.start_upload(filename, total_size)
 
+            success = self._upload_chunks(buffer, upload_uri, total_size, chunk_size, chunk_sizer=chunk_sizer,
+                                          checksum=checksum)
+
+            self.logger.info('Resumable upload completed successfully')
+            return success
+        except Exception as e:
+            self.logger.error('Error: %s', e)
+            # raise e
+            return False
+
+    def upload_file(self, file_path: str, chunk_size=5242880, filename=None, chunk_sizer=None,
+                    checksum: UploadChecksum = None):
+        """
+        Upload a file from disk, recording its progress in the journal (if any).
+
+        :param file_path: The file path
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :param filename: The filename (default: the file base name)
+        :param chunk_sizer: An AdaptiveChunkSizer sizing each chunk from the measured throughput (optional,
+            overrides chunk_size)
+        :param checksum: An UploadChecksum computing the chunk and file checksums while uploading (optional)
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        if not filename:
+            filename = os.path.basename(file_path)
+
+        try:
+            with open(file_path, 'rb') as buffer:
+                total_size = get_buffer_size(buffer)
+                upload_uri, upload_key = self.start_upload(filename, total_size)
+
+                if self.journal is not None:
+                    self.journal.start(file_path, upload_uri, upload_key, chunk_size)
+
+                success = self._upload_chunks(
+                    buffer, upload_uri, total_size, chunk_size, chunk_sizer=chunk_sizer,
+                    on_chunk=self._get_journal_callback(upload_uri), checksum=checksum,
+                )
+
+            if success and self.journal is not None:
+                self.journal.complete(upload_uri)
+
+            self.logger.info('Resumable upload completed successfully')
+            return success
+        except Exception as e:
+            self.logger.error('Error: %s', e)
+            return False
+
+    def resume_pending(self):
+        """
+        Resume every unfinished upload recorded in the journal.
+
+        Uploads whose file changed on disk since they were started are dropped from the journal.
+
+        :return: A dictionary of file path to upload result (response headers or False)
+        """
+        if self.journal is None:
+            raise ValueError('resume_pending requires an upload journal')
+
+        results = {}
+        for entry in self.journal.pending():
+            if not entry.is_unchanged():
+                self.logger.warning('File changed since the upload started, dropping it: %s', entry.file_path)
+                self.journal.complete(entry.upload_uri)
+                results[entry.file_path] = False
+                continue
+
+            try:
+                offset, headers = self._query_upload_status(entry.upload_uri, entry.size)
+                if not headers:
+                    self.logger.info('Resuming upload of %s at %s/%s', entry.file_path, offset, entry.size)
+                    with open(entry.file_path, 'rb') as buffer:
+                        headers = self._upload_chunks(
+                            buffer, entry.upload_uri, entry.size, entry.chunk_size, start=offset,
+                            on_chunk=self._get_journal_callback(entry.upload_uri),
+                        )
+
+                if headers:
+                    self.journal.complete(entry.upload_uri)
+                results[entry.file_path] = headers
+            except Exception as e:
+                self.logger.error('Error: %s', e)
+                results[entry.file_path] = False
+
+        return results
+
+    def get_upload_offset(self, upload_uri: str, total_size: int):
+        """
+        Get the number of bytes the server has committed for a resumable upload.
+
+        Sends an empty PUT with ``Content-Range: bytes */total_size``; the server answers 308 with
+        a ``Range`` header covering the committed bytes, or 200/201 if the upload is already complete.
+
+        :param upload_uri: The upload URI (obtained from the response of the start_upload method)
+        :param total_size: The total file size (in bytes)
+        :return: The committed offset (in bytes)
+        """
+        offset, _ = self._query_upload_status(upload_uri, total_size)
+        return offset
+
+    def resume_upload(self, buffer: bytes, upload_uri=None, upload_key=None, chunk_size=5242880, chunk_sizer=None):
+        """
+        Resume an interrupted upload, sending only the bytes the server has not committed yet.
+
+        :param buffer: The file buffer (the same content as the interrupted upload)
+        :param upload_uri: The upload URI (obtained from the response of the start_upload method)
+        :param upload_key: The upload key, used when the upload URI is not given
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :param chunk_sizer: An AdaptiveChunkSizer sizing each chunk from the measured throughput (optional,
+            overrides chunk_size)
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        if upload_uri is None:
+            if upload_key is None:
+                raise ValueError('Either upload_uri or upload_key is required')
+            upload_uri = get_upload_uri(upload_key)
+
+        try:
+            total_size = get_buffer_size(buffer)
+
+            offset, headers = self._query_upload_status(upload_uri, total_size)
+            if headers:
+                self.logger.info('Resumable upload already completed')
+                return headers
+
+            self.logger.info('Resuming upload at %s/%s', offset, total_size)
+
+            success = self._upload_chunks(
+                buffer, upload_uri, total_size, chunk_size, start=offset, chunk_sizer=chunk_sizer
+            )
+
+            self.logger.info('Resumable upload completed successfully')
+            return success
+        except Exception as e:
+            self.logger.error('Error: %s', e)
+            return False
+
+    def finish_upload(self, upload_uri: str, total_size: int):
+        """
+        Finalize an upload whose bytes are all sent, e.g. an empty file (which has no chunk to upload).
+
+        :param upload_uri: The upload URI (obtained from the response of the start_upload method)
+        :param total_size: The total file size (in bytes)
+        :return: Response headers (includes location) if the upload was finalized, False otherwise
+        """
+        _, headers = self._query_upload_status(upload_uri, total_size)
+        return headers or False
+
+    def _query_upload_status(self, upload_uri: str, total_size: int):
+        """
+        Query the status of a resumable upload.
+
+        :meta private:
+
+        :param upload_uri: The upload URI
+        :param total_size: The total file size (in bytes)
+        :return: The committed offset and the response headers if the upload is complete (None otherwise)
+        """
+        headers = {
+            'Content-Range': f'bytes */{total_size}',
+            'Content-Length': '0',
+        }
+        response = self.api_client.put(upload_uri, headers=headers)
+
+        if response is None:
+            raise Exception('Failed to query upload status. Status code: None')
+
+        if response.status_code == 308:
+            return parse_range_header(response.headers.get('Range')), None
+        elif response.status_code in (200, 201):
+            return total_size, response.headers
+        else:
+            raise Exception(f'Failed to query upload status. Status code: {response.status_code}')
+
+    def _get_journal_callback(self, upload_uri: str):
+        """
+        Get the chunk callback recording acknowledged chunks in the journal.
+
+        :meta private:
+
+        :param upload_uri: The upload URI
+        :return: The callback, or None without a journal
+        """
+        if self.journal is None:
+            return None
+
+        def on_chunk(chunk_start, chunk_end):
+            self.journal.ack(upload_uri, chunk_start, chunk_end)
+
+        return on_chunk
+
+    def _upload_chunks(self, buffer: bytes, upload_uri: str, total_size: int, chunk_size: int, start=0,
+                       chunk_sizer: AdaptiveChunkSizer = None, on_chunk=None, checksum: UploadChecksum = None):
+        """
+        Upload the chunks of a buffer sequentially.
+
+        :meta private:
+
+        :param buffer: The file buffer
+        :param upload_uri: The upload URI
+        :param total_size: The total file size (in bytes)
+        :param chunk_size: The chunk size (in bytes)
+        :param start: The offset of the first chunk (default: 0)
+        :param chunk_sizer: An adaptive chunk sizer (optional, overrides chunk_size)
+        :param on_chunk: A callback called with (chunk_start, chunk_end) once a chunk is acknowledged (optional)
+        :param checksum: An UploadChecksum, verified against the final response (optional)
+        :return: Response headers (includes location) if the upload was finalized, False otherwise
+        """
+        if total_size == 0:
+            # An empty file has no chunk, finalize the upload with its size
+            return self.finish_upload(upload_uri, 0)
+
+        success = False
+        chunk_start = start
+        while chunk_start < total_size:
+            if chunk_sizer is not None:
+                chunk_size = chunk_sizer.next_size()
+            chunk_end = min(chunk_start + chunk_size - 1, total_size - 1)
+
+            chunk_data = get_chunk_body(buffer, chunk_start, chunk_end)
+            extra_headers = checksum.update(chunk_data, chunk_start) if checksum is not None else None
+            started_at = time.monotonic()
+            success = self.upload_chunk_body(upload_uri, total_size, chunk_data, chunk_start, chunk_end,
+                                             extra_headers)
+
+            if chunk_sizer is not None:
+                chunk_sizer.record(chunk_end - chunk_start + 1, time.monotonic() - started_at)
+
+            if on_chunk is not None:
+                on_chunk(chunk_start, chunk_end)
+
+            chunk_start = chunk_end + 1
+
+            if success:
+                # We are done here
+                self.logger.debug('Response headers: %s', success)
+
+        if success and checksum is not None:
+            checksum.verify(success)
+
+        return success
+
+    def parallel_chunk_upload(self, buffer: bytes, chunk_size=5242880, filename=None, max_workers=4,
+                              max_in_flight=None, checksum: UploadChecksum = None):
+        """
+        Upload a file with several chunks in flight at once.
+
+        Chunks are read in order and uploaded on a worker pool. At most ``max_in_flight`` chunks are
+        held in memory at any time. The last chunk is only sent once every other chunk has been
+        acknowledged, so the server finalizes the upload (201) on that request.
+
+        :param buffer: The file buffer
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :param filename: The filename (default: random filename)
+        :param max_workers: The number of concurrent chunk uploads (default: 4)
+        :param max_in_flight: The maximum number of chunks read but not yet acknowledged (default: max_workers)
+        :param checksum: An UploadChecksum computing the chunk and file checksums while uploading (optional)
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        if max_in_flight is None:
+            max_in_flight = max_workers
+
+        try:
+            total_size = get_buffer_size(buffer)
+
+            self.logger.info('Total file size: %s', total_size)
+
+            if not filename:
+                # Use a random filename
+                filename = os.urandom(16).hex()
+
+            upload_uri, upload_key = self.start_upload(filename, total_size)
+
+            if total_size == 0:
+                # No chunk to send, finalize the upload with its size
+                success = self.finish_upload(upload_uri, 0)
+            else:
+                chunk_ranges = list(iter_chunk_ranges(total_size, chunk_size))
+                last_start, last_end = chunk_ranges.pop()
+
+                success = False
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    in_flight = set()
+                    try:
+                        for chunk_start, chunk_end in chunk_ranges:
+                            if len(in_flight) >= max_in_flight:
+                                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                                success = self._collect_chunk_results(done) or success
+
+                            chunk_data = get_chunk_body(buffer, chunk_start, chunk_end)
+                            # Chunks are hashed in order, before being handed to the workers
+                            extra_headers = checksum.update(chunk_data, chunk_start) if checksum is not None else None
+                            in_flight.add(executor.submit(
+                                self.upload_chunk_body, upload_uri, total_size, chunk_data, chunk_start, chunk_end,
+                                extra_headers,
+                            ))
+
+                        done, in_flight = wait(in_flight)
+                        success = self._collect_chunk_results(done) or success
+                    finally:
+                        for future in in_flight:
+                            future.cancel()
+
+                # All other chunks are acknowledged, the last one finalizes the upload
+                chunk_data = get_chunk_body(buffer, last_start, last_end)
+                extra_headers = checksum.update(chunk_data, last_start) if checksum is not None else None
+                success = self.upload_chunk_body(
+                    upload_uri, total_size, chunk_data, last_start, last_end, extra_headers
+                ) or success
+
+            if not success:
+                raise Exception('Upload was not finalized by the server')
+
+            if checksum is not None:
+                checksum.verify(success)
+
+            self.logger.info('Resumable upload completed successfully')
+            return success
+        except Exception as e:
+            self.logger.error('Error: %s', e)
+            return False
+
+    def stream_upload(self, source, chunk_size=5242880, filename=None, content_type='application/octet-stream',
+                      checksum: UploadChecksum = None, compression: CompressionStage = None):
+        """
+        Upload a stream of unknown length, such as a pipe, a subprocess stdout or a generator.
+
+        The stream is never seeked nor spooled to disk: chunks are sent with ``Content-Range:
+        bytes a-b/*`` and the total size is only sent with the last chunk. One chunk is read ahead
+        to detect the end of the stream, so at most two chunks are held in memory.
+
+        :param source: A readable file-like object or an iterable of bytes-like blocks
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :param filename: The filename (default: random filename)
+        :param content_type: The content type (default: application/octet-stream)
+        :param checksum: An UploadChecksum computing the chunk and file checksums while uploading (optional)
+        :param compression: A CompressionStage compressing the stream before it is cut into chunks (optional).
+            Offsets, sizes and checksums then apply to the compressed bytes, and the codec and original size
+            are recorded in the file metadata.
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        try:
+            if not filename:
+                # Use a random filename
+                filename = os.urandom(16).hex()
+
+            upload_uri, upload_key = self.start_upload(filename, None, content_type)
+
+            if compression is not None:
+                source = compression.iter_compress(source)
+
+            chunks = iter_stream_chunks(source, chunk_size)
+            chunk_data = next(chunks, None)
+            if chunk_data is None:
+                success = self.finish_upload(upload_uri, 0)
+
             chunk_start = 0
-            while chunk_start < (total_size - 1):
-                chunk_end = min(chunk_start + chunk_size - 1, total_size - 1)
-                chunk_data = buffer.read(chunk_end - chunk_start + 1)
-                success = self.upload_chunk(upload_uri, total_size, chunk_data, chunk_start, chunk_end)
+            while chunk_data is not None:
+                next_chunk_data = next(chunks, None)
+                chunk_end = chunk_start + len(chunk_data) - 1
+                total_size = chunk_end + 1 if next_chunk_data is None else None
+
+                extra_headers = checksum.update(chunk_data, chunk_start) if checksum is not None else None
+                success = self.upload_chunk_body(upload_uri, total_size, chunk_data, chunk_start, chunk_end,
+                                                 extra_headers)
 
                 chunk_start = chunk_end + 1
+                chunk_data = next_chunk_data
 
-                if success:
-                    # We are done here
-                    self.logger.info('Response headers: ', success)
-                    # break
-                    pass
+            if not success:
+                raise Exception('Upload was not finalized by the server')
 
-            self.logger.info('Resumable upload completed successfully')
+            if checksum is not None:
+                checksum.verify(success)
+
+            if compression is not None:
+                self.logger.info('Compressed %s bytes to %s bytes (%s)', compression.original_size,
+                                 compression.compressed_size, compression.codec)
+                self.set_metadata(success.get('Location'), compression.get_metadata())
+
+            self.logger.info('Streaming upload of %s bytes completed successfully', chunk_start)
             return success
         except Exception as e:
-            self.logger.error(f'Error: {e}')
-            # raise e
+            self.logger.error('Error: %s', e)
             return False
+
+    def set_metadata(self, location: str, metadata: dict):
+        """
+        Record metadata on an uploaded file.
+
+        :param location: The Location header of the finalized upload
+        :param metadata: The metadata
+        :return: The updated file
+        """
+        file_id = get_file_id_from_location(location)
+        if file_id is None:
+            raise Exception('Failed to record file metadata. No file location')
+
+        response = self.api_client.put(f'/files/{file_id}', json={'metadata': metadata})
+        if response is None or response.status_code != 200:
+            status_code = response.status_code if response is not None else None
+            raise Exception(f'Failed to record file metadata. Status code: {status_code}')
+
+        return response.json()
+
+    def upload_chunk_body(self, upload_uri: str, total_size: int, chunk_data, chunk_start: int, chunk_end: int,
+                          extra_headers=None):
+        """
+        Upload a chunk body and release it.
+
+        :param upload_uri: The upload URI
+        :param total_size: The total file size (in bytes), None if unknown until the last chunk
+        :param chunk_data: The chunk body (see :func:`u2s_sdk.stream.get_chunk_body`)
+        :param chunk_start: The start position of the chunk (0-based)
+        :param chunk_end: The end position of the chunk (0-based)
+        :param extra_headers: Additional request headers (optional)
+        :return: Response headers (includes location) if the upload was successful, False otherwise
+        """
+        with chunk_data:
+            return self.upload_chunk(upload_uri, total_size, chunk_data, chunk_start, chunk_end, extra_headers)
+
+    def _collect_chunk_results(self, futures):
+        """
+        Collect the results of finished chunk uploads.
+
+        :meta private:
+
+        :param futures: The finished futures
+        :return: Response headers if one of the chunks finalized the upload, False otherwise
+        """
+        success = False
+        for future in futures:
+            # Re-raises the chunk upload exception, if any
+            success = future.result() or success
+        return success
@@ -0,0 +1,290 @@
+"""
+Upload journal module.
+
+u2s_sdk.journal
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+
+def get_file_fingerprint(file_path: str, sample_size=1048576):
+    """
+    Get a cheap content fingerprint of a file.
+
+    The fingerprint hashes the file size with its first and last ``sample_size`` bytes, which is
+    enough to detect a file that was replaced or rewritten without reading it entirely.
+
+    :param file_path: The file path
+    :param sample_size: The number of bytes sampled at each end of the file (default: 1 MB)
+    :return: The fingerprint (hex digest)
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        digest.update(str(size).encode())
+        digest.update(file.read(sample_size))
+        if size > sample_size:
+            file.seek(max(sample_size, size - sample_size))
+            digest.update(file.read(sample_size))
+    return digest.hexdigest()
+
+
+class UploadJournalEntry:
+    """
+    An upload recorded in the journal.
+    """
+    def __init__(self, upload_uri: str, upload_key: str, file_path: str, size: int, mtime: float,
+                 fingerprint: str, chunk_size: int):
+        """
+        Constructor.
+
+        :param upload_uri: The upload URI (obtained from the response of the start_upload method)
+        :param upload_key: The upload key
+        :param file_path: The uploaded file path
+        :param size: The file size (in bytes)
+        :param mtime: The file modification time
+        :param fingerprint: The file fingerprint
+        :param chunk_size: The chunk size (in bytes)
+        """
+        self.upload_uri = upload_uri
+        self.upload_key = upload_key
+        self.file_path = file_path
+        self.size = size
+        self.mtime = mtime
+        self.fingerprint = fingerprint
+        self.chunk_size = chunk_size
+        self.acknowledged = []
+
+    @property
+    def offset(self):
+        """
+        The number of contiguous bytes acknowledged from the start of the file.
+        """
+        offset = 0
+        for chunk_start, chunk_end in sorted(self.acknowledged):
+            if chunk_start > offset:
+                break
+            offset = max(offset, chunk_end + 1)
+        return offset
+
+    def is_unchanged(self):
+        """
+        Check whether the file on disk is still the one being uploaded.
+
+        :return: True if the size, modification time and fingerprint match, False otherwise
+        """
+        try:
+            stat = os.stat(self.file_path)
+            if stat.st_size != self.size or stat.st_mtime != self.mtime:
+                return False
+            return get_file_fingerprint(self.file_path) == self.fingerprint
+        except OSError:
+            return False
+
+
+class UploadJournal:
+    """
+    Append-only on-disk journal of active uploads.
+
+    Each line of the journal is a JSON record. Chunk acknowledgements are buffered and synced to
+    disk every ``sync_every`` records or ``sync_interval`` seconds, whichever comes first; starting
+    and completing an upload are synced immediately. A lost acknowledgement only means a few more
+    bytes are checked against the server when resuming.
+    """
+    def __init__(self, path: str, sync_every=32, sync_interval=1.0):
+        """
+        Constructor.
+
+        :param path: The journal file path
+        :param sync_every: The number of buffered records after which the journal is synced (default: 32)
+        :param sync_interval: The number of seconds after which buffered records are synced (default: 1.0)
+        """
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self, file_path: str, upload_uri: str, upload_key: str, chunk_size: int):
+        """
+        Record a new upload.
+
+        :param file_path: The uploaded file path
+        :param upload_uri: The upload URI (obtained from the response of the start_upload method)
+        :param upload_key: The upload key
+        :param chunk_size: The chunk size (in bytes)
+        :return: The journal entry
+        """
+        stat = os.stat(file_path)
+        entry = UploadJournalEntry(
+            upload_uri, upload_key, os.path.abspath(file_path), stat.st_size, stat.st_mtime,
+            get_file_fingerprint(file_path), chunk_size,
+        )
+        self._append({
+            'op': 'start',
+            'upload_uri': entry.upload_uri,
+            'upload_key': entry.upload_key,
+            'file_path': entry.file_path,
+            'size': entry.size,
+            'mtime': entry.mtime,
+            'fingerprint': entry.fingerprint,
+            'chunk_size': entry.chunk_size,
+        }, sync=True)
+        return entry
+
+    def ack(self, upload_uri: str, chunk_start: int, chunk_end: int):
+        """
+        Record an acknowledged chunk.
+
+        :param upload_uri: The upload URI
+        :param chunk_start: The start position of the chunk (0-based)
+        :param chunk_end: The end position of the chunk (0-based)
+        """
+        self._append({'op': 'ack', 'upload_uri': upload_uri, 'range': [chunk_start, chunk_end]})
+
+    def complete(self, upload_uri: str):
+        """
+        Record a finished (or abandoned) upload.
+
+        :param upload_uri: The upload URI
+        """
+        self._append({'op': 'done', 'upload_uri': upload_uri}, sync=True)
+
+    def pending(self):
+        """
+        Get the unfinished uploads.
+
+        :return: The list of unfinished journal entries
+        """
+        with self._lock:
+            self._sync()
+            return list(self._replay().values())
+
+    def compact(self):
+        """
+        Rewrite the journal with only the unfinished uploads.
+        """
+        with self._lock:
+            self._sync()
+            entries = self._replay()
+            self._close()
+
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w') as file:
+                for entry in entries.values():
+                    file.write(json.dumps({
+                        'op': 'start',
+                        'upload_uri': entry.upload_uri,
+                        'upload_key': entry.upload_key,
+                        'file_path': entry.file_path,
+                        'size': entry.size,
+                        'mtime': entry.mtime,
+                        'fingerprint': entry.fingerprint,
+                        'chunk_size': entry.chunk_size,
+                    }) + '\n')
+                    for chunk_range in entry.acknowledged:
+                        file.write(json.dumps({'op': 'ack', 'upload_uri': entry.upload_uri, 'range': chunk_range}) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+
+    def flush(self):
+        """
+        Sync buffered records to disk.
+        """
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        """
+        Sync buffered records and close the journal file.
+        """
+        with self._lock:
+            self._close()
+
+    def _append(self, record: dict, sync=False):
+        """
+        Append a record to the journal.
+
+        :meta private:
+
+        :param record: The record
+        :param sync: Sync the journal immediately (default: False)
+        """
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            self._file.write(json.dumps(record) + '\n')
+            self._unsynced += 1
+
+            if sync or self._unsynced >= self.sync_every \
+                    or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+
+    def _sync(self):
+        """
+        Sync buffered records to disk, the lock must be held.
+
+        :meta private:
+        """
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _close(self):
+        """
+        Sync and close the journal file, the lock must be held.
+
+        :meta private:
+        """
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def _replay(self):
+        """
+        Replay the journal, the lock must be held.
+
+        :meta private:
+
+        :return: The unfinished entries, by upload URI
+        """
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash, ignore it
+                    continue
+
+                upload_uri = record.get('upload_uri')
+                if record.get('op') == 'start':
+                    entries[upload_uri] = UploadJournalEntry(
+                        upload_uri, record['upload_key'], record['file_path'], record['size'], record['mtime'],
+                        record['fingerprint'], record['chunk_size'],
+                    )
+                elif record.get('op') == 'ack' and upload_uri in entries:
+                    entries[upload_uri].acknowledged.append(tuple(record['range']))
+                elif record.get('op') == 'done':
+                    entries.pop(upload_uri, None)
+
+        return entries
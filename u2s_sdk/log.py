@@ -0,0 +1,88 @@
+"""
+Log module.
+
+u2s_sdk.log
+"""
+import logging
+
+LOGGER_NAME = 'u2s_sdk'
+TRACE_LOGGER_NAME = 'u2s_sdk.trace'
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# The loggers of the HTTP stack, traced along with the SDK
+HTTP_LOGGER_NAMES = ('requests', 'urllib3', 'httpx', 'httpcore')
+
+_handler = None
+_handled_loggers = []
+
+
+def get_trace_logger():
+    """
+    Get the trace logger, used for the verbose per-request logs (response headers and bodies).
+
+    The trace logger is silenced unless tracing is enabled with :func:`enable_logging` or :func:`set_trace`.
+
+    :return: The logger
+    """
+    return logging.getLogger(TRACE_LOGGER_NAME)
+
+
+def set_trace(enabled: bool):
+    """
+    Enable or disable the verbose tracing.
+
+    :param enabled: True to log the response headers and bodies of every request
+    """
+    get_trace_logger().setLevel(logging.DEBUG if enabled else logging.WARNING)
+
+
+def enable_logging(level: int = logging.DEBUG, fmt: str = DEFAULT_FORMAT, trace=False):
+    """
+    Send the SDK logs to the console.
+
+    Calling it again replaces the handler installed by the previous call, so log lines are never
+    written twice however many clients are created.
+
+    :param level: The logging level (default: logging.DEBUG)
+    :param fmt: The logging format (default: '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    :param trace: Also log the response headers and bodies, and the HTTP stack logs (default: False)
+    """
+    global _handler
+
+    disable_logging()
+
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter(fmt))
+
+    loggers = [logging.getLogger(LOGGER_NAME)]
+    if trace:
+        loggers.extend(logging.getLogger(name) for name in HTTP_LOGGER_NAMES)
+
+    for logger in loggers:
+        logger.setLevel(level)
+        logger.addHandler(_handler)
+        _handled_loggers.append(logger)
+
+    set_trace(trace)
+
+
+def disable_logging():
+    """
+    Remove the console handler installed by :func:`enable_logging` and disable the tracing.
+    """
+    global _handler
+
+    if _handler is not None:
+        for logger in _handled_loggers:
+            logger.removeHandler(_handler)
+            logger.setLevel(logging.NOTSET)
+        _handled_loggers.clear()
+        _handler.close()
+        _handler = None
+
+    set_trace(False)
+
+
+# Library logging is off by default: records go nowhere unless the application configures logging
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+set_trace(False)
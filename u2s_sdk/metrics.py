@@ -0,0 +1,318 @@
+"""
+Metrics module.
+
+u2s_sdk.metrics
+"""
+import bisect
+import threading
+import time
+
+
+class RequestEvent:
+    """
+    Event emitted by the client after each request, retries included.
+    """
+    kind = 'request'
+
+    def __init__(self, method: str, url: str, status_code=None, duration=0.0, time_to_headers=None, retries=0,
+                 bytes_sent=0, bytes_received=None, error=None):
+        """
+        Constructor.
+
+        :param method: The request method
+        :param url: The request URL
+        :param status_code: The status code of the last response, None if no response was received
+        :param duration: The duration of the call, retries and backoff included (in seconds)
+        :param time_to_headers: The time from sending the last attempt to receiving its response headers,
+            connection setup included (in seconds), None if unavailable
+        :param retries: The number of retries
+        :param bytes_sent: The size of the request body (in bytes), 0 if unknown
+        :param bytes_received: The size of the response body (in bytes), None if unknown (e.g. streamed)
+        :param error: The error that failed the request, if any
+        """
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.duration = duration
+        self.time_to_headers = time_to_headers
+        self.retries = retries
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+        self.error = error
+
+    def __repr__(self):
+        return (f'RequestEvent(method={self.method!r}, url={self.url!r}, status_code={self.status_code!r}, '
+                f'duration={self.duration:.3f}, retries={self.retries!r})')
+
+
+class ChunkEvent:
+    """
+    Event emitted by the upload handlers after each chunk upload.
+    """
+    kind = 'chunk'
+
+    def __init__(self, upload_uri: str, chunk_start: int, chunk_end: int, total_size: int, status_code=None,
+                 duration=0.0, read_duration=None, error=None):
+        """
+        Constructor.
+
+        :param upload_uri: The upload URI
+        :param chunk_start: The start position of the chunk (0-based)
+        :param chunk_end: The end position of the chunk (0-based, inclusive)
+        :param total_size: The total file size (in bytes), None if not known yet
+        :param status_code: The response status code, None if no response was received
+        :param duration: The duration of the chunk upload (in seconds)
+        :param read_duration: The time spent reading the chunk from its source (in seconds), None if unknown
+        :param error: The error that failed the chunk, if any
+        """
+        self.upload_uri = upload_uri
+        self.chunk_start = chunk_start
+        self.chunk_end = chunk_end
+        self.total_size = total_size
+        self.status_code = status_code
+        self.duration = duration
+        self.read_duration = read_duration
+        self.error = error
+
+    @property
+    def nbytes(self):
+        """
+        The size of the chunk (in bytes).
+        """
+        return self.chunk_end - self.chunk_start + 1
+
+    def __repr__(self):
+        return (f'ChunkEvent(chunk={self.chunk_start}-{self.chunk_end}/{self.total_size}, '
+                f'status_code={self.status_code!r}, duration={self.duration:.3f})')
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram.
+    """
+    def __init__(self, bounds):
+        """
+        Constructor.
+
+        :param bounds: The increasing upper bounds of the buckets, an overflow bucket is added
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        """
+        Record a value.
+
+        :param value: The value
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent: float):
+        """
+        Estimate a percentile, as the upper bound of the bucket holding it.
+
+        :param percent: The percentile (0-100)
+        :return: The estimate, or None if nothing was recorded
+        """
+        if not self.count:
+            return None
+
+        rank = percent / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        """
+        Get a summary of the histogram.
+
+        :return: A dictionary with the count, sum, min, max, mean, p50, p90, p99 and the bucket counts
+        """
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': dict(zip((*self.bounds, float('inf')), self.counts)),
+        }
+
+
+# Default latency buckets (in seconds)
+LATENCY_BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Default throughput buckets (in bytes per second)
+THROUGHPUT_BOUNDS = tuple(2 ** exponent for exponent in range(16, 32))
+
+
+class MetricsCollector:
+    """
+    In-process aggregator of request and chunk events.
+
+    The collector is a hook: pass it in the ``hooks`` of a client. It is thread-safe, and
+    :meth:`snapshot` returns the counters and histograms at any time.
+    """
+    def __init__(self, latency_bounds=LATENCY_BOUNDS, throughput_bounds=THROUGHPUT_BOUNDS):
+        """
+        Constructor.
+
+        :param latency_bounds: The bucket bounds of the duration histograms (in seconds)
+        :param throughput_bounds: The bucket bounds of the chunk throughput histogram (in bytes per second)
+        """
+        self.latency_bounds = latency_bounds
+        self.throughput_bounds = throughput_bounds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __call__(self, event):
+        """
+        Record an event.
+
+        :param event: A RequestEvent or a ChunkEvent
+        """
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = time.monotonic() - event.duration
+
+            if event.kind == 'request':
+                self._record_request(event)
+            elif event.kind == 'chunk':
+                self._record_chunk(event)
+
+    def reset(self):
+        """
+        Clear every counter and histogram.
+        """
+        with self._lock:
+            self._started_at = None
+            self.requests = 0
+            self.errors = 0
+            self.retries = 0
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.status_codes = {}
+            self.request_duration = Histogram(self.latency_bounds)
+            self.time_to_headers = Histogram(self.latency_bounds)
+            self.chunks = 0
+            self.chunk_errors = 0
+            self.chunk_bytes = 0
+            self.chunk_duration = Histogram(self.latency_bounds)
+            self.chunk_read_duration = Histogram(self.latency_bounds)
+            self.chunk_throughput = Histogram(self.throughput_bounds)
+
+    def snapshot(self):
+        """
+        Get the current metrics.
+
+        :return: A dictionary of counters, throughputs (in per-second units since the first event) and histograms
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+            return {
+                'elapsed': elapsed,
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'status_codes': dict(self.status_codes),
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'requests_per_second': self.requests / elapsed if elapsed else None,
+                'bytes_sent_per_second': self.bytes_sent / elapsed if elapsed else None,
+                'request_duration': self.request_duration.to_dict(),
+                'time_to_headers': self.time_to_headers.to_dict(),
+                'chunks': self.chunks,
+                'chunk_errors': self.chunk_errors,
+                'chunk_bytes': self.chunk_bytes,
+                'chunk_bytes_per_second': self.chunk_bytes / elapsed if elapsed else None,
+                'chunk_duration': self.chunk_duration.to_dict(),
+                'chunk_read_duration': self.chunk_read_duration.to_dict(),
+                'chunk_throughput': self.chunk_throughput.to_dict(),
+            }
+
+    def _record_request(self, event: RequestEvent):
+        """
+        Record a request event, the lock must be held.
+
+        :meta private:
+        """
+        self.requests += 1
+        self.retries += event.retries
+        self.bytes_sent += event.bytes_sent
+        self.bytes_received += event.bytes_received or 0
+        if event.error is not None:
+            self.errors += 1
+        if event.status_code is not None:
+            self.status_codes[event.status_code] = self.status_codes.get(event.status_code, 0) + 1
+        self.request_duration.observe(event.duration)
+        if event.time_to_headers is not None:
+            self.time_to_headers.observe(event.time_to_headers)
+
+    def _record_chunk(self, event: ChunkEvent):
+        """
+        Record a chunk event, the lock must be held.
+
+        :meta private:
+        """
+        self.chunks += 1
+        if event.error is not None:
+            self.chunk_errors += 1
+            return
+
+        self.chunk_bytes += event.nbytes
+        self.chunk_duration.observe(event.duration)
+        if event.read_duration is not None:
+            self.chunk_read_duration.observe(event.read_duration)
+        if event.duration > 0:
+            self.chunk_throughput.observe(event.nbytes / event.duration)
+
+
+def get_chunk_event(upload_uri: str, total_size: int, chunk_data, chunk_start: int, chunk_end: int, response,
+                    duration: float):
+    """
+    Build the event of a chunk upload.
+
+    :param upload_uri: The upload URI
+    :param total_size: The total file size (in bytes)
+    :param chunk_data: The chunk data (its ``read_duration`` is reported if it is a FileSlice)
+    :param chunk_start: The start position of the chunk (0-based)
+    :param chunk_end: The end position of the chunk (0-based, inclusive)
+    :param response: The response, may be None
+    :param duration: The duration of the chunk upload (in seconds)
+    :return: The ChunkEvent
+    """
+    status_code = response.status_code if response is not None else None
+    error = None if status_code in (201, 308) else Exception(f'Failed to upload chunk. Status code: {status_code}')
+    return ChunkEvent(
+        upload_uri, chunk_start, chunk_end, total_size, status_code=status_code, duration=duration,
+        read_duration=getattr(chunk_data, 'read_duration', None), error=error,
+    )
+
+
+def emit_event(hooks, event, logger=None):
+    """
+    Call the hooks with an event, logging (instead of raising) the hook errors.
+
+    :param hooks: The hooks
+    :param event: The event
+    :param logger: The logger of the hook errors (optional)
+    """
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:
+            if logger is not None:
+                logger.exception('Error in metrics hook %r', hook)
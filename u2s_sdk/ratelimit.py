@@ -0,0 +1,171 @@
+"""
+Rate limit module.
+
+u2s_sdk.ratelimit
+"""
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill at ``rate`` per second up to ``capacity``. A reservation larger than the
+    available tokens is granted immediately but leaves the bucket in debt, so the caller waits for
+    the refill instead of being refused; later callers queue behind that debt. This keeps the
+    average rate exact even for amounts larger than the capacity (e.g. a whole chunk).
+    """
+    def __init__(self, rate=None, capacity=None):
+        """
+        Constructor.
+
+        :param rate: The number of tokens added per second (default: None, unlimited)
+        :param capacity: The maximum number of tokens, the allowed burst (default: one second worth of tokens)
+        """
+        self._lock = threading.Lock()
+        self._rate = None
+        self._capacity = None
+        self._tokens = 0.0
+        self._updated_at = time.monotonic()
+        self.set_rate(rate, capacity)
+
+    @property
+    def rate(self):
+        """
+        The number of tokens added per second, None if unlimited.
+        """
+        return self._rate
+
+    def set_rate(self, rate=None, capacity=None):
+        """
+        Change the rate of the bucket, taking effect for the next reservations.
+
+        :param rate: The number of tokens added per second (None for unlimited)
+        :param capacity: The maximum number of tokens (default: one second worth of tokens)
+        """
+        with self._lock:
+            self._refill()
+            was_unlimited = self._rate is None
+            self._rate = rate
+            self._capacity = capacity if capacity is not None else rate
+            if rate is None:
+                self._tokens = 0.0
+            elif was_unlimited:
+                # A newly limited bucket starts full
+                self._tokens = self._capacity
+            else:
+                self._tokens = min(self._tokens, self._capacity)
+
+    def reserve(self, amount=1):
+        """
+        Reserve tokens without waiting.
+
+        :param amount: The number of tokens
+        :return: The number of seconds to wait before using them
+        """
+        with self._lock:
+            if self._rate is None:
+                return 0.0
+
+            self._refill()
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def acquire(self, amount=1):
+        """
+        Reserve tokens and wait until they are available.
+
+        :param amount: The number of tokens
+        :return: The number of seconds waited
+        """
+        delay = self.reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def _refill(self):
+        """
+        Add the tokens accumulated since the last update, the lock must be held.
+
+        :meta private:
+        """
+        now = time.monotonic()
+        if self._rate is not None:
+            self._tokens = min(self._tokens + (now - self._updated_at) * self._rate, self._capacity)
+        self._updated_at = now
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter, in requests per second and bytes per second.
+
+    Attach it to an :class:`u2s_sdk.client.ApiClient` (``rate_limiter=``) to share it between
+    every handler using that client. Limits can be changed at runtime with :meth:`set_limits`.
+    """
+    def __init__(self, requests_per_second=None, bytes_per_second=None, request_burst=None, byte_burst=None):
+        """
+        Constructor.
+
+        :param requests_per_second: The maximum request rate (default: None, unlimited)
+        :param bytes_per_second: The maximum upload bandwidth (default: None, unlimited)
+        :param request_burst: The number of requests allowed in a burst (default: one second worth)
+        :param byte_burst: The number of bytes allowed in a burst (default: one second worth)
+        """
+        self.requests = TokenBucket(requests_per_second, request_burst)
+        self.bytes = TokenBucket(bytes_per_second, byte_burst)
+
+    def set_limits(self, requests_per_second=None, bytes_per_second=None, request_burst=None, byte_burst=None):
+        """
+        Change the limits.
+
+        :param requests_per_second: The maximum request rate (None for unlimited)
+        :param bytes_per_second: The maximum upload bandwidth (None for unlimited)
+        :param request_burst: The number of requests allowed in a burst (default: one second worth)
+        :param byte_burst: The number of bytes allowed in a burst (default: one second worth)
+        """
+        self.requests.set_rate(requests_per_second, request_burst)
+        self.bytes.set_rate(bytes_per_second, byte_burst)
+
+    def reserve(self, nbytes=0):
+        """
+        Reserve one request and its body bytes without waiting.
+
+        :param nbytes: The number of bytes sent by the request
+        :return: The number of seconds to wait before sending the request
+        """
+        delay = self.requests.reserve(1)
+        if nbytes:
+            delay = max(delay, self.bytes.reserve(nbytes))
+        return delay
+
+    def acquire(self, nbytes=0):
+        """
+        Reserve one request and its body bytes, and wait until it may be sent.
+
+        :param nbytes: The number of bytes sent by the request
+        :return: The number of seconds waited
+        """
+        delay = self.reserve(nbytes)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+def get_body_size(data):
+    """
+    Get the size of a request body.
+
+    :param data: The request body (bytes, str, or a sized file-like object such as a FileSlice)
+    :return: The size (in bytes), 0 if unknown
+    """
+    if data is None:
+        return 0
+    if isinstance(data, str):
+        return len(data.encode())
+    try:
+        return len(data)
+    except TypeError:
+        return 0
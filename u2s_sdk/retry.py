@@ -0,0 +1,140 @@
+"""
+Retry module.
+
+u2s_sdk.retry
+"""
+import time
+import random
+
+
+class RetryPolicy:
+    """
+    Retry policy for transient request failures.
+
+    Connection errors, timeouts and the ``retry_statuses`` responses are retried with a capped
+    exponential backoff and full jitter, honoring the ``Retry-After`` header. Only idempotent
+    methods are retried: a chunk PUT carries a fixed ``Content-Range`` and can safely be sent again,
+    while the POST starting an upload would create a new one.
+    """
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30.0, jitter=True,
+                 retry_statuses=(429, 500, 502, 503, 504), retry_methods=('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'),
+                 budget=None):
+        """
+        Constructor.
+
+        :param max_retries: The maximum number of retries of a request (default: 3)
+        :param backoff_factor: The delay before the first retry, doubled for each retry (default: 0.5 seconds)
+        :param max_backoff: The maximum delay between two attempts (default: 30 seconds)
+        :param jitter: Randomize the delays between 0 and the backoff (default: True)
+        :param retry_statuses: The response status codes to retry (default: 429 and 5xx gateway errors)
+        :param retry_methods: The idempotent methods that may be retried (default: GET, HEAD, PUT, DELETE, OPTIONS)
+        :param budget: The maximum number of seconds spent on a call, retries included (default: None, unlimited)
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(method.upper() for method in retry_methods)
+        self.budget = budget
+
+    def is_retryable_request(self, method: str, data=None):
+        """
+        Check whether a request may be sent again.
+
+        :param method: The request method
+        :param data: The request body
+        :return: True if the method is idempotent and the body can be replayed, False otherwise
+        """
+        if method.upper() not in self.retry_methods:
+            return False
+
+        # Streamed bodies must be rewindable to be replayed
+        if data is not None and not isinstance(data, (bytes, bytearray, str, dict)) and not hasattr(data, 'seek'):
+            return False
+
+        return True
+
+    def is_retryable_status(self, status_code: int):
+        """
+        Check whether a response status code is transient.
+
+        :param status_code: The response status code
+        :return: True if the request should be retried, False otherwise
+        """
+        return status_code in self.retry_statuses
+
+    def get_delay(self, attempt: int, response=None):
+        """
+        Get the delay before the next attempt.
+
+        :param attempt: The number of retries already made
+        :param response: The failed response, if any (its Retry-After header takes precedence)
+        :return: The delay (in seconds)
+        """
+        retry_after = self._get_retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+
+        backoff = min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+        if self.jitter:
+            return random.uniform(0, backoff)
+        return backoff
+
+    def can_retry(self, attempt: int, started_at: float, delay: float):
+        """
+        Check whether another attempt fits the retry limits.
+
+        :param attempt: The number of retries already made
+        :param started_at: The time.monotonic() value at the start of the call
+        :param delay: The delay before the next attempt (in seconds)
+        :return: True if the request may be retried, False otherwise
+        """
+        if attempt >= self.max_retries:
+            return False
+
+        if self.budget is not None and time.monotonic() - started_at + delay > self.budget:
+            return False
+
+        return True
+
+    @staticmethod
+    def _get_retry_after(response):
+        """
+        Parse the Retry-After header of a response.
+
+        :meta private:
+
+        :param response: The response, may be None
+        :return: The delay requested by the server (in seconds), or None
+        """
+        if response is None:
+            return None
+
+        retry_after = response.headers.get('Retry-After')
+        if not retry_after:
+            return None
+
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+
+        # HTTP dates are rare here, email.utils is only imported when one is received
+        from email.utils import parsedate_to_datetime
+
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def rewind_body(data):
+    """
+    Rewind a request body before sending it again.
+
+    :param data: The request body
+    """
+    if hasattr(data, 'seek'):
+        data.seek(0)
@@ -0,0 +1,88 @@
+"""
+Chunk sizing module.
+
+u2s_sdk.sizing
+"""
+import threading
+
+
+class AdaptiveChunkSizer:
+    """
+    Adaptive chunk sizer.
+
+    Measures the throughput of each uploaded chunk and sizes the next chunk so that a request
+    takes about ``target_duration`` seconds. Sizes stay within ``[min_size, max_size]``, are
+    multiples of ``granularity`` and change by at most ``max_step`` times per chunk.
+    """
+    def __init__(self, initial_size=5242880, min_size=262144, max_size=268435456, target_duration=5.0,
+                 granularity=262144, smoothing=0.5, max_step=2.0):
+        """
+        Constructor.
+
+        :param initial_size: The size of the first chunk in bytes (default: 5 MB)
+        :param min_size: The minimum chunk size in bytes (default: 256 KB)
+        :param max_size: The maximum chunk size in bytes (default: 256 MB)
+        :param target_duration: The target duration of a chunk request in seconds (default: 5.0)
+        :param granularity: The chunk sizes are multiples of this value in bytes (default: 256 KB)
+        :param smoothing: The weight of the latest measurement in the throughput average (default: 0.5)
+        :param max_step: The maximum growth or shrink factor between two chunks (default: 2.0)
+        """
+        # The smallest chunk is min_size rounded up to the granularity, it must not exceed max_size
+        if max(-(-min_size // granularity), 1) * granularity > max_size:
+            raise ValueError('Invalid chunk size bounds')
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_duration = target_duration
+        self.granularity = granularity
+        self.smoothing = smoothing
+        self.max_step = max_step
+
+        self.throughput = None
+        self._size = self._clamp(initial_size)
+        self._lock = threading.Lock()
+
+    def next_size(self):
+        """
+        Get the size of the next chunk.
+
+        :return: The chunk size (in bytes)
+        """
+        with self._lock:
+            return self._size
+
+    def record(self, nbytes: int, duration: float):
+        """
+        Record an uploaded chunk and adjust the size of the next one.
+
+        :param nbytes: The number of bytes uploaded
+        :param duration: The duration of the upload request (in seconds)
+        """
+        if duration <= 0 or nbytes <= 0:
+            return
+
+        with self._lock:
+            throughput = nbytes / duration
+            if self.throughput is None:
+                self.throughput = throughput
+            else:
+                self.throughput = self.smoothing * throughput + (1 - self.smoothing) * self.throughput
+
+            size = self.throughput * self.target_duration
+            size = min(max(size, self._size / self.max_step), self._size * self.max_step)
+            self._size = self._clamp(size)
+
+    def _clamp(self, size):
+        """
+        Clamp a size to the bounds and round it down to the granularity.
+
+        :meta private:
+
+        :param size: The size (in bytes)
+        :return: The clamped size (in bytes)
+        """
+        # The bounds are rounded inwards, so that rounding the size down keeps it within them
+        lower = max(-(-self.min_size // self.granularity), 1) * self.granularity
+        upper = self.max_size - self.max_size % self.granularity
+        size = min(max(int(size), lower), upper)
+        return size - size % self.granularity
@@ -0,0 +1,265 @@
+"""
+Stream module.
+
+u2s_sdk.stream
+"""
+import io
+import os
+import mmap
+import time
+
+
+class FileSlice(io.RawIOBase):
+    """
+    Read-only file-like view over a byte range of a file or an in-memory buffer.
+
+    Slices of an open file are read with ``os.pread``, so several slices of the same file can be
+    streamed concurrently without sharing a file position. Slices of a buffer (``bytes``,
+    ``io.BytesIO``, ``mmap``) hand out ``memoryview`` blocks without copying. Either way the whole
+    chunk is never materialized: the HTTP transport reads it block by block. The time spent reading
+    the source is accumulated in ``read_duration``, and ``on_read`` (if set) is called with the
+    slice, the position and the data of every read, e.g. to hash the chunk as it is sent.
+    """
+    def __init__(self, source, start: int, length: int):
+        """
+        Constructor.
+
+        :param source: A file descriptor (int) or an object supporting the buffer protocol
+        :param start: The offset of the slice in the source (in bytes)
+        :param length: The length of the slice (in bytes)
+        """
+        super().__init__()
+        self.source = source
+        self.start = start
+        self.length = length
+        self._source_view = None if isinstance(source, int) else memoryview(source)
+        self._view = None if self._source_view is None else self._source_view[start:start + length]
+        self._position = 0
+        self.read_duration = 0.0
+        self.on_read = None
+
+    def __len__(self):
+        return self.length
+
+    def __bytes__(self):
+        if self._view is not None:
+            return self._view.tobytes()
+        return os.pread(self.source, self.length, self.start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset: int, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.length
+        self._position = min(max(offset, 0), self.length)
+        return self._position
+
+    def read(self, size=-1):
+        remaining = self.length - self._position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+
+        data = self.pread(size, self._position)
+        # The callback may be detached by another thread meanwhile
+        on_read = self.on_read
+        if on_read is not None:
+            on_read(self, self._position, data)
+
+        self._position += len(data)
+        return data
+
+    def pread(self, size: int, offset: int):
+        """
+        Read from an offset of the slice, without moving the position.
+
+        :param size: The maximum number of bytes to read
+        :param offset: The offset in the slice (in bytes)
+        :return: The data (bytes or a memoryview)
+        """
+        size = max(min(size, self.length - offset), 0)
+
+        if self._view is not None:
+            return self._view[offset:offset + size]
+
+        started_at = time.perf_counter()
+        data = os.pread(self.source, size, self.start + offset)
+        self.read_duration += time.perf_counter() - started_at
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        # Release the buffer exports so that the source can be resized or closed again
+        if self._view is not None:
+            self._view.release()
+            self._source_view.release()
+            self.source = None
+        super().close()
+
+
+def get_chunk_body(buffer, chunk_start: int, chunk_end: int):
+    """
+    Get the body of a chunk without copying it out of the source buffer.
+
+    :param buffer: The file buffer
+    :param chunk_start: The start position of the chunk (0-based)
+    :param chunk_end: The end position of the chunk (0-based, inclusive)
+    :return: A :class:`FileSlice` over the chunk (close it once the chunk is uploaded)
+    """
+    length = chunk_end - chunk_start + 1
+
+    if isinstance(buffer, (bytes, bytearray, memoryview, mmap.mmap)):
+        return FileSlice(buffer, chunk_start, length)
+
+    if hasattr(buffer, 'getbuffer'):
+        return FileSlice(buffer.getbuffer(), chunk_start, length)
+
+    if hasattr(os, 'pread'):
+        try:
+            return FileSlice(buffer.fileno(), chunk_start, length)
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            pass
+
+    # Unsliceable buffer, fall back to copying the chunk out of it
+    buffer.seek(chunk_start)
+    return FileSlice(buffer.read(length), 0, length)
+
+
+class IteratorReader(io.RawIOBase):
+    """
+    Read-only, non-seekable file-like object over an iterator of blocks.
+
+    Only the current block is held in memory. Closing the reader closes the iterator (if it is a
+    generator), which releases the resources it holds.
+    """
+    def __init__(self, blocks):
+        """
+        Constructor.
+
+        :param blocks: An iterator of bytes blocks
+        """
+        super().__init__()
+        self.blocks = blocks
+        self._block = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._block:
+            block = next(self.blocks, None)
+            if block is None:
+                return 0
+            self._block = memoryview(block)
+
+        size = min(len(buffer), len(self._block))
+        buffer[:size] = self._block[:size]
+        self._block = self._block[size:]
+        return size
+
+    def close(self):
+        if hasattr(self.blocks, 'close'):
+            self.blocks.close()
+        self._block = memoryview(b'')
+        super().close()
+
+
+class StreamChunker:
+    """
+    Cuts blocks of any size into chunks of a fixed size.
+
+    Each chunk is filled in its own ``bytearray`` and handed out as a :class:`FileSlice`, so the
+    blocks are copied once and the chunks are never copied again.
+    """
+    def __init__(self, chunk_size: int):
+        """
+        Constructor.
+
+        :param chunk_size: The chunk size (in bytes)
+        """
+        self.chunk_size = chunk_size
+        self._buffer = bytearray(chunk_size)
+        self._length = 0
+
+    def feed(self, block):
+        """
+        Add a block.
+
+        :param block: The block (a bytes-like object)
+        :return: The chunks completed by the block (FileSlice objects, possibly none)
+        """
+        chunks = []
+        with memoryview(block) as view:
+            view = view.cast('B')
+            while view:
+                size = min(len(view), self.chunk_size - self._length)
+                self._buffer[self._length:self._length + size] = view[:size]
+                self._length += size
+                view = view[size:]
+
+                if self._length == self.chunk_size:
+                    chunks.append(FileSlice(self._buffer, 0, self._length))
+                    self._buffer = bytearray(self.chunk_size)
+                    self._length = 0
+        return chunks
+
+    def flush(self):
+        """
+        Get the last, incomplete chunk.
+
+        :return: The chunk (a FileSlice), or None if no bytes are left
+        """
+        if not self._length:
+            return None
+
+        chunk = FileSlice(self._buffer, 0, self._length)
+        self._buffer = bytearray(self.chunk_size)
+        self._length = 0
+        return chunk
+
+
+def iter_stream_chunks(source, chunk_size: int):
+    """
+    Split a stream of unknown length into chunks, without seeking it.
+
+    :param source: A readable file-like object (e.g. a pipe or a subprocess stdout) or an iterable of bytes-like blocks
+    :param chunk_size: The chunk size (in bytes)
+    :return: An iterator of FileSlice chunks, every one of ``chunk_size`` bytes but the last
+    """
+    if hasattr(source, 'readinto'):
+        # Read straight into the chunk buffer, pipes may return fewer bytes than asked
+        while True:
+            buffer = bytearray(chunk_size)
+            length = 0
+            with memoryview(buffer) as view:
+                while length < chunk_size:
+                    size = source.readinto(view[length:])
+                    if not size:
+                        break
+                    length += size
+
+            if length:
+                yield FileSlice(buffer, 0, length)
+            if length < chunk_size:
+                return
+
+    blocks = iter(lambda: source.read(chunk_size), b'') if hasattr(source, 'read') else source
+    chunker = StreamChunker(chunk_size)
+    for block in blocks:
+        yield from chunker.feed(block)
+
+    chunk = chunker.flush()
+    if chunk is not None:
+        yield chunk
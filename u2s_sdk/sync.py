@@ -0,0 +1,416 @@
+"""
+Sync module.
+
+u2s_sdk.sync
+"""
+import os
+import json
+import threading
+
+from .batch import BatchUploadManager
+from .dedup import DedupIndex
+from .file import FileHandler
+from .handler import ResumableUploadHandler
+
+
+class SyncAction:
+    """
+    A step of a sync plan.
+
+    Kinds:
+
+    - ``upload``: upload a local file (``replaces`` lists the remote files with the same name it supersedes)
+    - ``update``: rename a remote file whose content matches a local file (``file_id``)
+    - ``delete``: delete a remote file (``file_id``)
+    """
+    def __init__(self, kind: str, name: str, file_path=None, file_id=None, size=None, content_hash=None,
+                 replaces=(), reason=None):
+        """
+        Constructor.
+
+        :param kind: The action kind (upload|update|delete)
+        :param name: The remote filename (for a delete, the name of the deleted file)
+        :param file_path: The local file path (upload and update)
+        :param file_id: The remote file ID (update and delete)
+        :param size: The file size (in bytes)
+        :param content_hash: The content hash of the local file, if known
+        :param replaces: The IDs of the remote files deleted once the upload succeeds
+        :param reason: Why the action is needed
+        """
+        self.kind = kind
+        self.name = name
+        self.file_path = file_path
+        self.file_id = file_id
+        self.size = size
+        self.content_hash = content_hash
+        self.replaces = list(replaces)
+        self.reason = reason
+
+    def __repr__(self):
+        return f'SyncAction(kind={self.kind!r}, name={self.name!r}, file_id={self.file_id!r}, reason={self.reason!r})'
+
+
+class SyncPlan:
+    """
+    The minimal list of actions making a remote account match a local directory.
+    """
+    def __init__(self, root: str, actions=None, unchanged=0):
+        """
+        Constructor.
+
+        :param root: The local directory
+        :param actions: The actions (uploads, then updates, then deletes)
+        :param unchanged: The number of local files already in sync
+        """
+        self.root = root
+        self.actions = actions or []
+        self.unchanged = unchanged
+
+    def __iter__(self):
+        return iter(self.actions)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def get_actions(self, kind: str):
+        """
+        Get the actions of a kind.
+
+        :param kind: The action kind (upload|update|delete)
+        :return: The list of actions
+        """
+        return [action for action in self.actions if action.kind == kind]
+
+    def summary(self):
+        """
+        Summarize the plan.
+
+        :return: A dictionary with the number of uploads, updates, deletes, unchanged files and uploaded bytes
+        """
+        uploads = self.get_actions('upload')
+        return {
+            'upload': len(uploads),
+            'update': len(self.get_actions('update')),
+            'delete': len(self.get_actions('delete')) + sum(len(action.replaces) for action in uploads),
+            'unchanged': self.unchanged,
+            'upload_bytes': sum(action.size or 0 for action in uploads),
+        }
+
+
+class SyncResult:
+    """
+    The result of a sync action.
+    """
+    def __init__(self, action: SyncAction, ok: bool, file_id=None, error=None):
+        """
+        Constructor.
+
+        :param action: The action
+        :param ok: True if the action was successful, False otherwise
+        :param file_id: The remote file ID (of the uploaded, renamed or deleted file)
+        :param error: The exception raised by the action, if any
+        """
+        self.action = action
+        self.ok = ok
+        self.file_id = file_id
+        self.error = error
+
+    def __repr__(self):
+        return f'SyncResult(action={self.action!r}, ok={self.ok!r}, error={self.error!r})'
+
+
+class SyncState:
+    """
+    Local record of the remote files written by previous syncs, with their content hash.
+
+    The listing does not expose content hashes, so the state is what lets a re-run tell a remote
+    file with the same name and size apart from an identical one, and detect renames.
+    """
+    def __init__(self, path=None):
+        """
+        Constructor.
+
+        :param path: The state file path (default: None, in memory only)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._remote = {}
+
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                self._remote = json.load(file).get('remote', {})
+
+    def save(self):
+        """
+        Write the state to its file, atomically.
+        """
+        if self.path is None:
+            return
+
+        with self._lock:
+            data = {'remote': self._remote}
+
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.path)
+
+    def get(self, file_id):
+        """
+        Get the recorded state of a remote file.
+
+        :param file_id: The remote file ID
+        :return: A dictionary with the filename, size and hash, or None
+        """
+        with self._lock:
+            return self._remote.get(str(file_id))
+
+    def put(self, file_id, filename: str, size: int, content_hash: str):
+        """
+        Record a remote file.
+
+        :param file_id: The remote file ID
+        :param filename: The remote filename
+        :param size: The size (in bytes)
+        :param content_hash: The content hash
+        """
+        with self._lock:
+            self._remote[str(file_id)] = {'filename': filename, 'size': size, 'hash': content_hash}
+
+    def remove(self, file_id):
+        """
+        Forget a remote file.
+
+        :param file_id: The remote file ID
+        """
+        with self._lock:
+            self._remote.pop(str(file_id), None)
+
+    def prune(self, file_ids):
+        """
+        Forget the remote files that are not in a listing.
+
+        :param file_ids: The IDs of the listed remote files
+        :return: The number of forgotten files
+        """
+        file_ids = {str(file_id) for file_id in file_ids}
+        with self._lock:
+            stale = [file_id for file_id in self._remote if file_id not in file_ids]
+            for file_id in stale:
+                del self._remote[file_id]
+        return len(stale)
+
+
+class SyncEngine:
+    """
+    One-way sync of a local directory tree to an Up2Share account (rsync-like).
+
+    :meth:`plan` compares the local files (by name, size and content hash) with the remote listing
+    and the :class:`SyncState` of previous runs, and computes the minimal plan: files already in
+    sync are left alone, renamed files are renamed remotely instead of being uploaded again, and
+    only new or changed files are uploaded. With ``delete``, remote files missing locally are
+    deleted. :meth:`run` executes a plan: uploads run on a :class:`u2s_sdk.batch.BatchUploadManager`,
+    renames and deletes run as concurrent bulk operations.
+
+    Local content hashes are cached by path, size and mtime in a :class:`u2s_sdk.dedup.DedupIndex`,
+    so an incremental re-run only hashes the files that changed.
+    """
+    def __init__(self, handler: ResumableUploadHandler, file_handler: FileHandler = None, state: SyncState = None,
+                 dedup_index: DedupIndex = None, delete=False, chunk_size=5242880, max_workers=8, hash_workers=None,
+                 checksum_algorithms=None):
+        """
+        Constructor.
+
+        :param handler: The resumable upload handler
+        :param file_handler: The file handler (default: a FileHandler on the handler's client)
+        :param state: The state of previous syncs (default: in memory only)
+        :param dedup_index: The local hash cache (default: in memory only)
+        :param delete: Delete the remote files missing locally (default: False)
+        :param chunk_size: The chunk size in bytes (default: 5 MB)
+        :param max_workers: The number of concurrent requests (default: 8)
+        :param hash_workers: The number of hashing processes (default: the number of CPUs)
+        :param checksum_algorithms: The checksum algorithms verified after each upload (default: None)
+        """
+        self.handler = handler
+        self.file_handler = file_handler or FileHandler(handler.api_client)
+        self.logger = handler.logger
+        self.state = state if state is not None else SyncState()
+        self.dedup_index = dedup_index if dedup_index is not None else DedupIndex()
+        self.delete = delete
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.hash_workers = hash_workers
+        self.checksum_algorithms = checksum_algorithms
+
+    def plan(self, root: str):
+        """
+        Compute the actions making the remote account match a local directory.
+
+        The remote filenames are the paths relative to ``root``, with ``/`` separators.
+
+        :param root: The directory path
+        :return: The SyncPlan
+        """
+        local_files = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                file_path = os.path.join(dirpath, name)
+                local_files[os.path.relpath(file_path, root).replace(os.sep, '/')] = file_path
+
+        remote_files = {}
+        remote_ids = []
+        for record in self.file_handler.iter_list(prefetch=True):
+            remote_ids.append(record.get('id'))
+            remote_files.setdefault(record.get('filename'), []).append(record)
+        self.state.prune(remote_ids)
+
+        hashes = self.dedup_index.hash_files(local_files.values(), self.hash_workers)
+
+        uploads = []
+        unchanged = 0
+        for name, file_path in local_files.items():
+            size = os.path.getsize(file_path)
+            content_hash = hashes[file_path]
+            candidates = remote_files.pop(name, [])
+
+            match = next((record for record in candidates if self._is_same(record, size, content_hash)), None)
+            if match is not None:
+                unchanged += 1
+                # Duplicates of a synced file are dropped along with the other remote leftovers
+                candidates.remove(match)
+                if candidates:
+                    remote_files[name] = candidates
+                continue
+
+            reason = 'changed' if candidates else 'new'
+            uploads.append(SyncAction('upload', name, file_path=file_path, size=size, content_hash=content_hash,
+                                      replaces=[record.get('id') for record in candidates], reason=reason))
+
+        # Remote files left without a local name: renamed, or deleted locally
+        orphans = {}
+        for records in remote_files.values():
+            for record in records:
+                recorded = self.state.get(record.get('id'))
+                if recorded is not None and recorded['size'] == record.get('size'):
+                    orphans.setdefault(recorded['hash'], []).append(record)
+
+        actions = []
+        renames = []
+        for action in uploads:
+            candidates = orphans.get(action.content_hash)
+            if not action.replaces and candidates:
+                record = candidates.pop()
+                self._discard(remote_files, record)
+                renames.append(SyncAction('update', action.name, file_path=action.file_path,
+                                          file_id=record.get('id'), size=action.size,
+                                          content_hash=action.content_hash, reason=f'renamed from {record.get("filename")}'))
+            else:
+                actions.append(action)
+
+        actions.extend(renames)
+        if self.delete:
+            for name, records in remote_files.items():
+                for record in records:
+                    actions.append(SyncAction('delete', name, file_id=record.get('id'), size=record.get('size'),
+                                              reason='missing locally'))
+
+        return SyncPlan(root, actions, unchanged)
+
+    def run(self, plan: SyncPlan):
+        """
+        Execute a plan.
+
+        Uploads run first; the remote files an upload replaces are only deleted once it succeeds.
+        Renames and deletes then run concurrently. The state and the hash cache are saved at the end.
+
+        :param plan: The SyncPlan
+        :return: A generator of SyncResult, yielded as each action completes
+        """
+        try:
+            replaced = []
+            uploads = plan.get_actions('upload')
+            if uploads:
+                manager = BatchUploadManager(self.handler, chunk_size=self.chunk_size, max_workers=self.max_workers,
+                                             checksum_algorithms=self.checksum_algorithms)
+                actions = {}
+                for action in uploads:
+                    manager.submit(action.file_path, action.name)
+                    actions[action.file_path] = action
+
+                for result in manager.run():
+                    action = actions[result.file_path]
+                    if result.ok and result.file_id is not None:
+                        self.state.put(result.file_id, action.name, action.size, action.content_hash)
+                        replaced.extend(SyncAction('delete', action.name, file_id=file_id, reason='replaced')
+                                        for file_id in action.replaces)
+                    yield SyncResult(action, result.ok, file_id=result.file_id, error=result.error)
+
+            updates = {action.file_id: action for action in plan.get_actions('update')}
+            items = [{'file_id': file_id, 'filename': action.name} for file_id, action in updates.items()]
+            for result in self.file_handler.bulk_update(items, max_workers=self.max_workers):
+                action = updates[result.item['file_id']]
+                if result.ok:
+                    self.state.put(action.file_id, action.name, action.size, action.content_hash)
+                yield SyncResult(action, result.ok, file_id=action.file_id, error=result.error)
+
+            deletes = {action.file_id: action for action in (*plan.get_actions('delete'), *replaced)}
+            for result in self.file_handler.bulk_delete(deletes, max_workers=self.max_workers):
+                if result.ok:
+                    self.state.remove(result.item)
+                yield SyncResult(deletes[result.item], result.ok, file_id=result.item, error=result.error)
+        finally:
+            self.state.save()
+            self.dedup_index.save()
+
+    def sync(self, root: str, dry_run=False):
+        """
+        Plan and run the sync of a local directory.
+
+        :param root: The directory path
+        :param dry_run: Only compute and log the plan (default: False)
+        :return: The SyncPlan and the list of SyncResult (empty on a dry run)
+        """
+        plan = self.plan(root)
+        summary = plan.summary()
+        self.logger.info('Sync plan for %s: %s uploads (%s bytes), %s renames, %s deletes, %s unchanged', root,
+                         summary['upload'], summary['upload_bytes'], summary['update'], summary['delete'],
+                         summary['unchanged'])
+
+        if dry_run:
+            for action in plan:
+                self.logger.info('Would %s %s (%s)', action.kind, action.name, action.reason)
+            return plan, []
+
+        results = list(self.run(plan))
+        failed = sum(1 for result in results if not result.ok)
+        if failed:
+            self.logger.error('Sync of %s finished with %s failed actions', root, failed)
+        return plan, results
+
+    def _is_same(self, record: dict, size: int, content_hash: str):
+        """
+        Check whether a remote file matches a local file.
+
+        Without a recorded hash (a file not written by a sync), the name and size are trusted.
+
+        :meta private:
+        """
+        if record.get('size') != size:
+            return False
+
+        recorded = self.state.get(record.get('id'))
+        if recorded is None:
+            return True
+        return recorded['hash'] == content_hash
+
+    @staticmethod
+    def _discard(remote_files: dict, record: dict):
+        """
+        Remove a remote file from the unclaimed remote files.
+
+        :meta private:
+        """
+        records = remote_files.get(record.get('filename'), [])
+        if record in records:
+            records.remove(record)
@@ -1,7 +1,7 @@
 """
 u2s_sdk.utils
 """
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, urlencode
 
 
 def get_key_value_from_uri(uri: str):
@@ -20,3 +20,115 @@ def get_key_value_from_uri(uri: str):
     key_value = query_parameters.get("key", [None])[0]
 
     return key_value
+
+
+def get_upload_uri(upload_key: str):
+    """
+    Get the resumable upload URI for an upload key.
+    :param upload_key: The upload key (as returned by get_key_value_from_uri)
+    :return: The upload URI, relative to the API base URL
+    """
+    return f'/files?{urlencode({"key": upload_key})}'
+
+
+def get_file_id_from_location(location: str):
+    """
+    Get the file ID from the Location header of a finalized upload.
+    :param location: The Location header (e.g. "https://api.up2sha.re/files/abc123"), may be None
+    :return: The file ID (the last path segment), or None
+    """
+    if not location:
+        return None
+
+    return urlparse(location).path.rstrip('/').rpartition('/')[2] or None
+
+
+def build_url(base_url: str, endpoint: str):
+    """
+    Build the URL of an endpoint.
+    :param base_url: The base URL
+    :param endpoint: The endpoint, either relative to the base URL or an absolute URL (e.g. an upload URI)
+    :return: The URL
+    """
+    if urlparse(endpoint).scheme:
+        return endpoint
+
+    return f'{base_url.rstrip("/")}/{endpoint.lstrip("/")}'
+
+
+def parse_range_header(range_header: str):
+    """
+    Get the number of bytes committed by the server from a resumable upload Range header.
+    :param range_header: The Range header (e.g. "bytes=0-1023"), may be None
+    :return: The number of contiguous bytes committed from the start of the upload
+    """
+    if not range_header:
+        return 0
+
+    _, _, byte_range = range_header.partition('=')
+    _, _, last_byte = byte_range.partition('-')
+
+    return int(last_byte) + 1
+
+
+def get_buffer_size(buffer):
+    """
+    Get the total size of a seekable buffer and rewind it.
+    :param buffer: The file buffer
+    :return: The total size (in bytes)
+    """
+    # Seek to the end of the file
+    buffer.seek(0, 2)  # 0 indicates the offset and 2 indicates seeking from the end of the file
+    # Get the current file position, which is the length of the file
+    total_size = buffer.tell()
+    buffer.seek(0)  # Reset the file position to the beginning of the file
+
+    return total_size
+
+
+def iter_chunk_ranges(total_size: int, chunk_size: int, start=0):
+    """
+    Iterate over the (start, end) byte ranges of the chunks, both 0-based and inclusive.
+    :param total_size: The total size (in bytes)
+    :param chunk_size: The chunk size (in bytes)
+    :param start: The offset of the first chunk (default: 0)
+    :return: A generator of (start, end) tuples
+    """
+    chunk_start = start
+    while chunk_start < total_size:
+        chunk_end = min(chunk_start + chunk_size - 1, total_size - 1)
+        yield chunk_start, chunk_end
+        chunk_start = chunk_end + 1
+
+
+def get_page_records(page_data):
+    """
+    Get the records of a page of a paginated listing.
+    :param page_data: The decoded page (a list, or a dictionary with a "data" list)
+    :return: The list of records
+    """
+    if isinstance(page_data, dict):
+        return page_data.get('data') or []
+
+    return page_data or []
+
+
+def has_next_page(page_data, limit: int):
+    """
+    Check whether a paginated listing has a page after this one.
+    :param page_data: The decoded page
+    :param limit: The page size that was requested
+    :return: True if there is a next page, False otherwise
+    """
+    if isinstance(page_data, dict):
+        # Transformer style pagination: {"data": [...], "meta": {"pagination": {...}}}
+        pagination = (page_data.get('meta') or {}).get('pagination')
+        if pagination:
+            return pagination.get('current_page', 0) < pagination.get('total_pages', 0)
+
+        # Paginator style pagination: {"data": [...], "current_page": 1, "last_page": 3, ...}
+        if 'last_page' in page_data:
+            return page_data.get('current_page', 0) < page_data['last_page']
+
+    # Unknown pagination, a full page may be followed by another one
+    return len(get_page_records(page_data)) >= limit